@@ -15,15 +15,58 @@ def create_app(config_class=Config):
     login_manager.login_view = 'auth.login'
     login_manager.login_message = 'Veuillez vous connecter pour accéder à cette page.'
 
+    # Mesures par étape (Server-Timing, /metrics)
+    from app.metrics import metrics
+    metrics.init_app(app)
+
     # Importer le user_loader
     from app.models.user import load_user
+    from app.models.user_repository import user_repository
     login_manager.user_loader(load_user)
+    user_repository.init_app(app)
+
+    # Client Google Sheets partagé par le process
+    from app.google_client import google_clients
+    google_clients.init_app(app)
+
+    # Stockage users / pricing_data (Google Sheets ou SQLite)
+    from app.models.sheets import sheets_manager
+    sheets_manager.init_app(app)
+
+    # Configurer le cache des données de marché (+ précalculs par snapshot)
+    from app.pricing.snapshot import market_data_cache
+    from app.pricing.precompute import precompute_snapshot
+    market_data_cache.init_app(app)
+    market_data_cache.add_listener(precompute_snapshot)
+
+    # Courbes matérialisées aux paramètres par défaut (reconstruites à chaque nouveau snapshot)
+    from app.pricing.curve_store import curve_store
+    curve_store.init_app(app)
+    market_data_cache.add_listener(curve_store.on_snapshot)
+
+    # Exécuteur multi-process des calculs en lot
+    from app.pricing.parallel import curve_executor
+    curve_executor.init_app(app)
+
+    # Cache des réponses de calcul de courbes
+    from app.pricing.result_cache import result_cache
+    result_cache.init_app(app)
+
+    # File de jobs asynchrones
+    from app.pricing.jobs import job_queue
+    job_queue.init_app(app)
 
     # Importer et enregistrer les blueprints (routes)
-    from app.routes import auth, main, pricing
+    from app.routes import auth, main, metrics as metrics_routes, pricing
 
     app.register_blueprint(auth.bp)
     app.register_blueprint(main.bp)
     app.register_blueprint(pricing.bp)
+    app.register_blueprint(metrics_routes.bp)
+
+    # Commandes CLI (flask pricing ..., flask storage ...)
+    from app.cli import pricing_cli, storage_cli
+    app.cli.add_command(pricing_cli)
+    app.cli.add_command(storage_cli)
 
     return app
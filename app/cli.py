@@ -0,0 +1,78 @@
+"""
+Commandes CLI de l'application (flask pricing ..., flask storage ...)
+"""
+
+import click
+from flask import current_app
+from flask.cli import AppGroup
+
+pricing_cli = AppGroup('pricing', help="Commandes de calcul des courbes de pricing")
+
+
+@pricing_cli.command('universe')
+@click.option('--output', '-o', default=None, help="Fichier JSON de sortie (défaut: UNIVERSE_OUTPUT_FILE)")
+@click.option('--seniority', '-s', 'seniorities', multiple=True, help="Séniorité à calculer (répétable, défaut: toutes)")
+@click.option('--n-clusters-rating', default=5, show_default=True, type=int)
+@click.option('--n-clusters-spread', default=3, show_default=True, type=int)
+@click.option('--score-liquidite', default=3, show_default=True, type=int)
+@click.option('--score-equity', default=3, show_default=True, type=int)
+@click.option('--score-solidite', default=3, show_default=True, type=int)
+@click.option('--workers', '-w', default=None, type=int, help="Nombre de process (défaut: PRICING_WORKERS)")
+def universe_command(output, seniorities, n_clusters_rating, n_clusters_spread,
+                     score_liquidite, score_equity, score_solidite, workers):
+    """Calcule les courbes de tous les émetteurs x séniorités en une passe"""
+    from app.pricing.parallel import curve_executor
+    from app.pricing.pipeline import run_universe
+    from app.pricing.snapshot import market_data_cache
+
+    if workers is not None:
+        curve_executor.max_workers = workers
+
+    snapshot = market_data_cache.get_snapshot()
+    if snapshot.is_empty:
+        raise click.ClickException("Impossible de charger les données de marché")
+
+    summary = run_universe(
+        snapshot,
+        output or current_app.config['UNIVERSE_OUTPUT_FILE'],
+        n_clusters_rating, n_clusters_spread,
+        score_liquidite, score_equity, score_solidite,
+        seniorities=list(seniorities) or None,
+        executor=curve_executor
+    )
+
+    click.echo(
+        f"{summary['count']} courbes ({summary['errors']} erreurs) en "
+        f"{summary['duration']:.1f}s -> {summary['path']}"
+    )
+
+
+storage_cli = AppGroup('storage', help="Commandes du stockage users / pricing_data")
+
+
+@storage_cli.command('sync-sheets')
+def sync_sheets_command():
+    """Recopie la base SQLite dans Google Sheets (STORAGE_BACKEND=sqlite)"""
+    from app.models.sheets import sheets_manager
+
+    try:
+        counts = sheets_manager.sync_to_sheets()
+    except RuntimeError as e:
+        raise click.ClickException(str(e))
+
+    for sheet_name, count in counts.items():
+        click.echo(f"{sheet_name}: {count} lignes -> Google Sheets")
+
+
+@storage_cli.command('import-sheets')
+def import_sheets_command():
+    """Charge le contenu de Google Sheets dans la base SQLite (remplace les tables, autorise sync-sheets)"""
+    from app.models.sheets import sheets_manager
+
+    try:
+        counts = sheets_manager.import_from_sheets()
+    except RuntimeError as e:
+        raise click.ClickException(str(e))
+
+    for sheet_name, count in counts.items():
+        click.echo(f"{sheet_name}: {count} lignes importées")
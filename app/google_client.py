@@ -0,0 +1,185 @@
+"""
+Clients Google Sheets partagés par tout le process (authentification et connexions réutilisées)
+Utilisé par le stockage (app.models.sheets) et par le chargement des données de marché
+"""
+
+import os
+import threading
+from datetime import datetime, timedelta
+
+import gspread
+from google.auth.transport.requests import AuthorizedSession, Request
+from google.oauth2.service_account import Credentials
+from requests.adapters import HTTPAdapter
+
+from app.metrics import metrics
+
+
+SCOPES = [
+    'https://www.googleapis.com/auth/spreadsheets',
+    'https://www.googleapis.com/auth/drive'
+]
+
+
+class _ClientEntry:
+    """Client autorisé d'un fichier de credentials et ses handles ouverts"""
+
+    def __init__(self, credentials, client):
+        self.credentials = credentials
+        self.client = client
+        self.spreadsheets = {}
+        self.worksheets = {}
+        self.titles = {}
+
+
+class GoogleClientPool:
+    """
+    Un client gspread autorisé par fichier de credentials, partagé par les threads
+
+    Le fichier de credentials n'est lu et le client autorisé qu'une fois par
+    process ; la session HTTP (keep-alive, pool de connexions dimensionné
+    pour les threads gunicorn) et les handles de classeurs / onglets sont
+    réutilisés d'une requête à l'autre.
+
+    Le jeton d'accès est rafraîchi avant son expiration (refresh_margin
+    secondes) à la prise d'un client, plutôt qu'au premier appel qui échoue.
+    Après un fork (workers gunicorn), le pool repart de zéro : une session
+    HTTP n'est jamais partagée entre process.
+    """
+
+    def __init__(self, refresh_margin=300, pool_size=10):
+        """
+        Args:
+            refresh_margin: Rafraîchir le jeton s'il expire dans moins de refresh_margin secondes
+            pool_size: Connexions HTTP conservées par client
+        """
+        self.refresh_margin = refresh_margin
+        self.pool_size = pool_size
+        self._entries = {}
+        self._pid = os.getpid()
+        self._lock = threading.RLock()
+        self.authorizations = 0
+        self.refreshes = 0
+
+    def init_app(self, app):
+        """Configure le pool depuis la configuration Flask"""
+        self.pool_size = app.config.get('GOOGLE_HTTP_POOL_SIZE', self.pool_size)
+
+    def client(self, credentials_file):
+        """
+        Client gspread autorisé (créé au premier appel, jeton rafraîchi si besoin)
+
+        Args:
+            credentials_file: Chemin du fichier de compte de service
+
+        Returns:
+            gspread.Client
+        """
+        return self._entry(credentials_file).client
+
+    def open_by_url(self, credentials_file, url):
+        """Classeur ouvert par URL (handle mis en cache)"""
+        entry = self._entry(credentials_file)
+        with self._lock:
+            spreadsheet = entry.spreadsheets.get(('url', url))
+            if spreadsheet is None:
+                spreadsheet = entry.client.open_by_url(url)
+                entry.spreadsheets[('url', url)] = spreadsheet
+            return spreadsheet
+
+    def open(self, credentials_file, title):
+        """Classeur ouvert par titre (handle mis en cache)"""
+        entry = self._entry(credentials_file)
+        with self._lock:
+            spreadsheet = entry.spreadsheets.get(('title', title))
+            if spreadsheet is None:
+                spreadsheet = entry.client.open(title)
+                entry.spreadsheets[('title', title)] = spreadsheet
+            return spreadsheet
+
+    def worksheet(self, credentials_file, spreadsheet, title):
+        """
+        Onglet d'un classeur par titre (handle mis en cache)
+
+        Raises:
+            gspread.WorksheetNotFound: Onglet absent
+        """
+        entry = self._entry(credentials_file)
+        with self._lock:
+            worksheet = entry.worksheets.get((spreadsheet.id, title))
+            if worksheet is None:
+                worksheet = spreadsheet.worksheet(title)
+                entry.worksheets[(spreadsheet.id, title)] = worksheet
+            return worksheet
+
+    def worksheet_titles(self, credentials_file, spreadsheet, refresh=False):
+        """
+        Titres des onglets d'un classeur dans l'ordre (mis en cache)
+
+        Args:
+            refresh: Relire la liste (onglet ajouté, renommé ou déplacé)
+        """
+        entry = self._entry(credentials_file)
+        with self._lock:
+            titles = entry.titles.get(spreadsheet.id)
+            if titles is None or refresh:
+                titles = [worksheet.title for worksheet in spreadsheet.worksheets()]
+                entry.titles[spreadsheet.id] = titles
+            return titles
+
+    def reset(self):
+        """Oublie tous les clients (nouvelle authentification au prochain appel)"""
+        with self._lock:
+            self._entries = {}
+
+    def stats(self):
+        """Compteurs du pool"""
+        return {
+            'clients': len(self._entries),
+            'authorizations': self.authorizations,
+            'refreshes': self.refreshes,
+        }
+
+    def _entry(self, credentials_file):
+        """Entrée du pool pour un fichier de credentials (jeton valide)"""
+        with self._lock:
+            if os.getpid() != self._pid:
+                # Process fils : ne pas réutiliser les connexions du parent
+                self._entries = {}
+                self._pid = os.getpid()
+
+            entry = self._entries.get(credentials_file)
+            if entry is None:
+                entry = self._authorize(credentials_file)
+                self._entries[credentials_file] = entry
+
+            self._ensure_fresh(entry.credentials)
+            return entry
+
+    def _authorize(self, credentials_file):
+        """Lit les credentials et crée un client avec une session HTTP persistante"""
+        credentials = Credentials.from_service_account_file(credentials_file, scopes=SCOPES)
+
+        session = AuthorizedSession(credentials)
+        adapter = HTTPAdapter(pool_connections=self.pool_size, pool_maxsize=self.pool_size)
+        session.mount('https://', adapter)
+        # Compte chaque appel d'API (métriques Prometheus)
+        session.hooks['response'].append(metrics.count_google_response)
+
+        self.authorizations += 1
+        return _ClientEntry(credentials, gspread.Client(credentials, session=session))
+
+    def _ensure_fresh(self, credentials):
+        """Rafraîchit le jeton s'il est absent ou proche de l'expiration"""
+        expiry = credentials.expiry
+        if credentials.token is not None and expiry is not None:
+            # google-auth exprime expiry en UTC naïf
+            if expiry - datetime.utcnow() > timedelta(seconds=self.refresh_margin):
+                return
+
+        credentials.refresh(Request())
+        self.refreshes += 1
+
+
+# Instance globale
+google_clients = GoogleClientPool()
@@ -0,0 +1,368 @@
+"""
+Instrumentation légère du chemin de calcul (durées par étape, appels Google API, caches)
+Durées exposées dans l'en-tête Server-Timing des réponses et au format Prometheus sur /metrics
+"""
+
+import bisect
+import functools
+import threading
+import time
+from urllib.parse import urlsplit
+
+from flask import g, has_request_context, request
+
+
+# Bornes des histogrammes de durée (secondes)
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Familles de métriques enregistrées (type, description)
+FAMILIES = {
+    'paradigm_stage_duration_seconds': (
+        'histogram', "Durée des étapes du calcul de courbes"),
+    'paradigm_request_duration_seconds': (
+        'histogram', "Durée des requêtes HTTP par endpoint"),
+    'paradigm_google_api_requests_total': (
+        'counter', "Appels HTTP aux API Google (Sheets, Drive) par API, méthode et statut"),
+    'paradigm_google_api_duration_seconds': (
+        'histogram', "Durée des appels HTTP aux API Google"),
+}
+
+# API Google reconnues d'après l'hôte ou le chemin de l'URL
+GOOGLE_APIS = (
+    ('sheets.googleapis.com', 'sheets'),
+    ('/drive/', 'drive'),
+    ('oauth2', 'oauth'),
+)
+
+
+class _Histogram:
+    """Histogramme cumulatif à bornes fixes (format Prometheus)"""
+
+    __slots__ = ('counts', 'sum', 'count')
+
+    def __init__(self, n_buckets):
+        self.counts = [0] * (n_buckets + 1)
+        self.sum = 0.0
+        self.count = 0
+
+
+class _Timer:
+    """Mesure d'une étape (context manager) ; une étape imbriquée dans elle-même n'est comptée qu'une fois"""
+
+    __slots__ = ('metrics', 'stage', 'start', 'nested')
+
+    def __init__(self, metrics, stage):
+        self.metrics = metrics
+        self.stage = stage
+        self.start = None
+        self.nested = False
+
+    def __enter__(self):
+        if not self.metrics.enabled:
+            return self
+        active = self.metrics._active_stages()
+        if self.stage in active:
+            self.nested = True
+            return self
+        active.add(self.stage)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self.start is None or self.nested:
+            return False
+        duration = time.perf_counter() - self.start
+        self.metrics._active_stages().discard(self.stage)
+        self.metrics.observe_stage(self.stage, duration)
+        return False
+
+
+class Metrics:
+    """
+    Registre des métriques du process
+
+    Les étapes instrumentées (timed / instrument) alimentent un histogramme
+    par étape et, pendant une requête Flask, le cumul (durée, nombre
+    d'appels) renvoyé dans l'en-tête Server-Timing. Les étapes peuvent se
+    chevaucher (ns_fit est inclus dans green_curve).
+
+    Les compteurs des caches et des single-flight sont lus à chaque export
+    (collecteurs), sans coût sur le chemin de calcul. Chaque worker gunicorn
+    a son propre registre ; les calculs exécutés dans le pool de process
+    (calcul univers) ne sont pas comptés.
+    """
+
+    def __init__(self, enabled=True, buckets=DEFAULT_BUCKETS):
+        """
+        Args:
+            enabled: Instrumentation active (sinon timed() ne mesure rien)
+            buckets: Bornes des histogrammes de durée (secondes, croissantes)
+        """
+        self.enabled = enabled
+        self.buckets = tuple(buckets)
+        self.token = None
+        self._histograms = {}
+        self._counters = {}
+        self._collectors = []
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def init_app(self, app):
+        """Configure l'instrumentation et ajoute l'en-tête Server-Timing aux réponses"""
+        self.enabled = app.config.get('METRICS_ENABLED', self.enabled)
+        self.token = app.config.get('METRICS_TOKEN') or None
+
+        if not self.enabled:
+            return
+
+        app.before_request(self._start_request)
+        app.after_request(self._finish_request)
+        self.add_collector(collect_app_stats)
+
+    def timed(self, stage):
+        """
+        Mesure un bloc de code : with metrics.timed('ns_fit'): ...
+
+        Args:
+            stage: Nom de l'étape (label Prometheus et entrée Server-Timing)
+        """
+        return _Timer(self, stage)
+
+    def instrument(self, stage):
+        """Décorateur : mesure chaque appel de la fonction comme l'étape stage"""
+        def decorator(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                with _Timer(self, stage):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def observe_stage(self, stage, duration):
+        """Enregistre la durée d'une étape (histogramme + Server-Timing de la requête)"""
+        self.observe('paradigm_stage_duration_seconds', (('stage', stage),), duration)
+
+        if has_request_context():
+            timings = g.setdefault('server_timing', {})
+            total, calls = timings.get(stage, (0.0, 0))
+            timings[stage] = (total + duration, calls + 1)
+
+    def observe(self, name, labels, value):
+        """
+        Ajoute une observation à un histogramme
+
+        Args:
+            name: Nom de la famille (cf. FAMILIES)
+            labels: Tuple de paires (label, valeur)
+            value: Valeur observée (secondes)
+        """
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            histogram = self._histograms.get((name, labels))
+            if histogram is None:
+                histogram = self._histograms[(name, labels)] = _Histogram(len(self.buckets))
+            histogram.counts[index] += 1
+            histogram.sum += value
+            histogram.count += 1
+
+    def increment(self, name, labels, amount=1):
+        """Incrémente un compteur (name, labels comme observe)"""
+        with self._lock:
+            self._counters[(name, labels)] = self._counters.get((name, labels), 0) + amount
+
+    def count_google_response(self, response, *args, **kwargs):
+        """
+        Hook requests (session HTTP des clients Google) : compte chaque appel d'API
+
+        Branché sur la session partagée par GoogleClientPool : tous les appels
+        gspread (lectures, écritures, métadonnées) passent par ici.
+        """
+        if not self.enabled:
+            return response
+        api = google_api_name(response.url)
+        self.increment('paradigm_google_api_requests_total', (
+            ('api', api),
+            ('method', response.request.method),
+            ('status', str(response.status_code)),
+        ))
+        self.observe('paradigm_google_api_duration_seconds', (('api', api),), response.elapsed.total_seconds())
+        return response
+
+    def add_collector(self, collector):
+        """
+        Ajoute une fonction lue à chaque export
+
+        Le collecteur retourne une liste de (nom, type, description, [(labels, valeur)]).
+        """
+        if collector not in self._collectors:
+            self._collectors.append(collector)
+
+    def render(self):
+        """Export au format texte Prometheus (version 0.0.4)"""
+        with self._lock:
+            histograms = {key: (list(h.counts), h.sum, h.count) for key, h in self._histograms.items()}
+            counters = dict(self._counters)
+
+        lines = []
+        for name, (kind, description) in FAMILIES.items():
+            lines.append(f"# HELP {name} {description}")
+            lines.append(f"# TYPE {name} {kind}")
+            if kind == 'histogram':
+                for (family, labels), (counts, total, count) in sorted(histograms.items()):
+                    if family == name:
+                        lines.extend(self._render_histogram(name, labels, counts, total, count))
+            else:
+                for (family, labels), value in sorted(counters.items()):
+                    if family == name:
+                        lines.append(f"{name}{format_labels(labels)} {format_value(value)}")
+
+        for collector in self._collectors:
+            try:
+                families = collector()
+            except Exception as e:
+                print(f"Erreur collecte des métriques: {e}")
+                continue
+            for name, kind, description, samples in families:
+                lines.append(f"# HELP {name} {description}")
+                lines.append(f"# TYPE {name} {kind}")
+                for labels, value in samples:
+                    if value is not None:
+                        lines.append(f"{name}{format_labels(labels)} {format_value(value)}")
+
+        return '\n'.join(lines) + '\n'
+
+    def reset(self):
+        """Remet à zéro histogrammes et compteurs"""
+        with self._lock:
+            self._histograms = {}
+            self._counters = {}
+
+    def _render_histogram(self, name, labels, counts, total, count):
+        """Lignes _bucket / _sum / _count d'un histogramme"""
+        lines = []
+        cumulative = 0
+        for bound, bucket_count in zip(self.buckets, counts):
+            cumulative += bucket_count
+            bucket_labels = labels + (('le', format_value(bound)),)
+            lines.append(f"{name}_bucket{format_labels(bucket_labels)} {cumulative}")
+        lines.append(f"{name}_bucket{format_labels(labels + (('le', '+Inf'),))} {count}")
+        lines.append(f"{name}_sum{format_labels(labels)} {format_value(total)}")
+        lines.append(f"{name}_count{format_labels(labels)} {count}")
+        return lines
+
+    def _active_stages(self):
+        """Étapes en cours de mesure dans le thread courant"""
+        active = getattr(self._local, 'stages', None)
+        if active is None:
+            active = self._local.stages = set()
+        return active
+
+    def _start_request(self):
+        g.request_start = time.perf_counter()
+
+    def _finish_request(self, response):
+        """Ajoute Server-Timing et mesure la durée de la requête"""
+        start = g.get('request_start')
+        if start is None:
+            return response
+
+        duration = time.perf_counter() - start
+        endpoint = request.endpoint or 'unknown'
+        self.observe('paradigm_request_duration_seconds', (('endpoint', endpoint),), duration)
+
+        entries = [
+            f'{stage};dur={total * 1000:.2f};desc="{calls} appel{"s" if calls > 1 else ""}"'
+            for stage, (total, calls) in g.get('server_timing', {}).items()
+        ]
+        entries.append(f'total;dur={duration * 1000:.2f}')
+        response.headers['Server-Timing'] = ', '.join(entries)
+        return response
+
+
+def google_api_name(url):
+    """API Google d'une URL ('sheets', 'drive', 'oauth' ou l'hôte)"""
+    for marker, name in GOOGLE_APIS:
+        if marker in url:
+            return name
+    return urlsplit(url).hostname or 'unknown'
+
+
+def format_labels(labels):
+    """{label="valeur",...} (chaîne vide sans label)"""
+    if not labels:
+        return ''
+    escaped = (
+        (key, str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for key, value in labels
+    )
+    return '{' + ','.join(f'{key}="{value}"' for key, value in escaped) + '}'
+
+
+def format_value(value):
+    """Valeur numérique au format Prometheus"""
+    if isinstance(value, bool):
+        return '1' if value else '0'
+    if isinstance(value, int):
+        return str(value)
+    return repr(float(value))
+
+
+def collect_app_stats():
+    """
+    Compteurs des caches, single-flight, client Google et file de jobs
+
+    Lus à chaque export depuis les stats() des instances globales.
+    """
+    from app.google_client import google_clients
+    from app.models.user_repository import user_repository
+    from app.pricing.curve_store import curve_store
+    from app.pricing.jobs import job_queue
+    from app.pricing.result_cache import result_cache
+    from app.pricing.snapshot import market_data_cache
+    from app.singleflight import single_flight_stats
+
+    caches = {
+        'result': result_cache.stats(),
+        'users': user_repository.stats(),
+        'market_data': market_data_cache.stats(),
+        'curve_store': curve_store.stats(),
+    }
+    hits = [((('cache', name),), stats['hits']) for name, stats in caches.items()]
+    misses = [((('cache', name),), stats['misses']) for name, stats in caches.items()]
+    ratios = [
+        ((('cache', name),), stats['hits'] / (stats['hits'] + stats['misses']))
+        for name, stats in caches.items()
+        if stats['hits'] + stats['misses']
+    ]
+
+    flights = single_flight_stats()
+    clients = google_clients.stats()
+    jobs = job_queue.stats()
+
+    return [
+        ('paradigm_cache_hits_total', 'counter', "Lectures servies par le cache", hits),
+        ('paradigm_cache_misses_total', 'counter', "Lectures absentes du cache", misses),
+        ('paradigm_cache_hit_ratio', 'gauge', "Taux de succès du cache depuis le démarrage", ratios),
+        ('paradigm_cache_entries', 'gauge', "Entrées du cache des réponses de courbes", [
+            ((('cache', 'result'),), caches['result']['entries']),
+        ]),
+        ('paradigm_single_flight_calls_total', 'counter', "Appels passés par un single-flight", [
+            ((('name', name),), stats['calls']) for name, stats in flights.items()
+        ]),
+        ('paradigm_single_flight_coalesced_total', 'counter', "Appels regroupés sur un appel en cours", [
+            ((('name', name),), stats['coalesced']) for name, stats in flights.items()
+        ]),
+        ('paradigm_google_authorizations_total', 'counter', "Clients Google autorisés", [
+            ((), clients['authorizations']),
+        ]),
+        ('paradigm_google_token_refreshes_total', 'counter', "Jetons d'accès Google rafraîchis", [
+            ((), clients['refreshes']),
+        ]),
+        ('paradigm_jobs', 'gauge', "Jobs de calcul par statut", [
+            ((('status', status),), jobs[status]) for status in ('pending', 'running', 'done', 'error')
+        ]),
+    ]
+
+
+# Instance globale
+metrics = Metrics()
@@ -16,7 +16,7 @@ class PricingData:
     @staticmethod
     def get_by_user(user_id):
         """Récupérer tous les calculs d'un utilisateur"""
-        records = sheets_manager.get_all_records('pricing_data')
+        records = sheets_manager.find_rows('pricing_data', 'user_id', user_id)
         user_data = []
 
         for record in records:
@@ -48,9 +48,7 @@ class PricingData:
         return None
 
     def save(self):
-        """Sauvegarder dans Google Sheets"""
-        row_num, existing = sheets_manager.find_row('pricing_data', 'id', self.id)
-
+        """Sauvegarder dans Google Sheets (écriture différée si SHEETS_WRITE_BEHIND)"""
         values = [
             self.id,
             self.user_id,
@@ -60,14 +58,11 @@ class PricingData:
             self.created_at
         ]
 
-        if row_num:
-            sheets_manager.update_row('pricing_data', row_num, values)
-        else:
-            sheet = sheets_manager.get_sheet('pricing_data')
-            # Vérifier si c'est la première ligne (headers)
-            if sheet.row_count == 0 or sheet.row_values(1) == []:
-                sheet.append_row(['id', 'user_id', 'name', 'parameters', 'results', 'created_at'])
-            sheets_manager.append_row('pricing_data', values)
+        sheets_manager.upsert_row(
+            'pricing_data', self.id, values,
+            headers=['id', 'user_id', 'name', 'parameters', 'results', 'created_at'],
+            buffered=True
+        )
 
     @staticmethod
     def create(user_id, name, parameters):
@@ -1,63 +1,109 @@
+import atexit
+import re
+import threading
+import time
+
 import gspread
-from google.oauth2.service_account import Credentials
+from gspread.utils import rowcol_to_a1
 from flask import current_app
 
-class GoogleSheetsManager:
+from app.google_client import google_clients
+from app.models.storage import StorageBackend, StorageManager
+from app.singleflight import SingleFlight
+
+# Ligne de destination dans la réponse d'append (ex: "'users'!A12:D12")
+_UPDATED_ROW = re.compile(r'![A-Z]+(\d+)')
+
+
+class GoogleSheetsManager(StorageBackend):
     """Gestionnaire pour interagir avec Google Sheets"""
 
     def __init__(self):
-        self.client = None
+        self.credentials_file = None
+        self.sheet_name = None
         self.spreadsheet = None
+        # Index id (colonne A) -> numéro de ligne, par feuille
+        self._row_index = {}
+        self._row_index_expires = {}
+        self.row_index_ttl = 300
+        # Écriture différée (write-behind) : délai en secondes, 0 = désactivée
+        self.write_behind_delay = 0
+        self._pending = {}
+        self._flush_timer = None
+        # _lock protège l'état en mémoire (jamais tenu pendant un appel réseau) ;
+        # un verrou par feuille ordonne les écritures réseau sur cette feuille
+        self._lock = threading.RLock()
+        self._sheet_locks = {}
+        # Incrémenté à chaque ajout de lignes : un index relu pendant un ajout n'est pas conservé
+        self._index_generation = {}
+        self._atexit_registered = False
+        # Lectures concurrentes d'une même feuille regroupées
+        self._reads = SingleFlight('sheets_reads')
 
-    def connect(self):
-        """Se connecter à Google Sheets"""
-        if self.client is None:
-            # Définir les scopes nécessaires
-            scopes = [
-                'https://www.googleapis.com/auth/spreadsheets',
-                'https://www.googleapis.com/auth/drive'
-            ]
-
-            # Charger les credentials
-            creds = Credentials.from_service_account_file(
-                current_app.config['GOOGLE_CREDENTIALS_FILE'],
-                scopes=scopes
-            )
-
-            # Créer le client
-            self.client = gspread.authorize(creds)
+    def init_app(self, app):
+        """Configure le gestionnaire depuis la configuration Flask"""
+        self.credentials_file = app.config.get('GOOGLE_CREDENTIALS_FILE')
+        self.sheet_name = app.config.get('GOOGLE_SHEET_NAME')
+        self.row_index_ttl = app.config.get('SHEETS_ROW_INDEX_TTL', self.row_index_ttl)
+        self.write_behind_delay = app.config.get('SHEETS_WRITE_BEHIND', self.write_behind_delay)
 
-            # Ouvrir le spreadsheet
-            self.spreadsheet = self.client.open(current_app.config['GOOGLE_SHEET_NAME'])
+    def connect(self):
+        """Se connecter à Google Sheets (client partagé du process, cf. google_clients)"""
+        if self.credentials_file is None:
+            self.credentials_file = current_app.config['GOOGLE_CREDENTIALS_FILE']
+            self.sheet_name = current_app.config['GOOGLE_SHEET_NAME']
 
+        # Le pool rafraîchit le jeton et réutilise le handle du classeur
+        self.spreadsheet = google_clients.open(self.credentials_file, self.sheet_name)
         return self.spreadsheet
 
     def get_sheet(self, sheet_name):
         """Récupérer une feuille spécifique"""
-        if self.spreadsheet is None:
-            self.connect()
+        spreadsheet = self.connect()
 
         try:
-            return self.spreadsheet.worksheet(sheet_name)
+            return google_clients.worksheet(self.credentials_file, spreadsheet, sheet_name)
         except gspread.WorksheetNotFound:
             # Créer la feuille si elle n'existe pas
-            return self.spreadsheet.add_worksheet(title=sheet_name, rows="1000", cols="20")
+            return spreadsheet.add_worksheet(title=sheet_name, rows="1000", cols="20")
 
     def get_all_records(self, sheet_name):
-        """Récupérer tous les enregistrements d'une feuille"""
+        """
+        Récupérer tous les enregistrements d'une feuille
+
+        Les lectures concurrentes d'une même feuille partagent un seul appel
+        (single-flight) : la liste retournée ne doit pas être modifiée.
+        """
+        return self._reads.do(sheet_name, self._get_all_records, sheet_name)
+
+    def _get_all_records(self, sheet_name):
+        """Lecture effective d'une feuille"""
+        # Les écritures différées de cette feuille doivent être visibles ; en cas
+        # d'échec elles restent en attente et la lecture se fait sans elles
+        try:
+            self.flush(sheet_name)
+        except Exception:
+            pass
         sheet = self.get_sheet(sheet_name)
         return sheet.get_all_records()
 
     def append_row(self, sheet_name, values):
         """Ajouter une ligne à une feuille"""
-        sheet = self.get_sheet(sheet_name)
-        return sheet.append_row(values)
+        with self._sheet_lock(sheet_name):
+            sheet = self.get_sheet(sheet_name)
+            response = sheet.append_row(values)
+            self._index_appended(sheet_name, [values], response)
+            return response
 
     def update_row(self, sheet_name, row_number, values):
-        """Mettre à jour une ligne"""
-        sheet = self.get_sheet(sheet_name)
-        for col_idx, value in enumerate(values, start=1):
-            sheet.update_cell(row_number, col_idx, value)
+        """Mettre à jour une ligne (un seul appel API pour toute la plage)"""
+        with self._sheet_lock(sheet_name):
+            sheet = self.get_sheet(sheet_name)
+            sheet.update(
+                range_name=rowcol_to_a1(row_number, 1),
+                values=[list(values)],
+                value_input_option='USER_ENTERED'
+            )
 
     def find_row(self, sheet_name, column_name, value):
         """Trouver une ligne par valeur de colonne"""
@@ -67,5 +113,203 @@ class GoogleSheetsManager:
                 return idx, record
         return None, None
 
-# Instance globale
-sheets_manager = GoogleSheetsManager()
+    def find_row_number(self, sheet_name, key):
+        """
+        Numéro de ligne d'un id (colonne A), sans télécharger la feuille
+
+        L'index est construit à partir de la seule colonne A puis tenu à jour
+        par append_row / upsert_row. Il suppose que les lignes ne sont ni
+        supprimées ni triées (l'application ne fait qu'ajouter et mettre à
+        jour) ; il est relu après row_index_ttl secondes.
+
+        Returns:
+            Numéro de ligne, ou None si l'id est absent
+        """
+        return self._get_row_index(sheet_name)['rows'].get(str(key))
+
+    def upsert_row(self, sheet_name, key, values, headers=None, buffered=False):
+        """
+        Met à jour la ligne d'un id (colonne A) ou l'ajoute si elle n'existe pas
+
+        Args:
+            sheet_name: Nom de la feuille
+            key: Id de la ligne (première valeur de values)
+            values: Valeurs de la ligne
+            headers: En-têtes écrits si la feuille est vide
+            buffered: Écriture différée si le write-behind est activé
+                      (regroupée avec les autres écritures dans un seul appel)
+        """
+        if buffered and self.write_behind_delay > 0:
+            self._buffer(sheet_name, key, values, headers)
+            return
+
+        with self._sheet_lock(sheet_name):
+            row_number = self.find_row_number(sheet_name, key)
+            if row_number:
+                self.update_row(sheet_name, row_number, values)
+            else:
+                if headers and self._get_row_index(sheet_name)['count'] == 0:
+                    self.append_row(sheet_name, headers)
+                self.append_row(sheet_name, values)
+
+    def flush(self, sheet_name=None):
+        """
+        Écrit les lignes en attente (write-behind)
+
+        Une mise à jour par plage pour les lignes existantes (batch_update) et
+        un seul append pour les nouvelles lignes, par feuille. Les appels
+        réseau se font hors du verrou principal : les sauvegardes continuent
+        d'être mises en attente pendant l'écriture.
+
+        Args:
+            sheet_name: Feuille à écrire (défaut: toutes)
+
+        Raises:
+            Exception: Échec de l'écriture (les lignes sont remises en attente)
+        """
+        with self._lock:
+            names = [sheet_name] if sheet_name is not None else list(self._pending)
+
+        for name in names:
+            with self._sheet_lock(name):
+                with self._lock:
+                    pending = self._pending.pop(name, None)
+                if not pending:
+                    continue
+                try:
+                    self._write_batch(name, pending)
+                except Exception as e:
+                    print(f"Erreur écriture différée {name}: {e}")
+                    # Remettre les lignes en attente (sans écraser les plus récentes)
+                    with self._lock:
+                        self._pending[name] = dict(pending, **self._pending.get(name, {}))
+                    raise
+
+    def replace_all(self, sheet_name, headers, rows):
+        """
+        Remplace tout le contenu d'une feuille (synchronisation depuis SQLite)
+
+        Écrit d'abord les nouvelles valeurs puis efface les lignes restantes :
+        un lecteur ne voit jamais la feuille vide.
+        """
+        with self._sheet_lock(sheet_name):
+            sheet = self.get_sheet(sheet_name)
+            values = [list(headers)] + [list(row) for row in rows]
+
+            if len(values) > sheet.row_count:
+                sheet.resize(rows=len(values))
+            sheet.update(range_name='A1', values=values, value_input_option='RAW')
+            if sheet.row_count > len(values):
+                sheet.batch_clear([f'{len(values) + 1}:{sheet.row_count}'])
+
+            with self._lock:
+                self._row_index.pop(sheet_name, None)
+                self._index_generation[sheet_name] = self._index_generation.get(sheet_name, 0) + 1
+
+    def _buffer(self, sheet_name, key, values, headers):
+        """Met une ligne en attente ; plusieurs sauvegardes du même id n'en font qu'une"""
+        with self._lock:
+            self._pending.setdefault(sheet_name, {})[str(key)] = (list(values), headers)
+            self._schedule_flush()
+
+            if not self._atexit_registered:
+                atexit.register(self._flush_quietly)
+                self._atexit_registered = True
+
+    def _schedule_flush(self):
+        """Arme le timer du write-behind s'il ne l'est pas (appelé sous verrou)"""
+        if self._flush_timer is None:
+            self._flush_timer = threading.Timer(self.write_behind_delay, self._flush_in_background)
+            self._flush_timer.daemon = True
+            self._flush_timer.start()
+
+    def _flush_in_background(self):
+        """Écriture déclenchée par le timer du write-behind (réarmé si des lignes restent en attente)"""
+        with self._lock:
+            self._flush_timer = None
+        self._flush_quietly()
+        with self._lock:
+            if any(self._pending.values()):
+                self._schedule_flush()
+
+    def _flush_quietly(self):
+        try:
+            self.flush()
+        except Exception:
+            pass
+
+    def _write_batch(self, sheet_name, pending):
+        """Écrit un lot {id: (valeurs, en-têtes)} dans une feuille"""
+        sheet = self.get_sheet(sheet_name)
+        index = self._get_row_index(sheet_name)
+
+        updates = []
+        appends = []
+        headers = None
+        for key, (values, row_headers) in pending.items():
+            row_number = index['rows'].get(key)
+            if row_number:
+                updates.append({'range': rowcol_to_a1(row_number, 1), 'values': [values]})
+            else:
+                appends.append(values)
+                headers = headers or row_headers
+
+        if updates:
+            sheet.batch_update(updates, value_input_option='USER_ENTERED')
+        if appends:
+            if headers and index['count'] == 0:
+                appends.insert(0, headers)
+            response = sheet.append_rows(appends)
+            self._index_appended(sheet_name, appends, response)
+
+    def _sheet_lock(self, sheet_name):
+        """Verrou des écritures réseau d'une feuille"""
+        with self._lock:
+            return self._sheet_locks.setdefault(sheet_name, threading.RLock())
+
+    def _get_row_index(self, sheet_name):
+        """Index {'rows': {id: ligne}, 'count': lignes occupées} d'une feuille"""
+        with self._lock:
+            index = self._row_index.get(sheet_name)
+            if index is not None and time.monotonic() < self._row_index_expires[sheet_name]:
+                return index
+            generation = self._index_generation.get(sheet_name, 0)
+
+        column = self.get_sheet(sheet_name).col_values(1)
+        rows = {}
+        for row_number, value in enumerate(column[1:], start=2):  # ligne 1 = headers
+            if value not in (None, ''):
+                rows.setdefault(str(value), row_number)
+        index = {'rows': rows, 'count': len(column)}
+
+        with self._lock:
+            # Lignes ajoutées pendant la lecture : index à relire au prochain accès
+            if self._index_generation.get(sheet_name, 0) == generation:
+                self._row_index[sheet_name] = index
+                self._row_index_expires[sheet_name] = time.monotonic() + self.row_index_ttl
+        return index
+
+    def _index_appended(self, sheet_name, rows, response):
+        """Ajoute à l'index les lignes écrites par un append (ligne lue dans la réponse)"""
+        with self._lock:
+            self._index_generation[sheet_name] = self._index_generation.get(sheet_name, 0) + 1
+            index = self._row_index.get(sheet_name)
+            if index is None:
+                return
+
+            updated_range = ((response or {}).get('updates') or {}).get('updatedRange', '')
+            match = _UPDATED_ROW.search(updated_range)
+            if match is None:
+                # Ligne de destination inconnue : relire la colonne A au prochain accès
+                del self._row_index[sheet_name]
+                return
+
+            first_row = int(match.group(1))
+            for offset, values in enumerate(rows):
+                if first_row + offset > 1 and values:
+                    index['rows'].setdefault(str(values[0]), first_row + offset)
+            index['count'] = max(index['count'], first_row + len(rows) - 1)
+
+
+# Instance globale (backend Google Sheets par défaut, SQLite si STORAGE_BACKEND=sqlite)
+sheets_manager = StorageManager(GoogleSheetsManager())
@@ -0,0 +1,460 @@
+"""
+Backends de stockage des feuilles users / pricing_data
+Google Sheets (historique) ou SQLite local indexé, derrière la même interface (sheets_manager)
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows : pas de flock, synchronisations non exclusives entre process
+    fcntl = None
+
+
+# Schéma des feuilles : colonnes (la première est l'id) et colonnes indexées
+SCHEMAS = {
+    'users': {
+        'columns': ['id', 'email', 'username', 'password_hash'],
+        'indexes': ['email'],
+    },
+    'pricing_data': {
+        'columns': ['id', 'user_id', 'name', 'parameters', 'results', 'created_at'],
+        'indexes': ['user_id'],
+    },
+}
+
+
+class StorageBackend:
+    """
+    Interface commune des backends de stockage
+
+    Les enregistrements sont des dicts {colonne: valeur} ; une ligne est
+    identifiée par un numéro opaque (numéro de ligne du Google Sheet, rowid
+    SQLite) retourné par find_row / find_row_number.
+    """
+
+    def init_app(self, app):
+        """Configure le backend depuis la configuration Flask"""
+
+    def get_all_records(self, sheet_name):
+        """Tous les enregistrements d'une feuille, dans l'ordre d'insertion"""
+        raise NotImplementedError
+
+    def append_row(self, sheet_name, values):
+        """Ajoute une ligne"""
+        raise NotImplementedError
+
+    def update_row(self, sheet_name, row_number, values):
+        """Remplace les valeurs d'une ligne"""
+        raise NotImplementedError
+
+    def find_row(self, sheet_name, column_name, value):
+        """Première ligne dont la colonne vaut value : (numéro de ligne, dict) ou (None, None)"""
+        raise NotImplementedError
+
+    def find_rows(self, sheet_name, column_name, value):
+        """Tous les enregistrements dont la colonne vaut value"""
+        return [record for record in self.get_all_records(sheet_name) if record.get(column_name) == value]
+
+    def find_row_number(self, sheet_name, key):
+        """Numéro de ligne d'un id, ou None"""
+        raise NotImplementedError
+
+    def upsert_row(self, sheet_name, key, values, headers=None, buffered=False):
+        """Met à jour la ligne d'un id ou l'ajoute"""
+        raise NotImplementedError
+
+    def flush(self, sheet_name=None):
+        """Écrit les écritures différées (sans effet si le backend n'en a pas)"""
+
+
+class SQLiteBackend(StorageBackend):
+    """
+    Backend SQLite local : une table par feuille, index sur id, email et user_id
+
+    Les recherches sont des requêtes indexées sans accès réseau. Une
+    connexion par thread ; le journal WAL permet plusieurs workers gunicorn
+    sur le même fichier. Chaque écriture incrémente un compteur (table
+    _meta) utilisé par la synchronisation vers Google Sheets ; la dernière
+    version synchronisée y est aussi enregistrée, et un verrou fichier
+    (<base>.sync.lock) réserve la synchronisation à un seul process.
+    """
+
+    def __init__(self, path='instance/storage.db'):
+        """
+        Args:
+            path: Fichier de la base SQLite
+        """
+        self.path = path
+        self._local = threading.local()
+        self._initialized = False
+        self._init_lock = threading.Lock()
+
+    def get_all_records(self, sheet_name):
+        columns = self._columns(sheet_name)
+        rows = self._connection().execute(
+            f"SELECT {', '.join(columns)} FROM {sheet_name} ORDER BY rowid"
+        ).fetchall()
+        return [dict(row) for row in rows]
+
+    def append_row(self, sheet_name, values):
+        columns = self._columns(sheet_name)
+        with self._connection() as conn:
+            conn.execute(
+                f"INSERT INTO {sheet_name} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})",
+                self._row_values(columns, values)
+            )
+            self._bump_version(conn)
+
+    def update_row(self, sheet_name, row_number, values):
+        columns = self._columns(sheet_name)
+        with self._connection() as conn:
+            conn.execute(
+                f"UPDATE {sheet_name} SET {', '.join(f'{c} = ?' for c in columns)} WHERE rowid = ?",
+                self._row_values(columns, values) + [row_number]
+            )
+            self._bump_version(conn)
+
+    def find_row(self, sheet_name, column_name, value):
+        columns = self._columns(sheet_name, column_name)
+        row = self._connection().execute(
+            f"SELECT rowid, {', '.join(columns)} FROM {sheet_name} WHERE {column_name} = ? ORDER BY rowid LIMIT 1",
+            (value,)
+        ).fetchone()
+        if row is None:
+            return None, None
+        record = dict(row)
+        return record.pop('rowid'), record
+
+    def find_rows(self, sheet_name, column_name, value):
+        columns = self._columns(sheet_name, column_name)
+        rows = self._connection().execute(
+            f"SELECT {', '.join(columns)} FROM {sheet_name} WHERE {column_name} = ? ORDER BY rowid",
+            (value,)
+        ).fetchall()
+        return [dict(row) for row in rows]
+
+    def find_row_number(self, sheet_name, key):
+        row_number, _ = self.find_row(sheet_name, 'id', key)
+        return row_number
+
+    def upsert_row(self, sheet_name, key, values, headers=None, buffered=False):
+        """Insertion ou mise à jour en une requête (les écritures locales ne sont jamais différées)"""
+        columns = self._columns(sheet_name)
+        with self._connection() as conn:
+            conn.execute(
+                f"INSERT INTO {sheet_name} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))}) "
+                f"ON CONFLICT(id) DO UPDATE SET {', '.join(f'{c} = excluded.{c}' for c in columns[1:])}",
+                self._row_values(columns, values)
+            )
+            self._bump_version(conn)
+
+    def replace_all(self, sheet_name, records):
+        """Remplace tout le contenu d'une feuille (import depuis Google Sheets)"""
+        columns = self._columns(sheet_name)
+        with self._connection() as conn:
+            conn.execute(f"DELETE FROM {sheet_name}")
+            conn.executemany(
+                f"INSERT OR REPLACE INTO {sheet_name} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})",
+                [[_to_text(record.get(c)) for c in columns] for record in records if record.get('id') not in (None, '')]
+            )
+            self._bump_version(conn)
+
+    def merge_records(self, sheet_name, records):
+        """Ajoute les enregistrements dont l'id est absent (les lignes locales sont conservées)"""
+        columns = self._columns(sheet_name)
+        with self._connection() as conn:
+            conn.executemany(
+                f"INSERT OR IGNORE INTO {sheet_name} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})",
+                [[_to_text(record.get(c)) for c in columns] for record in records if record.get('id') not in (None, '')]
+            )
+
+    def imported(self):
+        """True si le contenu de Google Sheets a déjà été chargé dans cette base"""
+        return bool(self._meta('imported'))
+
+    def mark_imported(self):
+        """Enregistre l'import depuis Google Sheets (condition de la synchronisation inverse)"""
+        with self._connection() as conn:
+            conn.execute("INSERT OR REPLACE INTO _meta (key, value) VALUES ('imported', 1)")
+
+    def data_version(self):
+        """Compteur d'écritures (toutes connexions et tous process confondus)"""
+        return self._meta('version')
+
+    def synced_version(self):
+        """Compteur d'écritures au moment de la dernière synchronisation vers Google Sheets"""
+        return self._meta('synced_version')
+
+    def mark_synced(self, version):
+        """Enregistre la version recopiée dans Google Sheets (sans compter comme une écriture)"""
+        with self._connection() as conn:
+            conn.execute("INSERT OR REPLACE INTO _meta (key, value) VALUES ('synced_version', ?)", (version,))
+
+    @contextmanager
+    def sync_lock(self, blocking=True):
+        """
+        Verrou de synchronisation partagé par les process utilisant cette base
+
+        Args:
+            blocking: Attendre le verrou plutôt que d'y renoncer
+
+        Yields:
+            True si le verrou est obtenu
+        """
+        if fcntl is None:
+            yield True
+            return
+
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        fd = os.open(os.path.abspath(self.path) + '.sync.lock', os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                yield False
+                return
+            yield True
+        finally:
+            os.close(fd)  # libère le verrou
+
+    def _meta(self, key):
+        row = self._connection().execute("SELECT value FROM _meta WHERE key = ?", (key,)).fetchone()
+        return row['value'] if row is not None else 0
+
+    def _connection(self):
+        """Connexion SQLite du thread courant (schéma créé au premier accès)"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            directory = os.path.dirname(os.path.abspath(self.path))
+            os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+
+        if not self._initialized:
+            with self._init_lock:
+                if not self._initialized:
+                    self._create_schema(conn)
+                    self._initialized = True
+        return conn
+
+    def _create_schema(self, conn):
+        with conn:
+            for sheet_name, schema in SCHEMAS.items():
+                columns = schema['columns']
+                conn.execute(
+                    f"CREATE TABLE IF NOT EXISTS {sheet_name} "
+                    f"({columns[0]} TEXT PRIMARY KEY, {', '.join(f'{c} TEXT' for c in columns[1:])})"
+                )
+                for column in schema['indexes']:
+                    conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{sheet_name}_{column} ON {sheet_name} ({column})")
+            conn.execute("CREATE TABLE IF NOT EXISTS _meta (key TEXT PRIMARY KEY, value INTEGER)")
+            conn.execute("INSERT OR IGNORE INTO _meta (key, value) VALUES ('version', 0)")
+
+    def _bump_version(self, conn):
+        conn.execute("UPDATE _meta SET value = value + 1 WHERE key = 'version'")
+
+    def _columns(self, sheet_name, column_name=None):
+        """Colonnes d'une feuille connue (les noms sont interpolés dans le SQL)"""
+        schema = SCHEMAS.get(sheet_name)
+        if schema is None:
+            raise ValueError(f"Feuille inconnue: {sheet_name}")
+        if column_name is not None and column_name not in schema['columns']:
+            raise ValueError(f"Colonne inconnue: {sheet_name}.{column_name}")
+        return schema['columns']
+
+    @staticmethod
+    def _row_values(columns, values):
+        values = [_to_text(v) for v in values][:len(columns)]
+        return values + [''] * (len(columns) - len(values))
+
+
+class StorageManager:
+    """
+    Point d'accès unique au stockage (instance globale sheets_manager)
+
+    Délègue au backend choisi par STORAGE_BACKEND : 'sheets' (défaut,
+    Google Sheets) ou 'sqlite' (STORAGE_SQLITE_PATH). Avec SQLite, une
+    synchronisation vers Google Sheets peut tourner en arrière-plan toutes
+    les STORAGE_SYNC_INTERVAL secondes (ou via flask storage sync-sheets)
+    pour les utilisateurs qui lisent le classeur.
+
+    Le thread de synchronisation démarre à la première requête servie par
+    un process (jamais dans le master gunicorn, qui forke les workers) ;
+    chaque worker a le sien, mais le verrou fichier de la base n'en laisse
+    qu'un synchroniser à la fois, et seulement si la base a changé depuis la
+    dernière synchronisation (tous process confondus).
+
+    La synchronisation remplace le contenu des feuilles : elle est refusée
+    tant que la base n'a pas reçu le contenu de Google Sheets (import
+    enregistré dans _meta). Sur une base neuve (disque éphémère), le thread
+    de synchronisation commence donc par fusionner les feuilles dans la
+    base, les lignes déjà écrites localement étant conservées.
+    """
+
+    def __init__(self, sheets_backend):
+        """
+        Args:
+            sheets_backend: Backend Google Sheets (utilisé par défaut et comme cible de synchronisation)
+        """
+        self.sheets = sheets_backend
+        self.backend = sheets_backend
+        self._sync_pid = None
+        self._sync_lock = threading.Lock()
+
+    def init_app(self, app):
+        """Choisit et configure le backend depuis la configuration Flask"""
+        self.sheets.init_app(app)
+
+        if app.config.get('STORAGE_BACKEND', 'sheets') == 'sqlite':
+            self.backend = SQLiteBackend(app.config.get('STORAGE_SQLITE_PATH', 'instance/storage.db'))
+            interval = app.config.get('STORAGE_SYNC_INTERVAL', 0)
+            if interval > 0:
+                app.before_request(lambda: self._start_sync(app, interval))
+        else:
+            self.backend = self.sheets
+
+    @property
+    def is_local(self):
+        """True si le backend courant est SQLite"""
+        return isinstance(self.backend, SQLiteBackend)
+
+    def get_all_records(self, sheet_name):
+        return self.backend.get_all_records(sheet_name)
+
+    def append_row(self, sheet_name, values):
+        return self.backend.append_row(sheet_name, values)
+
+    def update_row(self, sheet_name, row_number, values):
+        return self.backend.update_row(sheet_name, row_number, values)
+
+    def find_row(self, sheet_name, column_name, value):
+        return self.backend.find_row(sheet_name, column_name, value)
+
+    def find_rows(self, sheet_name, column_name, value):
+        return self.backend.find_rows(sheet_name, column_name, value)
+
+    def find_row_number(self, sheet_name, key):
+        return self.backend.find_row_number(sheet_name, key)
+
+    def upsert_row(self, sheet_name, key, values, headers=None, buffered=False):
+        return self.backend.upsert_row(sheet_name, key, values, headers=headers, buffered=buffered)
+
+    def flush(self, sheet_name=None):
+        return self.backend.flush(sheet_name)
+
+    def sync_to_sheets(self, only_if_changed=False, blocking=True):
+        """
+        Recopie les tables SQLite dans Google Sheets (sous le verrou de synchronisation)
+
+        Args:
+            only_if_changed: Ne rien faire si la base n'a pas changé depuis la dernière synchronisation
+            blocking: Attendre une synchronisation en cours dans un autre process (sinon y renoncer)
+
+        Returns:
+            Dict {feuille: nombre de lignes écrites}, ou None si rien n'a été fait
+        """
+        if not self.is_local:
+            raise RuntimeError("La synchronisation nécessite STORAGE_BACKEND=sqlite")
+
+        with self.backend.sync_lock(blocking=blocking) as acquired:
+            if not acquired:
+                return None
+
+            # Une base jamais importée écraserait les feuilles avec ses seules lignes locales
+            if not self.backend.imported():
+                raise RuntimeError(
+                    "Base SQLite jamais importée depuis Google Sheets : synchronisation refusée "
+                    "(cf. flask storage import-sheets)"
+                )
+
+            # Lu avant la copie : une écriture pendant la copie déclenchera la suivante
+            version = self.backend.data_version()
+            if only_if_changed and version == self.backend.synced_version():
+                return None
+
+            counts = {}
+            for sheet_name, schema in SCHEMAS.items():
+                columns = schema['columns']
+                rows = [[record[c] for c in columns] for record in self.backend.get_all_records(sheet_name)]
+                self.sheets.replace_all(sheet_name, columns, rows)
+                counts[sheet_name] = len(rows)
+
+            self.backend.mark_synced(version)
+            return counts
+
+    def import_from_sheets(self, merge=False):
+        """
+        Charge le contenu de Google Sheets dans SQLite (sous le verrou de synchronisation)
+
+        Args:
+            merge: Ajouter seulement les ids absents de la base (sinon remplacer les tables)
+
+        Returns:
+            Dict {feuille: nombre de lignes lues dans Google Sheets}
+        """
+        if not self.is_local:
+            raise RuntimeError("L'import nécessite STORAGE_BACKEND=sqlite")
+
+        with self.backend.sync_lock(blocking=True):
+            counts = {}
+            for sheet_name in SCHEMAS:
+                records = self.sheets.get_all_records(sheet_name)
+                if merge:
+                    self.backend.merge_records(sheet_name, records)
+                else:
+                    self.backend.replace_all(sheet_name, records)
+                counts[sheet_name] = len(records)
+
+            self.backend.mark_imported()
+            return counts
+
+    def _start_sync(self, app, interval):
+        """Démarre le thread de synchronisation du process courant (appelé avant chaque requête)"""
+        pid = os.getpid()
+        if self._sync_pid == pid:
+            return
+
+        with self._sync_lock:
+            if self._sync_pid == pid:
+                return
+            threading.Thread(
+                target=self._sync_loop, args=(app, interval), daemon=True, name='storage-sync'
+            ).start()
+            self._sync_pid = pid
+
+    def _sync_loop(self, app, interval):
+        """
+        Synchronisation périodique (thread d'arrière-plan), seulement si la base a changé
+
+        Une base jamais importée reçoit d'abord le contenu de Google Sheets
+        (fusion), retentée à chaque tour en cas d'échec.
+        """
+        while True:
+            try:
+                with app.app_context():
+                    if not self.backend.imported():
+                        counts = self.import_from_sheets(merge=True)
+                        print(f"Base SQLite initialisée depuis Google Sheets: {counts}")
+            except Exception as e:
+                print(f"Erreur import Google Sheets: {e}")
+
+            time.sleep(interval)
+            try:
+                with app.app_context():
+                    if self.backend.imported():
+                        self.sync_to_sheets(only_if_changed=True, blocking=False)
+            except Exception as e:
+                print(f"Erreur synchronisation Google Sheets: {e}")
+
+
+def _to_text(value):
+    """Valeur stockée en TEXT (None -> '')"""
+    return '' if value is None else str(value)
@@ -1,6 +1,7 @@
 from flask_login import UserMixin
 from werkzeug.security import generate_password_hash, check_password_hash
 from app.models.sheets import sheets_manager
+from app.models.user_repository import user_repository
 
 class User(UserMixin):
     """Modèle utilisateur"""
@@ -22,7 +23,7 @@ class User(UserMixin):
     @staticmethod
     def get_by_id(user_id):
         """Récupérer un utilisateur par son ID"""
-        row_num, user_data = sheets_manager.find_row('users', 'id', user_id)
+        row_num, user_data = user_repository.get_by_id(user_id)
         if user_data:
             return User(
                 id=user_data['id'],
@@ -35,7 +36,7 @@ class User(UserMixin):
     @staticmethod
     def get_by_email(email):
         """Récupérer un utilisateur par son email"""
-        row_num, user_data = sheets_manager.find_row('users', 'email', email)
+        row_num, user_data = user_repository.get_by_email(email)
         if user_data:
             return User(
                 id=user_data['id'],
@@ -47,21 +48,16 @@ class User(UserMixin):
 
     def save(self):
         """Sauvegarder l'utilisateur dans Google Sheets"""
-        # Vérifier si l'utilisateur existe déjà
-        row_num, existing_user = sheets_manager.find_row('users', 'id', self.id)
-
         values = [self.id, self.email, self.username, self.password_hash]
 
-        if row_num:
-            # Mettre à jour
-            sheets_manager.update_row('users', row_num, values)
-        else:
-            # Créer
-            sheet = sheets_manager.get_sheet('users')
-            # Vérifier si c'est la première ligne (headers)
-            if sheet.row_count == 0 or sheet.row_values(1) == []:
-                sheet.append_row(['id', 'email', 'username', 'password_hash'])
-            sheets_manager.append_row('users', values)
+        # Mise à jour si l'id existe déjà, sinon création (en-têtes si feuille vide)
+        sheets_manager.upsert_row(
+            'users', self.id, values,
+            headers=['id', 'email', 'username', 'password_hash']
+        )
+
+        # L'index des utilisateurs doit voir l'écriture
+        user_repository.invalidate()
 
     @staticmethod
     def create_user(email, username, password):
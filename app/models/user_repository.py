@@ -0,0 +1,142 @@
+"""
+Dépôt des utilisateurs : feuille 'users' chargée une fois et indexée en mémoire
+Évite de télécharger toute la feuille à chaque requête authentifiée (load_user)
+"""
+
+import threading
+import time
+
+from app.models.sheets import sheets_manager
+
+
+USERS_SHEET = 'users'
+
+
+class UserRepository:
+    """
+    Index en mémoire de la feuille 'users' (par id et par email)
+
+    La feuille est lue en une fois puis indexée ; les recherches suivantes
+    sont de simples accès dict. L'index expire après ttl secondes (pour voir
+    les modifications faites par un autre process ou directement dans la
+    feuille) et est invalidé à chaque écriture de ce process.
+
+    Une recherche infructueuse recharge la feuille, au plus une fois toutes
+    les miss_reload_interval secondes : un compte créé par un autre worker
+    est trouvé sans attendre le TTL, sans qu'un id inconnu puisse provoquer
+    un téléchargement à chaque requête.
+    """
+
+    def __init__(self, ttl=60, miss_reload_interval=5):
+        """
+        Args:
+            ttl: Durée de validité de l'index (secondes)
+            miss_reload_interval: Délai minimum entre deux rechargements sur recherche infructueuse
+        """
+        self.ttl = ttl
+        self.miss_reload_interval = miss_reload_interval
+        self._by_id = None
+        self._by_email = {}
+        self._loaded_at = 0.0
+        self._expires_at = 0.0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.reloads = 0
+
+    def init_app(self, app):
+        """Configure le dépôt depuis la configuration Flask"""
+        self.ttl = app.config.get('USER_CACHE_TTL', self.ttl)
+
+    def get_by_id(self, user_id):
+        """
+        Enregistrement d'un utilisateur par son id
+
+        Returns:
+            Tuple (numéro de ligne, dict), ou (None, None) si introuvable
+        """
+        return self._lookup(lambda: self._by_id.get(str(user_id)))
+
+    def get_by_email(self, email):
+        """
+        Enregistrement d'un utilisateur par son email
+
+        Returns:
+            Tuple (numéro de ligne, dict), ou (None, None) si introuvable
+        """
+        return self._lookup(lambda: self._by_id.get(self._by_email.get(email)))
+
+    def invalidate(self):
+        """Oublie l'index (rechargé à la prochaine recherche)"""
+        with self._lock:
+            self._expires_at = 0.0
+
+    def stats(self):
+        """Compteurs du dépôt"""
+        lookups = self.hits + self.misses
+        return {
+            'users': len(self._by_id) if self._by_id is not None else None,
+            'hits': self.hits,
+            'misses': self.misses,
+            'reloads': self.reloads,
+            'hit_rate': self.hits / lookups if lookups else None,
+            'ttl': self.ttl,
+        }
+
+    def _lookup(self, find):
+        """Recherche dans l'index, rechargé s'il a expiré ou en cas d'absence"""
+        self._ensure_loaded()
+
+        entry = find()
+        if entry is not None:
+            self.hits += 1
+            return entry
+
+        self.misses += 1
+        if time.monotonic() - self._loaded_at >= self.miss_reload_interval:
+            self._ensure_loaded(force=True)
+            entry = find()
+
+        return entry if entry is not None else (None, None)
+
+    def _ensure_loaded(self, force=False):
+        """Charge la feuille si l'index est absent, expiré ou si force"""
+        if not force and self._by_id is not None and time.monotonic() < self._expires_at:
+            return
+
+        with self._lock:
+            # Un autre thread a pu recharger pendant l'attente du verrou
+            now = time.monotonic()
+            if self._by_id is not None and now < self._expires_at:
+                if not force or now - self._loaded_at < self.miss_reload_interval:
+                    return
+
+            try:
+                records = sheets_manager.get_all_records(USERS_SHEET)
+            except Exception as e:
+                if self._by_id is None:
+                    raise
+                # Échec de lecture : conserver l'ancien index un moment
+                print(f"Erreur chargement des utilisateurs: {e}")
+                self._loaded_at = now
+                self._expires_at = now + min(self.ttl, 30)
+                return
+
+            by_id = {}
+            by_email = {}
+            for row_num, record in enumerate(records, start=2):  # ligne 1 = headers
+                user_id = str(record.get('id', ''))
+                if not user_id or user_id in by_id:
+                    continue
+                by_id[user_id] = (row_num, record)
+                by_email.setdefault(record.get('email'), user_id)
+
+            self._by_id = by_id
+            self._by_email = by_email
+            self._loaded_at = now
+            self._expires_at = now + self.ttl
+            self.reloads += 1
+
+
+# Instance globale
+user_repository = UserRepository()
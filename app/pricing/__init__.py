@@ -6,6 +6,8 @@ Migré depuis l'application Streamlit
 from .curves import (
     nelson_siegel,
     fit_nelson_siegel,
+    fit_nelson_siegel_batch,
+    fit_nelson_siegel_groups,
     create_nelson_siegel_curve,
     remove_outliers_iqr,
     adjust_curve_to_market_points,
@@ -13,6 +15,11 @@ from .curves import (
 )
 
 from .clustering import (
+    Ward1D,
+    KMeans1D,
+    RatingClusters,
+    compute_rating_clusters,
+    compute_spread_clusters,
     create_yellow_curve_rating_clustering,
     create_green_curve_tranche_clustering,
     create_blue_curve_fusion
@@ -20,20 +27,41 @@ from .clustering import (
 
 from .google_sheets import GoogleSheetsLoader
 
+from .snapshot import MarketSnapshot, MarketDataCache, market_data_cache
+
+from .pipeline import calculate_curves, calculate_scenarios, calculate_universe
+
 __all__ = [
     # Curves
     'nelson_siegel',
     'fit_nelson_siegel',
+    'fit_nelson_siegel_batch',
+    'fit_nelson_siegel_groups',
     'create_nelson_siegel_curve',
     'remove_outliers_iqr',
     'adjust_curve_to_market_points',
     'calculate_adjustment_score',
 
     # Clustering
+    'Ward1D',
+    'KMeans1D',
+    'RatingClusters',
+    'compute_rating_clusters',
+    'compute_spread_clusters',
     'create_yellow_curve_rating_clustering',
     'create_green_curve_tranche_clustering',
     'create_blue_curve_fusion',
 
     # Google Sheets
-    'GoogleSheetsLoader'
+    'GoogleSheetsLoader',
+
+    # Snapshot
+    'MarketSnapshot',
+    'MarketDataCache',
+    'market_data_cache',
+
+    # Pipeline
+    'calculate_curves',
+    'calculate_scenarios',
+    'calculate_universe'
 ]
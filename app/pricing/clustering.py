@@ -3,27 +3,355 @@ Algorithmes de clustering pour les courbes de pricing
 Migré depuis l'application Streamlit
 """
 
+import heapq
+
 import numpy as np
 import pandas as pd
-from sklearn.cluster import AgglomerativeClustering, KMeans
-from sklearn.preprocessing import StandardScaler
-from .curves import create_nelson_siegel_curve, remove_outliers_iqr
 
+from app.metrics import metrics
+from .curves import create_nelson_siegel_curve, fit_nelson_siegel_groups, remove_outliers_iqr, iqr_mask
+
+
+# Tranches de Risk Mid de la courbe verte (0-1, 1-3, 3-5, 5-7, 7-10, 10+)
+RISK_TRANCHES = [(0, 1), (1, 3), (3, 5), (5, 7), (7, 10), (10, 15)]
+
+
+class RatingClusters:
+    """
+    Résultat du clustering Ward sur les ratings d'une séniorité
+
+    Ne dépend pas de l'émetteur sélectionné : calculé une fois par snapshot,
+    séniorité et nombre de clusters, puis réutilisé par chaque courbe jaune
+    (seul le retrait de l'émetteur cible reste à faire).
+
+    Attributes:
+        labels: Cluster de chaque ligne des données de la séniorité
+        issuer_clusters: Dict émetteur -> cluster
+        cluster_positions: Dict cluster -> positions (iloc, croissantes) des lignes du cluster
+        cluster_stats: Dict cluster -> statistiques (points, émetteurs, Note, zspread, riskmid)
+    """
+
+    def __init__(self, data, labels):
+        """
+        Args:
+            data: DataFrame de la séniorité (lignes avec Note)
+            labels: Array des clusters (une valeur par ligne de data)
+        """
+        self.n_rows = len(data)
+        self.labels = np.asarray(labels)
+
+        tickers = data['ticker_corp'].to_numpy()
+        notes = data['Note'].to_numpy(dtype=float)
+        spreads = data['zspread'].to_numpy(dtype=float)
+        risks = data['riskmid'].to_numpy(dtype=float)
+
+        # Cluster de chaque émetteur (première ligne rencontrée, comme avant)
+        self.issuer_clusters = {}
+        for ticker, label in zip(tickers, self.labels):
+            self.issuer_clusters.setdefault(ticker, label)
+
+        self.cluster_positions = {}
+        self.cluster_stats = {}
+        for cluster in np.unique(self.labels):
+            cluster_issuers = [t for t, c in self.issuer_clusters.items() if c == cluster]
+            positions = np.flatnonzero(pd.Series(tickers).isin(cluster_issuers).to_numpy())
+            self.cluster_positions[cluster] = positions
+
+            members = self.labels == cluster
+            self.cluster_stats[cluster] = {
+                'points': int(np.sum(members)),
+                'issuers': len(cluster_issuers),
+                'note_mean': float(np.mean(notes[members])),
+                'note_min': float(np.min(notes[members])),
+                'note_max': float(np.max(notes[members])),
+                'zspread_mean': float(np.mean(spreads[members])),
+                'riskmid_min': float(np.min(risks[members])),
+                'riskmid_max': float(np.max(risks[members])),
+            }
+
+    def issuer_cluster(self, issuer):
+        """Cluster d'un émetteur (0 si l'émetteur n'a pas de rating)"""
+        return self.issuer_clusters.get(issuer, 0)
+
+    def peer_data(self, data, issuer):
+        """
+        Points des autres émetteurs du cluster de l'émetteur (leave-one-issuer-out)
+
+        Args:
+            data: DataFrame de la séniorité utilisé pour le clustering
+            issuer: Émetteur sélectionné
+
+        Returns:
+            Tuple (cluster, DataFrame des pairs, trié comme data)
+        """
+        cluster = self.issuer_cluster(issuer)
+        cluster_rows = data.iloc[self.cluster_positions.get(cluster, np.array([], dtype=int))]
+        return cluster, cluster_rows[cluster_rows['ticker_corp'] != issuer]
+
+
+class Ward1D:
+    """
+    Hiérarchie Ward exacte sur une seule variable (ex: la Note)
+
+    En 1 dimension, la fusion Ward la moins coûteuse se fait toujours entre
+    deux clusters adjacents dans l'ordre trié : l'arbre complet se construit
+    en O(n log n) avec un tas sur les paires adjacentes (au lieu de la
+    matrice O(n²) d'AgglomerativeClustering). Les valeurs identiques sont
+    regroupées d'emblée (fusion à coût nul).
+
+    L'arbre est construit une fois ; labels(k) coupe le dendrogramme pour
+    n'importe quel k en O(n). Les clusters sont numérotés par valeur
+    croissante (cluster 0 = valeurs les plus basses).
+    """
+
+    def __init__(self, values):
+        """
+        Args:
+            values: Array des valeurs à regrouper
+        """
+        values = np.asarray(values, dtype=float)
+        self.values, self.inverse, counts = np.unique(values, return_inverse=True, return_counts=True)
+        self.n_values = len(self.values)
+
+        # merge_rank[b] : rang de fusion de la frontière entre valeurs uniques b-1 et b
+        self.merge_rank = np.full(self.n_values, self.n_values, dtype=int)
+        self.merge_costs = []
+
+        if self.n_values < 2:
+            return
+
+        # Clusters courants identifiés par leur première valeur unique
+        size = counts.astype(float)
+        total = self.values * counts
+        previous = np.arange(-1, self.n_values - 1)
+        following = np.arange(1, self.n_values + 1)
+        alive = np.ones(self.n_values, dtype=bool)
+        stamp = np.zeros(self.n_values, dtype=int)  # incrémenté à chaque fusion
+
+        def entry(left, right):
+            mean_gap = total[left] / size[left] - total[right] / size[right]
+            merge_cost = size[left] * size[right] / (size[left] + size[right]) * mean_gap**2
+            return (merge_cost, left, right, stamp[left], stamp[right])
+
+        heap = [entry(b - 1, b) for b in range(1, self.n_values)]
+        heapq.heapify(heap)
+
+        rank = 0
+        while heap:
+            merge_cost, left, right, stamp_left, stamp_right = heapq.heappop(heap)
+            # Entrée périmée : l'un des deux clusters a changé depuis
+            if not (alive[left] and alive[right] and stamp[left] == stamp_left and stamp[right] == stamp_right):
+                continue
+
+            # La frontière supprimée est celle qui précède le cluster de droite
+            self.merge_rank[right] = rank
+            self.merge_costs.append(merge_cost)
+            rank += 1
+
+            size[left] += size[right]
+            total[left] += total[right]
+            alive[right] = False
+            stamp[left] += 1
+            following[left] = following[right]
+            if following[left] < self.n_values:
+                previous[following[left]] = left
+                heapq.heappush(heap, entry(left, following[left]))
+            if previous[left] >= 0:
+                heapq.heappush(heap, entry(previous[left], left))
+
+    def labels(self, n_clusters):
+        """
+        Coupe la hiérarchie en n_clusters groupes
+
+        Args:
+            n_clusters: Nombre de clusters (limité au nombre de valeurs distinctes)
+
+        Returns:
+            Array des clusters, un par valeur d'entrée
+        """
+        n_clusters = max(1, min(n_clusters, self.n_values))
+        # Frontières encore présentes après les n_values - n_clusters premières fusions
+        boundaries = self.merge_rank >= self.n_values - n_clusters
+        boundaries[0] = False
+        unique_labels = np.cumsum(boundaries)
+        return unique_labels[self.inverse]
+
+
+class KMeans1D:
+    """
+    K-means exact sur une seule variable (ex: le Z-spread d'une tranche)
+
+    En 1 dimension, une partition optimale est faite d'intervalles contigus
+    dans l'ordre trié : la programmation dynamique sur les sommes cumulées
+    donne l'optimum global, de façon déterministe (pas d'initialisation
+    aléatoire ni de redémarrages comme KMeans de sklearn). Chaque étape est
+    résolue par diviser-pour-régner (découpe optimale monotone), soit
+    O(k n log n) au total.
+
+    Les clusters sont numérotés par centre croissant (cluster 0 = spreads les
+    plus bas). Seuls les centres et les bornes sont conservés : l'objet est
+    léger et peut être mis en cache.
+    """
+
+    def __init__(self, values, n_clusters):
+        """
+        Args:
+            values: Array (non vide) des valeurs à regrouper
+            n_clusters: Nombre de clusters (limité au nombre de valeurs distinctes)
+        """
+        uniques, counts = np.unique(np.asarray(values, dtype=float), return_counts=True)
+        n_values = len(uniques)
+        self.n_clusters = max(1, min(n_clusters, n_values))
+
+        # Sommes cumulées pondérées (valeurs centrées pour la précision numérique)
+        shift = uniques.mean()
+        centered = uniques - shift
+        weights = np.concatenate([[0.0], np.cumsum(counts, dtype=float)])
+        sums = np.concatenate([[0.0], np.cumsum(counts * centered)])
+        squares = np.concatenate([[0.0], np.cumsum(counts * centered**2)])
+
+        def cost(start, stop):
+            """Inertie du cluster formé des valeurs distinctes [start, stop)"""
+            total = sums[stop] - sums[start]
+            return squares[stop] - squares[start] - total**2 / (weights[stop] - weights[start])
+
+        # best[i] : inertie optimale des i premières valeurs distinctes
+        best = np.full(n_values + 1, np.inf)
+        best[1:] = cost(0, np.arange(1, n_values + 1))
+        splits = []
+        for n_previous in range(1, self.n_clusters):
+            best, split = _kmeans_1d_step(best, n_previous, cost)
+            splits.append(split)
+
+        # Remonter les découpes optimales depuis la fin
+        boundaries = [n_values]
+        for split in reversed(splits):
+            boundaries.append(split[boundaries[-1]])
+        boundaries.append(0)
+        boundaries = np.array(boundaries[::-1])
+
+        starts, stops = boundaries[:-1], boundaries[1:]
+        self.centers = (sums[stops] - sums[starts]) / (weights[stops] - weights[starts]) + shift
+        self.upper_bounds = uniques[stops - 1]
+        self.inertia = float(np.sum(cost(starts, stops)))
+
+    def labels(self, values):
+        """
+        Cluster de chaque valeur (intervalle qui la contient)
+
+        Args:
+            values: Array des valeurs
+
+        Returns:
+            Array des clusters
+        """
+        return np.searchsorted(self.upper_bounds[:-1], np.asarray(values, dtype=float), side='left')
+
+    def predict(self, value):
+        """Cluster dont le centre est le plus proche d'une valeur"""
+        return int(np.argmin(np.abs(self.centers - value)))
+
+
+def _kmeans_1d_step(previous, n_previous, cost):
+    """
+    Étape de programmation dynamique : ajoute un cluster à la partition
+
+    current[i] = min sur j de previous[j] + cost(j, i), où previous est
+    l'inertie optimale en n_previous clusters. La découpe optimale j(i) est
+    croissante en i : chaque niveau de la récursion diviser-pour-régner est
+    traité en une seule passe vectorisée.
+
+    Args:
+        previous: Inerties optimales en n_previous clusters (par préfixe)
+        n_previous: Nombre de clusters de previous
+        cost: Fonction (start, stop) -> inertie d'un cluster
 
+    Returns:
+        Tuple (current, split) : inerties en n_previous + 1 clusters et découpes
+    """
+    n_values = len(previous) - 1
+    current = np.full(n_values + 1, np.inf)
+    split = np.zeros(n_values + 1, dtype=int)
+
+    # Intervalles [lo, hi] de préfixes à traiter, découpe cherchée dans [opt_lo, opt_hi]
+    lo = np.array([n_previous + 1])
+    hi = np.array([n_values])
+    opt_lo = np.array([n_previous])
+    opt_hi = np.array([n_values - 1])
+    active = lo <= hi
+    lo, hi, opt_lo, opt_hi = lo[active], hi[active], opt_lo[active], opt_hi[active]
+
+    while len(lo):
+        mid = (lo + hi) // 2
+        lengths = np.minimum(opt_hi, mid - 1) - opt_lo + 1
+        offsets = np.cumsum(lengths) - lengths
+        segment = np.repeat(np.arange(len(mid)), lengths)
+        candidates = opt_lo[segment] + np.arange(lengths.sum()) - offsets[segment]
+
+        total = previous[candidates] + cost(candidates, mid[segment])
+        minimum = np.minimum.reduceat(total, offsets)
+        # Premier candidat atteignant le minimum dans chaque segment
+        hits = np.flatnonzero(total <= minimum[segment])
+        argmin = candidates[hits[np.searchsorted(hits, offsets)]]
+
+        current[mid] = minimum
+        split[mid] = argmin
+
+        left = lo < mid
+        right = mid < hi
+        lo, hi, opt_lo, opt_hi = (
+            np.concatenate([lo[left], mid[right] + 1]),
+            np.concatenate([mid[left] - 1, hi[right]]),
+            np.concatenate([opt_lo[left], argmin[right]]),
+            np.concatenate([argmin[left], opt_hi[right]]),
+        )
+
+    return current, split
+
+
+@metrics.instrument('rating_clusters')
+def compute_rating_clusters(all_seniority_data, n_clusters_rating, ward_tree=None):
+    """
+    Clustering Ward sur la Note de tous les points d'une séniorité
+
+    Args:
+        all_seniority_data: DataFrame avec tous les émetteurs pour cette séniorité
+        n_clusters_rating: Nombre de clusters de rating
+        ward_tree: Ward1D déjà construit sur la Note de ces données (optionnel)
+
+    Returns:
+        RatingClusters, ou None s'il n'y a pas assez de points notés
+    """
+    valid_issuers = all_seniority_data.dropna(subset=['Note'])
+
+    if len(valid_issuers) < n_clusters_rating:
+        return None
+
+    # Clustering Ward sur les ratings (la standardisation ne change pas la hiérarchie)
+    if ward_tree is None:
+        ward_tree = Ward1D(valid_issuers['Note'].to_numpy())
+
+    return RatingClusters(valid_issuers, ward_tree.labels(n_clusters_rating))
+
+
+@metrics.instrument('yellow_curve')
 def create_yellow_curve_rating_clustering(
     all_seniority_data,
     selected_issuer,
     n_clusters_rating,
-    common_risk_grid
+    common_risk_grid,
+    rating_clusters=None
 ):
     """
     Crée la courbe JAUNE basée sur le clustering de rating (Ward)
 
     Args:
         all_seniority_data: DataFrame avec tous les émetteurs pour cette séniorité
+                            (trié par riskmid, cf. MarketIndex.seniority_data)
         selected_issuer: Nom de l'émetteur sélectionné
         n_clusters_rating: Nombre de clusters de rating
         common_risk_grid: Grille de risque commune
+        rating_clusters: RatingClusters précalculé sur all_seniority_data (optionnel)
 
     Returns:
         Tuple (yellow_curve, info_message)
@@ -32,37 +360,21 @@ def create_yellow_curve_rating_clustering(
     yellow_curve_info = ""
 
     try:
-        # Préparer les features pour clustering (seulement le rating)
-        valid_issuers = all_seniority_data.dropna(subset=['Note'])
-
-        if len(valid_issuers) >= n_clusters_rating:
-            # Clustering Ward sur les ratings
-            features = valid_issuers[['Note']].values
-            scaler = StandardScaler()
-            features_scaled = scaler.fit_transform(features)
-
-            ward_clustering = AgglomerativeClustering(
-                n_clusters=n_clusters_rating,
-                linkage='ward'
-            )
+        if not all_seniority_data['riskmid'].is_monotonic_increasing:
+            all_seniority_data = _sorted_by_riskmid(all_seniority_data)
+            rating_clusters = None
 
-            cluster_labels = ward_clustering.fit_predict(features_scaled)
-            valid_issuers = valid_issuers.copy()
-            valid_issuers['cluster_rating'] = cluster_labels
+        # Ne garder que les points notés (base du clustering)
+        if all_seniority_data['Note'].isna().any():
+            all_seniority_data = all_seniority_data.dropna(subset=['Note'])
+            rating_clusters = None
 
-            # Trouver le cluster de l'émetteur sélectionné
-            issuer_cluster = None
-            if selected_issuer in valid_issuers['ticker_corp'].values:
-                issuer_cluster = valid_issuers[valid_issuers['ticker_corp'] == selected_issuer]['cluster_rating'].iloc[0]
-            else:
-                issuer_cluster = 0
+        if rating_clusters is None:
+            rating_clusters = compute_rating_clusters(all_seniority_data, n_clusters_rating)
 
-            # Récupérer toutes les données du cluster (sans l'émetteur cible)
-            cluster_issuers = valid_issuers[valid_issuers['cluster_rating'] == issuer_cluster]['ticker_corp'].tolist()
-            cluster_data = all_seniority_data[
-                (all_seniority_data['ticker_corp'].isin(cluster_issuers)) &
-                (all_seniority_data['ticker_corp'] != selected_issuer)
-            ].copy()
+        if rating_clusters is not None:
+            # Données du cluster de l'émetteur (sans l'émetteur cible)
+            issuer_cluster, cluster_data = rating_clusters.peer_data(all_seniority_data, selected_issuer)
 
             if len(cluster_data) >= 4:
                 # Nettoyer les outliers
@@ -70,11 +382,10 @@ def create_yellow_curve_rating_clustering(
                 if len(cluster_clean) < 4:
                     cluster_clean = cluster_data
 
-                # Créer la courbe Nelson-Siegel
-                cluster_sorted = cluster_clean.sort_values('riskmid')
+                # Créer la courbe Nelson-Siegel (sous-ensemble déjà trié par riskmid)
                 _, yellow_curve, _ = create_nelson_siegel_curve(
-                    cluster_sorted['riskmid'].values,
-                    cluster_sorted['zspread'].values,
+                    cluster_clean['riskmid'].values,
+                    cluster_clean['zspread'].values,
                     common_risk_grid
                 )
 
@@ -90,22 +401,29 @@ def create_yellow_curve_rating_clustering(
     return yellow_curve, yellow_curve_info
 
 
+@metrics.instrument('green_curve')
 def create_green_curve_tranche_clustering(
     all_seniority_data,
     issuer_data,
     selected_issuer,
     n_clusters_spread,
-    common_risk_grid
+    common_risk_grid,
+    spread_clusters=None,
+    batch_fit=False
 ):
     """
-    Crée la courbe VERTE basée sur le clustering par tranches de Risk Mid (K-means)
+    Crée la courbe VERTE basée sur le clustering par tranches de Risk Mid (K-means 1D exact)
 
     Args:
         all_seniority_data: DataFrame avec tous les émetteurs pour cette séniorité
+                            (trié par riskmid, cf. MarketIndex.seniority_data)
         issuer_data: DataFrame avec les données de l'émetteur sélectionné
         selected_issuer: Nom de l'émetteur sélectionné
         n_clusters_spread: Nombre de clusters de spread
         common_risk_grid: Grille de risque commune
+        spread_clusters: Fonction tranche -> KMeans1D précalculé sur all_seniority_data
+                         sans l'émetteur sélectionné (optionnel, cf. compute_spread_clusters)
+        batch_fit: Ajuster les tranches par fit_nelson_siegel_batch (défaut: L-BFGS-B, cf. fit_nelson_siegel_groups)
 
     Returns:
         Tuple (green_curve, info_message, tranches_details)
@@ -115,84 +433,20 @@ def create_green_curve_tranche_clustering(
     tranches_info = []
 
     try:
-        # Tranches de Risk Mid (0-1, 1-3, 3-5, 5-7, 7-10, 10+)
-        risk_tranches = [(0, 1), (1, 3), (3, 5), (5, 7), (7, 10), (10, 15)]
-
-        courbes_par_tranche = []
-        poids_par_tranche = []
-
-        for i, (tranche_min, tranche_max) in enumerate(risk_tranches):
-            # Points de l'émetteur dans cette tranche
-            issuer_points_tranche = issuer_data[
-                (issuer_data['riskmid'] >= tranche_min) &
-                (issuer_data['riskmid'] < tranche_max)
-            ]
-
-            if len(issuer_points_tranche) > 0:
-                # Tous les émetteurs ayant des points dans cette tranche (sans l'émetteur cible)
-                tranche_data = all_seniority_data[
-                    (all_seniority_data['riskmid'] >= tranche_min) &
-                    (all_seniority_data['riskmid'] < tranche_max) &
-                    (all_seniority_data['ticker_corp'] != selected_issuer)
-                ].copy()
-
-                if len(tranche_data) >= n_clusters_spread:
-                    # Clustering Z-spread dans cette tranche
-                    spread_features = tranche_data[['zspread']].values
-                    kmeans_spread = KMeans(n_clusters=n_clusters_spread, random_state=42)
-                    spread_cluster_labels = kmeans_spread.fit_predict(spread_features)
-                    tranche_data['cluster_spread'] = spread_cluster_labels
-
-                    # Trouver le cluster de spread de l'émetteur dans cette tranche
-                    avg_issuer_spread_tranche = issuer_points_tranche['zspread'].mean()
-                    issuer_spread_cluster_tranche = kmeans_spread.predict([[avg_issuer_spread_tranche]])[0]
-
-                    # Récupérer les données du cluster final dans cette tranche
-                    cluster_tranche_data = tranche_data[
-                        tranche_data['cluster_spread'] == issuer_spread_cluster_tranche
-                    ].copy()
-
-                    if len(cluster_tranche_data) >= 3:
-                        # Nettoyer les outliers
-                        cluster_clean = remove_outliers_iqr(cluster_tranche_data)
-                        if len(cluster_clean) < 3:
-                            cluster_clean = cluster_tranche_data
-
-                        # Créer courbe pour cette tranche
-                        cluster_sorted = cluster_clean.sort_values('riskmid')
-
-                        if len(cluster_sorted) >= 4:
-                            _, courbe_tranche, _ = create_nelson_siegel_curve(
-                                cluster_sorted['riskmid'].values,
-                                cluster_sorted['zspread'].values,
-                                common_risk_grid
-                            )
-
-                            courbes_par_tranche.append(courbe_tranche)
-                            poids_par_tranche.append(len(issuer_points_tranche))
-
-                            # Gestion du nom de la dernière tranche (10+)
-                            if tranche_max == 15:
-                                tranche_name = f"[{tranche_min}+)"
-                            else:
-                                tranche_name = f"[{tranche_min}-{tranche_max})"
-
-                            tranches_info.append({
-                                'name': tranche_name,
-                                'points': len(issuer_points_tranche),
-                                'cluster': issuer_spread_cluster_tranche
-                            })
-
-        # Calculer la moyenne pondérée des courbes
-        if len(courbes_par_tranche) > 0:
-            courbes_array = np.array(courbes_par_tranche)
-            poids_array = np.array(poids_par_tranche)
-            green_curve = np.average(courbes_array, axis=0, weights=poids_array)
-
-            total_points = sum(poids_par_tranche)
-            green_curve_info = f"{len(courbes_par_tranche)} tranches | {total_points} points total"
-        else:
-            green_curve_info = "Aucune tranche avec assez de points"
+        points_par_tranche, poids_par_tranche, tranches_info = collect_green_tranche_points(
+            all_seniority_data,
+            issuer_data,
+            selected_issuer,
+            n_clusters_spread,
+            spread_clusters
+        )
+
+        green_curve, green_curve_info = combine_green_tranche_curves(
+            points_par_tranche,
+            poids_par_tranche,
+            fit_nelson_siegel_groups(points_par_tranche, batch=batch_fit),
+            common_risk_grid
+        )
 
     except Exception as e:
         green_curve_info = f"Erreur: {str(e)}"
@@ -200,6 +454,195 @@ def create_green_curve_tranche_clustering(
     return green_curve, green_curve_info, tranches_info
 
 
+def collect_green_tranche_points(
+    all_seniority_data,
+    issuer_data,
+    selected_issuer,
+    n_clusters_spread,
+    spread_clusters=None
+):
+    """
+    Sélectionne, tranche par tranche, les points du cluster de spread de l'émetteur
+
+    Première étape de la courbe verte, séparée de l'ajustement Nelson-Siegel
+    pour pouvoir ajuster les tranches de plusieurs émetteurs en un seul lot.
+
+    Args:
+        all_seniority_data: DataFrame avec tous les émetteurs pour cette séniorité
+        issuer_data: DataFrame avec les données de l'émetteur sélectionné
+        selected_issuer: Nom de l'émetteur sélectionné
+        n_clusters_spread: Nombre de clusters de spread
+        spread_clusters: Fonction tranche -> KMeans1D précalculé (optionnel)
+
+    Returns:
+        Tuple (points_par_tranche, poids_par_tranche, tranches_details)
+        - points_par_tranche: Liste de (maturities, spreads) à ajuster
+        - poids_par_tranche: Nombre de points de l'émetteur dans chaque tranche
+    """
+    if not all_seniority_data['riskmid'].is_monotonic_increasing:
+        all_seniority_data = _sorted_by_riskmid(all_seniority_data)
+        spread_clusters = None
+
+    # Colonnes en arrays : chaque tranche est une tranche contiguë (données triées)
+    riskmid = all_seniority_data['riskmid'].to_numpy(dtype=float)
+    zspread = all_seniority_data['zspread'].to_numpy(dtype=float)
+    tickers = all_seniority_data['ticker_corp'].to_numpy()
+    issuer_riskmid = issuer_data['riskmid'].to_numpy(dtype=float)
+    issuer_zspread = issuer_data['zspread'].to_numpy(dtype=float)
+
+    points_par_tranche = []
+    poids_par_tranche = []
+    tranches_info = []
+
+    for tranche_min, tranche_max in RISK_TRANCHES:
+        # Points de l'émetteur dans cette tranche
+        issuer_in_tranche = (issuer_riskmid >= tranche_min) & (issuer_riskmid < tranche_max)
+        n_issuer_points = int(np.sum(issuer_in_tranche))
+
+        if n_issuer_points == 0:
+            continue
+
+        # Tous les émetteurs ayant des points dans cette tranche (sans l'émetteur cible)
+        start, stop = np.searchsorted(riskmid, (tranche_min, tranche_max), side='left')
+        others = tickers[start:stop] != selected_issuer
+        tranche_riskmid = riskmid[start:stop][others]
+        tranche_zspread = zspread[start:stop][others]
+
+        # Clustering Z-spread dans cette tranche (précalculé si disponible)
+        if spread_clusters is not None:
+            clusters = spread_clusters((tranche_min, tranche_max))
+        else:
+            clusters = compute_spread_clusters(
+                all_seniority_data, (tranche_min, tranche_max), selected_issuer, n_clusters_spread
+            )
+
+        if clusters is None:
+            continue
+
+        # Trouver le cluster de spread de l'émetteur dans cette tranche (centre le plus proche)
+        avg_issuer_spread_tranche = issuer_zspread[issuer_in_tranche].mean()
+        issuer_spread_cluster_tranche = clusters.predict(avg_issuer_spread_tranche)
+
+        # Récupérer les données du cluster final dans cette tranche
+        in_cluster = clusters.labels(tranche_zspread) == issuer_spread_cluster_tranche
+        cluster_riskmid = tranche_riskmid[in_cluster]
+        cluster_zspread = tranche_zspread[in_cluster]
+
+        if len(cluster_zspread) < 3:
+            continue
+
+        # Nettoyer les outliers
+        keep = iqr_mask(cluster_zspread)
+        if np.sum(keep) >= 3:
+            cluster_riskmid = cluster_riskmid[keep]
+            cluster_zspread = cluster_zspread[keep]
+
+        # Points de la courbe de cette tranche (sous-ensemble déjà trié par riskmid)
+        if len(cluster_zspread) >= 4:
+            points_par_tranche.append((cluster_riskmid, cluster_zspread))
+            poids_par_tranche.append(n_issuer_points)
+
+            # Gestion du nom de la dernière tranche (10+)
+            if tranche_max == 15:
+                tranche_name = f"[{tranche_min}+)"
+            else:
+                tranche_name = f"[{tranche_min}-{tranche_max})"
+
+            tranches_info.append({
+                'name': tranche_name,
+                'points': n_issuer_points,
+                'cluster': issuer_spread_cluster_tranche
+            })
+
+    return points_par_tranche, poids_par_tranche, tranches_info
+
+
+def combine_green_tranche_curves(points_par_tranche, poids_par_tranche, params_par_tranche, common_risk_grid):
+    """
+    Moyenne pondérée des courbes Nelson-Siegel de chaque tranche
+
+    Args:
+        points_par_tranche: Liste de (maturities, spreads) (cf. collect_green_tranche_points)
+        poids_par_tranche: Nombre de points de l'émetteur dans chaque tranche
+        params_par_tranche: Paramètres Nelson-Siegel ajustés pour chaque tranche
+        common_risk_grid: Grille de risque commune
+
+    Returns:
+        Tuple (green_curve, info_message)
+    """
+    courbes_par_tranche = []
+    for (maturities, spreads), params in zip(points_par_tranche, params_par_tranche):
+        _, courbe_tranche, _ = create_nelson_siegel_curve(
+            maturities,
+            spreads,
+            common_risk_grid,
+            params=params
+        )
+        courbes_par_tranche.append(courbe_tranche)
+
+    # Calculer la moyenne pondérée des courbes
+    if len(courbes_par_tranche) == 0:
+        return None, "Aucune tranche avec assez de points"
+
+    courbes_array = np.array(courbes_par_tranche)
+    poids_array = np.array(poids_par_tranche)
+    green_curve = np.average(courbes_array, axis=0, weights=poids_array)
+
+    total_points = sum(poids_par_tranche)
+    return green_curve, f"{len(courbes_par_tranche)} tranches | {total_points} points total"
+
+
+def tranche_rows(data, tranche):
+    """
+    Points d'une tranche de Risk Mid [min, max) d'un DataFrame trié par riskmid
+
+    Args:
+        data: DataFrame trié par riskmid
+        tranche: Tuple (tranche_min, tranche_max)
+
+    Returns:
+        DataFrame (tranche contiguë, sans copie)
+    """
+    start, stop = np.searchsorted(data['riskmid'].to_numpy(), tranche, side='left')
+    return data.iloc[start:stop]
+
+
+@metrics.instrument('spread_clusters')
+def compute_spread_clusters(all_seniority_data, tranche, excluded_issuer, n_clusters_spread):
+    """
+    K-means 1D exact sur le Z-spread d'une tranche de Risk Mid
+
+    Args:
+        all_seniority_data: DataFrame de la séniorité (trié par riskmid)
+        tranche: Tuple (tranche_min, tranche_max)
+        excluded_issuer: Émetteur retiré avant le clustering (None pour aucun)
+        n_clusters_spread: Nombre de clusters de spread
+
+    Returns:
+        KMeans1D, ou None s'il y a moins de points que de clusters
+    """
+    tranche_data = tranche_rows(all_seniority_data, tranche)
+    spreads = tranche_data['zspread'].to_numpy()
+    if excluded_issuer is not None:
+        spreads = spreads[tranche_data['ticker_corp'].to_numpy() != excluded_issuer]
+
+    if len(spreads) < n_clusters_spread:
+        return None
+    return KMeans1D(spreads, n_clusters_spread)
+
+
+def _sorted_by_riskmid(data):
+    """
+    Garantit le tri par riskmid (vérification O(n), tri seulement si nécessaire)
+
+    Les sous-ensembles filtrés par masque d'un DataFrame trié restent triés,
+    ce qui évite un sort_values par cluster.
+    """
+    if data['riskmid'].is_monotonic_increasing:
+        return data
+    return data.sort_values('riskmid', kind='mergesort')
+
+
 def create_blue_curve_fusion(yellow_curve, green_curve, adjustment_pct):
     """
     Crée la courbe BLEUE par fusion des courbes jaune et verte + ajustements
@@ -0,0 +1,361 @@
+"""
+Courbes matérialisées de tous les couples (émetteur, séniorité) aux paramètres de clustering par défaut
+Reconstruites en arrière-plan à chaque nouvelle version du snapshot de marché
+"""
+
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+from .curves import calculate_adjustment_score
+from .pipeline import calculate_universe, json_default
+from .precompute import DEFAULT_N_CLUSTERS_RATING, DEFAULT_N_CLUSTERS_SPREAD
+
+
+# Scores neutres : ajustement nul, la courbe bleue stockée est la base
+NEUTRAL_SCORES = (3, 3, 3)
+
+CURVE_NAMES = ('yellow_curve', 'green_curve', 'blue_curve', 'red_curve')
+
+# Store publié dans le répertoire du miroir (mode partagé) : <root>/curves-<version>-<rating>-<spread>/
+STORE_PREFIX = 'curves-'
+MANIFEST_FILE = 'manifest.json'
+
+
+class CurveStore:
+    """
+    Store des courbes jaune / verte / bleue / rouge précalculées
+
+    Enregistré comme listener de market_data_cache : chaque nouvelle version
+    du snapshot déclenche une reconstruction (calculate_universe, une
+    séniorité à la fois) dans un thread d'arrière-plan. Pendant la
+    reconstruction, get() ne répond que pour la version déjà construite :
+    l'appelant retombe sur le calcul direct.
+
+    Les courbes sont calculées aux scores neutres ; les scores n'agissant
+    que sur la courbe bleue (base x (1 + ajustement/100), cf.
+    create_blue_curve_fusion), toutes les combinaisons de scores sont
+    servies depuis le store. Les tableaux stockés sont en lecture seule.
+
+    En mode partagé (MARKET_DATA_SHARED), une version n'est construite que
+    par un process, sous le verrou curves.lock du miroir, puis publiée dans
+    le répertoire du miroir (un .npy par couleur de courbe) ; les autres
+    workers attendent le verrou et relisent le store publié en mémoire
+    mappée, sans recalcul.
+    """
+
+    def __init__(self, n_clusters_rating=DEFAULT_N_CLUSTERS_RATING,
+                 n_clusters_spread=DEFAULT_N_CLUSTERS_SPREAD, enabled=True, keep=2):
+        """
+        Args:
+            n_clusters_rating, n_clusters_spread: Paramètres de clustering matérialisés
+            enabled: Store actif (sinon get() retourne toujours None)
+            keep: Nombre de versions publiées conservées sur disque (mode partagé)
+        """
+        self.n_clusters_rating = n_clusters_rating
+        self.n_clusters_spread = n_clusters_spread
+        self.enabled = enabled
+        self.keep = keep
+        # SharedGeneration de market_data_cache en mode partagé
+        self.shared = None
+        # (version du snapshot, {(émetteur, séniorité): courbes}) remplacé d'un bloc
+        self._built = (None, {})
+        self._pending = None
+        self._building = None
+        self._running = False
+        self._lock = threading.Lock()
+        self._idle = threading.Event()
+        self._idle.set()
+        self.builds = 0
+        self.attached = 0
+        self.cancelled = 0
+        self.hits = 0
+        self.misses = 0
+        self.last_build_duration = None
+
+    def init_app(self, app):
+        """Configure le store depuis la configuration Flask (après market_data_cache.init_app)"""
+        from .snapshot import market_data_cache
+
+        self.enabled = app.config.get('CURVE_STORE_ENABLED', self.enabled)
+        self.shared = market_data_cache.shared
+
+    def on_snapshot(self, snapshot):
+        """
+        Listener de market_data_cache : planifie la reconstruction pour ce snapshot
+
+        Ne bloque pas (appelé sous le verrou du cache) : le calcul est fait
+        par un thread d'arrière-plan, qui passe directement au snapshot le
+        plus récent si plusieurs versions se succèdent.
+        """
+        if not self.enabled or snapshot.is_empty or snapshot.version == self._built[0]:
+            return
+
+        with self._lock:
+            self._pending = snapshot
+            if not self._running:
+                self._running = True
+                self._idle.clear()
+                threading.Thread(target=self._build_loop, daemon=True, name='curve-store').start()
+
+    def get(self, snapshot, selected_issuer, selected_seniority,
+            n_clusters_rating, n_clusters_spread,
+            score_liquidite, score_equity, score_solidite):
+        """
+        Courbes d'un émetteur depuis le store (mêmes arguments que calculate_curves)
+
+        Returns:
+            Dict au format de calculate_curves, ou None si les paramètres de
+            clustering ne sont pas ceux du store, si le store n'est pas encore
+            construit pour cette version ou si le couple n'a pas de courbes
+        """
+        if (not self.enabled
+                or n_clusters_rating != self.n_clusters_rating
+                or n_clusters_spread != self.n_clusters_spread):
+            return None
+
+        version, curves = self._built
+        if version != snapshot.version:
+            self.misses += 1
+            return None
+
+        stored = curves.get((selected_issuer, selected_seniority))
+        if stored is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        adjustment_pct = calculate_adjustment_score(score_liquidite, score_equity, score_solidite)
+        if adjustment_pct == stored['adjustment_pct']:
+            return dict(stored)
+
+        curves_data = dict(stored)
+        curves_data['adjustment_pct'] = adjustment_pct
+        if stored['blue_curve'] is not None:
+            curves_data['blue_curve'] = stored['blue_curve'] * (1 + adjustment_pct / 100)
+        return curves_data
+
+    def wait(self, timeout=None):
+        """
+        Attend la fin des reconstructions en cours
+
+        Returns:
+            True si aucune reconstruction n'est en cours à la sortie
+        """
+        return self._idle.wait(timeout)
+
+    def stats(self):
+        """Compteurs du store"""
+        version, curves = self._built
+        return {
+            'enabled': self.enabled,
+            'version': version,
+            'pairs': len(curves),
+            'building': not self._idle.is_set(),
+            'shared': self.shared is not None,
+            'builds': self.builds,
+            'attached': self.attached,
+            'cancelled': self.cancelled,
+            'hits': self.hits,
+            'misses': self.misses,
+            'last_build_duration': self.last_build_duration,
+        }
+
+    def reset_after_fork(self):
+        """
+        Dans un process forké : relance la construction en cours dans le parent
+
+        Le thread de construction du parent n'existe pas dans l'enfant, qui
+        hérite pourtant de son état (et éventuellement de son verrou).
+        """
+        snapshot = (self._pending or self._building) if self._running else None
+        self._lock = threading.Lock()
+        self._idle = threading.Event()
+        self._idle.set()
+        self._pending = None
+        self._building = None
+        self._running = False
+        if snapshot is not None:
+            self.on_snapshot(snapshot)
+
+    def _build_loop(self):
+        """Thread d'arrière-plan : construit le dernier snapshot demandé"""
+        while True:
+            with self._lock:
+                snapshot = self._pending
+                self._pending = None
+                self._building = snapshot
+                if snapshot is None:
+                    self._running = False
+                    self._idle.set()
+                    return
+
+            try:
+                self._materialize(snapshot)
+            except Exception as e:
+                print(f"Erreur construction du store de courbes: {e}")
+
+    def _materialize(self, snapshot):
+        """Installe les courbes du snapshot : relues depuis le store publié, sinon calculées"""
+        if self.shared is None:
+            curves = self._build(snapshot)
+            if curves is not None:
+                self._built = (snapshot.version, curves)
+            return
+
+        path = self._store_path(snapshot.version)
+        curves = _read_store(path, snapshot)
+        if curves is None:
+            # Un seul process construit une version ; les autres attendent sa publication
+            with self.shared.curve_store_lock(blocking=True):
+                if self._pending is not None:
+                    self.cancelled += 1
+                    return
+
+                curves = _read_store(path, snapshot)
+                if curves is None:
+                    curves = self._build(snapshot)
+                    if curves is None:
+                        return
+                    if self._publish(path, curves):
+                        # Relu en mémoire mappée : pages partagées avec les autres workers
+                        curves = _read_store(path, snapshot) or curves
+                    self._built = (snapshot.version, curves)
+                    return
+
+        self.attached += 1
+        self._built = (snapshot.version, curves)
+
+    def _build(self, snapshot):
+        """
+        Calcule toutes les courbes du snapshot
+
+        Returns:
+            Dict {(émetteur, séniorité): courbes}, ou None si une version plus récente est arrivée
+        """
+        start = time.perf_counter()
+        curves = {}
+
+        for seniority in snapshot.index.seniorities():
+            if self._pending is not None:
+                self.cancelled += 1
+                return None
+
+            results = calculate_universe(
+                snapshot, self.n_clusters_rating, self.n_clusters_spread,
+                *NEUTRAL_SCORES,
+                seniorities=[seniority]
+            )
+            for issuer, _, curves_data in results:
+                if curves_data is not None:
+                    curves[(issuer, seniority)] = _freeze(curves_data)
+
+        self.builds += 1
+        self.last_build_duration = time.perf_counter() - start
+        return curves
+
+    def _store_path(self, version):
+        return os.path.join(
+            self.shared.root_dir,
+            f"{STORE_PREFIX}{version}-{self.n_clusters_rating}-{self.n_clusters_spread}"
+        )
+
+    def _publish(self, path, curves):
+        """
+        Écrit le store dans le répertoire du miroir (renommage atomique) et supprime les anciennes versions
+
+        Returns:
+            True si le store est publié
+        """
+        root_dir = os.path.dirname(path)
+        tmp_dir = tempfile.mkdtemp(prefix='.tmp-curves-', dir=root_dir)
+        try:
+            _write_store(tmp_dir, curves)
+            os.rename(tmp_dir, path)
+        except Exception as e:
+            print(f"Erreur publication du store de courbes: {e}")
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            return False
+
+        # Anciennes versions (les lecteurs en cours gardent leurs mmap)
+        names = sorted(
+            (n for n in os.listdir(root_dir) if n.startswith(STORE_PREFIX) and n != os.path.basename(path)),
+            key=lambda n: os.path.getmtime(os.path.join(root_dir, n))
+        )
+        for name in names[:max(0, len(names) - (self.keep - 1))]:
+            shutil.rmtree(os.path.join(root_dir, name), ignore_errors=True)
+        return True
+
+
+def _write_store(directory, curves):
+    """Une matrice (couples x grille) par couleur, NaN pour les courbes absentes, le reste dans le manifest"""
+    pairs = list(curves)
+    manifest = {
+        'pairs': [list(pair) for pair in pairs],
+        'adjustment_pct': [curves[pair]['adjustment_pct'] for pair in pairs],
+        'info': [curves[pair]['info'] for pair in pairs],
+        'present': {name: [curves[pair][name] is not None for pair in pairs] for name in CURVE_NAMES},
+    }
+
+    if pairs:
+        risk_grid = np.asarray(curves[pairs[0]]['risk_grid'], dtype=float)
+        np.save(os.path.join(directory, 'risk_grid.npy'), risk_grid)
+        for name in CURVE_NAMES:
+            matrix = np.full((len(pairs), len(risk_grid)), np.nan)
+            for row, pair in enumerate(pairs):
+                if curves[pair][name] is not None:
+                    matrix[row] = curves[pair][name]
+            np.save(os.path.join(directory, f"{name}.npy"), matrix)
+
+    with open(os.path.join(directory, MANIFEST_FILE), 'w') as f:
+        json.dump(manifest, f, default=json_default)
+
+
+def _read_store(path, snapshot):
+    """
+    Relit un store publié (courbes en mémoire mappée, points de marché repris du snapshot)
+
+    Returns:
+        Dict {(émetteur, séniorité): courbes}, ou None si le store n'est pas publié
+    """
+    try:
+        with open(os.path.join(path, MANIFEST_FILE)) as f:
+            manifest = json.load(f)
+    except OSError:
+        return None
+
+    pairs = manifest['pairs']
+    if not pairs:
+        return {}
+
+    risk_grid = np.asarray(np.load(os.path.join(path, 'risk_grid.npy'), mmap_mode='r'))
+    matrices = {name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode='r') for name in CURVE_NAMES}
+
+    curves = {}
+    for row, (issuer, seniority) in enumerate(pairs):
+        curves_data = {'risk_grid': risk_grid}
+        for name in CURVE_NAMES:
+            curves_data[name] = np.asarray(matrices[name][row]) if manifest['present'][name][row] else None
+        curves_data['issuer_points'] = snapshot.issuer_data(issuer, seniority)
+        curves_data['adjustment_pct'] = manifest['adjustment_pct'][row]
+        curves_data['info'] = manifest['info'][row]
+        curves[(issuer, seniority)] = curves_data
+    return curves
+
+
+def _freeze(curves_data):
+    """Passe les courbes en lecture seule (partagées par toutes les requêtes)"""
+    for key in ('yellow_curve', 'green_curve', 'blue_curve', 'red_curve'):
+        curve = curves_data.get(key)
+        if curve is not None:
+            curve.flags.writeable = False
+    return curves_data
+
+
+# Instance globale
+curve_store = CurveStore()
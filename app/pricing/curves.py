@@ -3,10 +3,29 @@ Modèles de courbes de pricing (Nelson-Siegel, interpolation, ajustements)
 Migré depuis l'application Streamlit
 """
 
+import itertools
+
 import numpy as np
 import pandas as pd
-from scipy.optimize import minimize
-from scipy.interpolate import interp1d
+
+from app.metrics import metrics
+
+
+# Bornes du paramètre tau et taille des lots pour l'ajustement vectorisé
+TAU_MIN = 0.5
+TAU_MAX = 10.0
+BATCH_CHUNK_SIZE = 256
+
+# Grille grossière de tau (point de départ de l'ajustement vectorisé et du solveur varpro)
+TAU_GRID = np.linspace(TAU_MIN, TAU_MAX, 48)
+# Nombre de minima locaux de la grille utilisés comme points de départ par varpro
+VARPRO_STARTS = 3
+
+# Ajustement (%) associé à chaque score de liquidité / equity / solidité
+SCORE_ADJUSTMENTS = {1: -20, 2: -10, 3: 0, 4: 10, 5: 20}
+
+# Faces de la boîte des betas : 0 = libre, 1 = borne basse, 2 = borne haute
+_BOX_FACES = np.array(list(itertools.product((0, 1, 2), repeat=3)))
 
 
 def nelson_siegel(maturity, beta0, beta1, beta2, tau):
@@ -27,7 +46,8 @@ def nelson_siegel(maturity, beta0, beta1, beta2, tau):
     return term1 + term2 + term3
 
 
-def fit_nelson_siegel(maturities, yields):
+@metrics.instrument('ns_fit')
+def fit_nelson_siegel(maturities, yields, method='lbfgsb', initial_params=None, return_info=False):
     """
     Ajuste les paramètres Nelson-Siegel sur des données observées
     Utilise seulement les points <= 7 ans pour l'ajustement
@@ -35,11 +55,391 @@ def fit_nelson_siegel(maturities, yields):
     Args:
         maturities: Array des maturités
         yields: Array des spreads observés
+        method: 'lbfgsb' (4 paramètres, gradient par différences finies) ou
+                'varpro' (betas profilés, optimisation de tau seul avec dérivée analytique)
+        initial_params: Paramètres de départ (ex: ajustement précédent) pour un démarrage à chaud
+        return_info: Retourner aussi les statistiques du solveur
 
     Returns:
         Tuple (beta0, beta1, beta2, tau)
+        ou ((beta0, beta1, beta2, tau), info) si return_info
+        - info: dict (method, success, nit, nfev, njev)
     """
-    # Utiliser seulement les points <= 7 ans pour l'ajustement
+    maturities_fit, yields_fit = _select_fit_points(maturities, yields)
+    bounds = _fit_bounds(yields_fit)
+
+    warm_start = initial_params is not None
+    if initial_params is None:
+        initial_params = _initial_params(yields_fit)
+    else:
+        initial_params = [float(np.clip(value, low, high)) for value, (low, high) in zip(initial_params, bounds)]
+
+    if method == 'varpro':
+        params, info = _fit_nelson_siegel_varpro(
+            maturities_fit, yields_fit, bounds,
+            warm_tau=initial_params[3] if warm_start else None
+        )
+    elif method == 'lbfgsb':
+        params, info = _fit_nelson_siegel_lbfgsb(maturities_fit, yields_fit, bounds, initial_params)
+    else:
+        raise ValueError(f"Méthode d'ajustement inconnue: {method}")
+
+    if return_info:
+        return params, info
+    return params
+
+
+def _fit_nelson_siegel_lbfgsb(maturities_fit, yields_fit, bounds, initial_params):
+    """Ajustement des 4 paramètres par L-BFGS-B (solveur historique)"""
+    # Import différé : scipy.optimize (~0.5 s) n'est chargé qu'au premier ajustement par solveur
+    from scipy.optimize import minimize
+
+    info = {'method': 'lbfgsb', 'success': False, 'nit': 0, 'nfev': 0, 'njev': 0}
+
+    def objective(params):
+        beta0, beta1, beta2, tau = params
+        predicted = nelson_siegel(maturities_fit, beta0, beta1, beta2, tau)
+        return np.sum((yields_fit - predicted)**2)
+
+    try:
+        result = minimize(
+            objective,
+            initial_params,
+            bounds=bounds,
+            method='L-BFGS-B'
+        )
+        info.update(success=bool(result.success), nit=result.nit, nfev=result.nfev, njev=result.get('njev', 0))
+
+        if result.success:
+            return result.x, info
+        else:
+            return initial_params, info
+    except:
+        return initial_params, info
+
+
+def _fit_nelson_siegel_varpro(maturities_fit, yields_fit, bounds, warm_tau=None):
+    """
+    Ajustement par projection variable (variable projection)
+
+    À tau fixé, les betas optimaux (sous bornes) sont obtenus en forme fermée :
+    seul tau est optimisé, avec la dérivée analytique de la somme des carrés
+    profilée (théorème de l'enveloppe : d SSE / d tau à betas optimaux fixés).
+
+    La somme des carrés profilée a souvent plusieurs minima locaux en tau :
+    l'optimisation part des meilleurs minima locaux de la grille TAU_GRID
+    (comme fit_nelson_siegel_batch), et aussi de warm_tau (démarrage à chaud)
+    s'il est fourni ; le meilleur résultat est retenu.
+    """
+    from scipy.optimize import minimize
+
+    info = {'method': 'varpro', 'success': False, 'nit': 0, 'nfev': 0, 'njev': 0}
+    lower = np.array([[low for low, _ in bounds[:3]]])
+    upper = np.array([[high for _, high in bounds[:3]]])
+    M = maturities_fit[None, :]
+    Y = yields_fit[None, :]
+    W = np.ones_like(M)
+
+    def objective(x):
+        tau = x[0]
+        sse, betas = _profile_sse(M, Y, W, np.array([[tau]]), lower, upper)
+        beta0, beta1, beta2 = betas[0, 0]
+
+        f1, f2 = nelson_siegel_loadings(maturities_fit, tau)
+        df1, df2 = nelson_siegel_loadings_derivative(maturities_fit, tau)
+        residuals = yields_fit - (beta0 + beta1 * f1 + beta2 * f2)
+        gradient = -2 * np.sum(residuals * (beta1 * df1 + beta2 * df2))
+        return sse[0, 0], np.array([gradient])
+
+    try:
+        grid_sse, _ = _profile_sse(M, Y, W, TAU_GRID[None, :], lower, upper)
+        starts = list(TAU_GRID[_grid_minima(grid_sse[0])[:VARPRO_STARTS]])
+        if warm_tau is not None:
+            starts.append(warm_tau)
+
+        best = None
+        for start in starts:
+            result = minimize(
+                objective,
+                [start],
+                jac=True,
+                bounds=[bounds[3]],
+                method='L-BFGS-B'
+            )
+            info['nit'] += result.nit
+            info['nfev'] += result.nfev
+            info['njev'] += result.get('njev', result.nfev)
+            if result.success and np.isfinite(result.fun) and (best is None or result.fun < best.fun):
+                best = result
+
+        if best is not None:
+            tau = best.x[0]
+            _, betas = _profile_sse(M, Y, W, np.array([[tau]]), lower, upper)
+            params = np.array([betas[0, 0, 0], betas[0, 0, 1], betas[0, 0, 2], tau])
+            if np.all(np.isfinite(params)):
+                info['success'] = True
+                return params, info
+    except:
+        pass
+
+    # Échec : repli sur le solveur historique
+    fallback, fallback_info = _fit_nelson_siegel_lbfgsb(maturities_fit, yields_fit, bounds, _initial_params(yields_fit))
+    info['fallback'] = fallback_info
+    return fallback, info
+
+
+def _grid_minima(sse):
+    """Indices des minima locaux d'une somme des carrés sur la grille, du meilleur au moins bon"""
+    padded = np.concatenate([[np.inf], sse, [np.inf]])
+    minima = np.flatnonzero((sse <= padded[:-2]) & (sse <= padded[2:]))
+    return minima[np.argsort(sse[minima], kind='stable')]
+
+
+@metrics.instrument('ns_fit')
+def fit_nelson_siegel_batch(groups, tau_grid=None, refine_iterations=20):
+    """
+    Ajuste Nelson-Siegel sur plusieurs courbes à la fois (NumPy vectorisé)
+
+    Pour chaque tau d'une grille commune, les betas sont linéaires : ils sont
+    résolus en forme fermée (équations normales 3x3, avec les mêmes bornes
+    que fit_nelson_siegel) pour toutes les courbes en même temps. Le meilleur
+    tau de la grille est ensuite affiné par section dorée, toujours en
+    vectorisé.
+
+    Args:
+        groups: Liste de tuples (maturities, yields)
+        tau_grid: Grille de tau initiale (défaut: 48 points entre 0.5 et 10)
+        refine_iterations: Nombre d'itérations de section dorée
+
+    Returns:
+        Liste de tuples (beta0, beta1, beta2, tau), dans l'ordre des groupes
+    """
+    groups = list(groups)
+    if len(groups) == 0:
+        return []
+
+    if tau_grid is None:
+        tau_grid = TAU_GRID
+    tau_grid = np.asarray(tau_grid, dtype=float)
+
+    results = [None] * len(groups)
+    for start in range(0, len(groups), BATCH_CHUNK_SIZE):
+        chunk = groups[start:start + BATCH_CHUNK_SIZE]
+        for offset, params in enumerate(_fit_nelson_siegel_chunk(chunk, tau_grid, refine_iterations)):
+            results[start + offset] = params
+
+    return results
+
+
+def fit_nelson_siegel_groups(groups, batch=False):
+    """
+    Ajuste Nelson-Siegel sur chaque courbe d'une liste (tranches de la courbe verte)
+
+    Par défaut chaque courbe est ajustée par fit_nelson_siegel (L-BFGS-B),
+    comme la courbe jaune : les courbes de production restent celles du
+    solveur historique. fit_nelson_siegel_batch atteint l'optimum global en
+    tau, qui diffère du minimum local de L-BFGS-B sur les tranches à
+    maturités resserrées : il n'est utilisé que sur demande.
+
+    Args:
+        groups: Liste de tuples (maturities, yields)
+        batch: Ajustement vectorisé fit_nelson_siegel_batch
+
+    Returns:
+        Liste de tuples (beta0, beta1, beta2, tau), dans l'ordre des groupes
+    """
+    if batch:
+        return fit_nelson_siegel_batch(groups)
+    return [
+        tuple(fit_nelson_siegel(np.asarray(m, dtype=float), np.asarray(y, dtype=float)))
+        for m, y in groups
+    ]
+
+
+def _fit_nelson_siegel_chunk(groups, tau_grid, refine_iterations):
+    """Ajuste un lot de courbes (voir fit_nelson_siegel_batch)"""
+    fit_points = [
+        _select_fit_points(np.asarray(m, dtype=float), np.asarray(y, dtype=float))
+        for m, y in groups
+    ]
+
+    # Matrices rectangulaires complétées (poids 0 sur le padding)
+    n_groups = len(fit_points)
+    length = max(len(m) for m, _ in fit_points)
+    M = np.ones((n_groups, length))
+    Y = np.zeros((n_groups, length))
+    W = np.zeros((n_groups, length))
+    lower = np.zeros((n_groups, 3))
+    upper = np.zeros((n_groups, 3))
+    for g, (m, y) in enumerate(fit_points):
+        M[g, :len(m)] = m
+        Y[g, :len(y)] = y
+        W[g, :len(m)] = 1.0
+        if len(y) > 0:
+            bounds = _fit_bounds(y)[:3]
+            lower[g] = [low for low, _ in bounds]
+            upper[g] = [high for _, high in bounds]
+
+    # 1) Grille commune de tau
+    sse, _ = _profile_sse(M, Y, W, np.broadcast_to(tau_grid, (n_groups, len(tau_grid))), lower, upper)
+    best = np.argmin(sse, axis=1)
+
+    # 2) Section dorée entre les voisins du meilleur point de grille
+    lo = tau_grid[np.maximum(best - 1, 0)]
+    hi = tau_grid[np.minimum(best + 1, len(tau_grid) - 1)]
+    ratio = (np.sqrt(5) - 1) / 2
+    for _ in range(refine_iterations):
+        t1 = hi - ratio * (hi - lo)
+        t2 = lo + ratio * (hi - lo)
+        sse_pair, _ = _profile_sse(M, Y, W, np.stack([t1, t2], axis=1), lower, upper)
+        left = sse_pair[:, 0] <= sse_pair[:, 1]
+        hi = np.where(left, t2, hi)
+        lo = np.where(left, lo, t1)
+
+    # 3) Retenir le meilleur candidat (le minimum peut être sur une borne de tau)
+    candidates = np.stack([(lo + hi) / 2, lo, hi, tau_grid[best]], axis=1)
+    sse, betas = _profile_sse(M, Y, W, candidates, lower, upper)
+    choice = np.argmin(sse, axis=1)
+    rows = np.arange(n_groups)
+    tau = candidates[rows, choice]
+    betas = betas[rows, choice]
+
+    results = []
+    for g, (m, y) in enumerate(groups):
+        params = (betas[g, 0], betas[g, 1], betas[g, 2], tau[g])
+        if len(fit_points[g][1]) >= 3 and np.all(np.isfinite(params)):
+            results.append(params)
+        else:
+            # Courbe dégénérée : ajustement individuel classique
+            results.append(tuple(fit_nelson_siegel(np.asarray(m, dtype=float), np.asarray(y, dtype=float))))
+
+    return results
+
+
+def _profile_sse(M, Y, W, taus, lower, upper):
+    """
+    Betas optimaux (sous contraintes de bornes) et somme des carrés
+    pour chaque couple (courbe, tau)
+
+    Args:
+        M, Y, W: Matrices (courbes x points) des maturités, spreads et poids
+        taus: Matrice (courbes x candidats) des tau à évaluer
+        lower, upper: Bornes (courbes x 3) des betas
+
+    Returns:
+        Tuple (sse [courbes x candidats], betas [courbes x candidats x 3])
+    """
+    f1, f2 = nelson_siegel_loadings(M[:, None, :], taus[:, :, None])
+    basis = np.stack([np.ones_like(f1), f1, f2], axis=-1)
+    weighted = basis * W[:, None, :, None]
+
+    shape = taus.shape
+    normal = np.einsum('gkli,gklj->gkij', weighted, basis).reshape(-1, 3, 3)
+    rhs = np.einsum('gkli,gl->gki', weighted, Y).reshape(-1, 3)
+    yy = np.repeat(np.sum(W * Y**2, axis=1), shape[1])
+    lower = np.repeat(lower, shape[1], axis=0)
+    upper = np.repeat(upper, shape[1], axis=0)
+
+    # Régularisation minime pour les courbes dégénérées (< 3 maturités distinctes)
+    normal = normal + 1e-10 * np.eye(3)
+
+    sse, betas = _box_least_squares(normal, rhs, yy, lower, upper)
+    return sse.reshape(shape), betas.reshape(shape + (3,))
+
+
+def _box_least_squares(normal, rhs, yy, lower, upper):
+    """
+    Moindres carrés à 3 variables sous contraintes de boîte, en lot
+
+    L'optimum est atteint sur l'une des 27 faces de la boîte (chaque beta
+    libre, en borne basse ou en borne haute). Chaque face se résout par un
+    système 3x3 où les betas fixés sont remplacés par leur borne ; toutes les
+    faces sont résolues d'un coup et on garde la meilleure solution admissible.
+
+    Args:
+        normal: Équations normales (N x 3 x 3)
+        rhs: Seconds membres (N x 3)
+        yy: Sommes des carrés des observations (N)
+        lower, upper: Bornes (N x 3)
+
+    Returns:
+        Tuple (sse [N], betas [N x 3])
+    """
+    fixed = _BOX_FACES > 0
+    at_upper = _BOX_FACES == 2
+
+    # Systèmes (N x 27 x 3 x 3) : ligne i remplacée par e_i si beta_i est fixé
+    system = np.where(fixed[None, :, :, None], np.eye(3)[None, None], normal[:, None])
+    bound_values = np.where(at_upper[None], upper[:, None], lower[:, None])
+    target = np.where(fixed[None], bound_values, rhs[:, None])
+
+    n_faces = len(_BOX_FACES)
+    betas = _solve_3x3(system.reshape(-1, 3, 3), target.reshape(-1, 3)).reshape(-1, n_faces, 3)
+
+    tolerance = 1e-9 * (1 + np.abs(upper - lower))[:, None]
+    within = (betas >= lower[:, None] - tolerance) & (betas <= upper[:, None] + tolerance)
+    feasible = np.all(fixed[None] | within, axis=2)
+
+    sse = (yy[:, None] - 2 * np.einsum('nfi,ni->nf', betas, rhs)
+           + np.einsum('nfi,nij,nfj->nf', betas, normal, betas))
+    sse = np.where(feasible & np.isfinite(sse), sse, np.inf)
+
+    best = np.argmin(sse, axis=1)
+    rows = np.arange(len(best))
+    best_betas = np.clip(betas[rows, best], lower, upper)
+    return sse[rows, best], best_betas
+
+
+def _solve_3x3(a, b):
+    """Résout en lot des systèmes 3x3 (règle de Cramer vectorisée)"""
+    cofactors = np.stack([
+        np.cross(a[:, 1], a[:, 2]),
+        np.cross(a[:, 2], a[:, 0]),
+        np.cross(a[:, 0], a[:, 1]),
+    ], axis=1)
+    det = np.sum(a[:, 0] * cofactors[:, 0], axis=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.einsum('nji,nj->ni', cofactors, b) / det[:, None]
+
+
+def nelson_siegel_loadings(maturity, tau):
+    """
+    Facteurs de pente et de courbure Nelson-Siegel
+
+    Args:
+        maturity: Maturités (array)
+        tau: Paramètre de décroissance (array compatible par broadcasting)
+
+    Returns:
+        Tuple (f1, f2) tel que NS = beta0 + beta1 * f1 + beta2 * f2
+    """
+    x = maturity / np.maximum(tau, 0.1)
+    decay = np.exp(-x)
+    f1 = (1 - decay) / x
+    return f1, f1 - decay
+
+
+def nelson_siegel_loadings_derivative(maturity, tau):
+    """
+    Dérivées des facteurs Nelson-Siegel par rapport à tau
+
+    Args:
+        maturity: Maturités (array)
+        tau: Paramètre de décroissance
+
+    Returns:
+        Tuple (d f1 / d tau, d f2 / d tau)
+    """
+    tau = np.maximum(tau, 0.1)
+    x = maturity / tau
+    decay = np.exp(-x)
+    df1_dx = (decay * (x + 1) - 1) / x**2
+    dx_dtau = -x / tau
+    return df1_dx * dx_dtau, (df1_dx + decay) * dx_dtau
+
+
+def _select_fit_points(maturities, yields):
+    """Points utilisés pour l'ajustement (<= 7 ans, sinon tous)"""
     short_mask = maturities <= 7.0
     maturities_fit = maturities[short_mask]
     yields_fit = yields[short_mask]
@@ -49,42 +449,29 @@ def fit_nelson_siegel(maturities, yields):
         maturities_fit = maturities
         yields_fit = yields
 
-    def objective(params):
-        beta0, beta1, beta2, tau = params
-        predicted = nelson_siegel(maturities_fit, beta0, beta1, beta2, tau)
-        return np.sum((yields_fit - predicted)**2)
+    return maturities_fit, yields_fit
 
-    # Paramètres initiaux
+
+def _initial_params(yields_fit):
+    """Paramètres initiaux (beta0, beta1, beta2, tau)"""
     initial_beta0 = np.mean(yields_fit)
     initial_beta1 = yields_fit[0] - yields_fit[-1] if len(yields_fit) > 1 else 0
     initial_beta2 = 0
     initial_tau = 2.0
+    return [initial_beta0, initial_beta1, initial_beta2, initial_tau]
+
 
-    # Contraintes sur les paramètres
-    bounds = [
+def _fit_bounds(yields_fit):
+    """Contraintes sur les paramètres (beta0, beta1, beta2, tau)"""
+    return [
         (max(0, np.min(yields_fit) * 0.5), np.max(yields_fit) * 2),  # beta0
         (-np.max(yields_fit), np.max(yields_fit)),  # beta1
         (-np.max(yields_fit)/2, np.max(yields_fit)/2),  # beta2
-        (0.5, 10.0)  # tau
+        (TAU_MIN, TAU_MAX)  # tau
     ]
 
-    try:
-        result = minimize(
-            objective,
-            [initial_beta0, initial_beta1, initial_beta2, initial_tau],
-            bounds=bounds,
-            method='L-BFGS-B'
-        )
-
-        if result.success:
-            return result.x
-        else:
-            return [initial_beta0, initial_beta1, initial_beta2, initial_tau]
-    except:
-        return [initial_beta0, initial_beta1, initial_beta2, initial_tau]
-
 
-def create_nelson_siegel_curve(maturities, yields, risk_grid=None):
+def create_nelson_siegel_curve(maturities, yields, risk_grid=None, params=None):
     """
     Crée une courbe Nelson-Siegel avec extension linéaire après 7 ans
 
@@ -92,6 +479,7 @@ def create_nelson_siegel_curve(maturities, yields, risk_grid=None):
         maturities: Array des maturités observées
         yields: Array des spreads observés
         risk_grid: Grille de points où calculer la courbe (défaut: 0-15 par 0.1)
+        params: Paramètres déjà ajustés (ex: fit_nelson_siegel_batch), sinon ajustement
 
     Returns:
         Tuple (risk_grid, curve_values, params)
@@ -100,7 +488,9 @@ def create_nelson_siegel_curve(maturities, yields, risk_grid=None):
         risk_grid = np.arange(0, 15.1, 0.1)
 
     # Ajuster Nelson-Siegel
-    beta0, beta1, beta2, tau = fit_nelson_siegel(maturities, yields)
+    if params is None:
+        params = fit_nelson_siegel(maturities, yields)
+    beta0, beta1, beta2, tau = params
 
     # Partie Nelson-Siegel (0 à 7 ans)
     risk_short = risk_grid[risk_grid <= 7.0]
@@ -131,12 +521,25 @@ def remove_outliers_iqr(data, factor=1.5):
     Returns:
         DataFrame nettoyé
     """
-    Q1 = data['zspread'].quantile(0.25)
-    Q3 = data['zspread'].quantile(0.75)
+    return data[iqr_mask(data['zspread'].to_numpy(dtype=float), factor)]
+
+
+def iqr_mask(values, factor=1.5):
+    """
+    Masque des valeurs à conserver selon la méthode IQR (version array)
+
+    Args:
+        values: Array des valeurs (NaN ignorés pour les quantiles)
+        factor: Facteur multiplicatif pour IQR (défaut: 1.5)
+
+    Returns:
+        Array booléen
+    """
+    Q1, Q3 = np.nanquantile(values, [0.25, 0.75])
     IQR = Q3 - Q1
     lower = Q1 - factor * IQR
     upper = Q3 + factor * IQR
-    return data[(data['zspread'] >= lower) & (data['zspread'] <= upper)]
+    return (values >= lower) & (values <= upper)
 
 
 def adjust_curve_to_market_points(curve_shape, curve_risk_grid, market_points_risk, market_points_spread):
@@ -204,7 +607,7 @@ def calculate_adjustment_score(score_liquidite, score_equity, score_solidite):
     Returns:
         Pourcentage d'ajustement total (float)
     """
-    adjustments = {1: -20, 2: -10, 3: 0, 4: 10, 5: 20}
+    adjustments = SCORE_ADJUSTMENTS
 
     adjustment_liquidite = adjustments[score_liquidite]
     adjustment_equity = adjustments[score_equity]
@@ -214,3 +617,39 @@ def calculate_adjustment_score(score_liquidite, score_equity, score_solidite):
     total_adjustment_pct = (adjustment_liquidite + adjustment_equity + adjustment_solidite) / 3
 
     return total_adjustment_pct
+
+
+def calculate_adjustment_scores(scenarios):
+    """
+    Version vectorisée de calculate_adjustment_score
+
+    Args:
+        scenarios: Array (n, 3) de scores (liquidité, equity, solidité), chacun de 1 à 5
+
+    Returns:
+        Array (n,) des pourcentages d'ajustement
+
+    Raises:
+        ValueError: Score hors de 1-5
+    """
+    scores = np.asarray(scenarios, dtype=int).reshape(-1, 3)
+    if scores.size and (scores.min() < 1 or scores.max() > 5):
+        raise ValueError("Les scores doivent être compris entre 1 et 5")
+
+    lookup = np.array([np.nan] + [SCORE_ADJUSTMENTS[score] for score in range(1, 6)])
+    return lookup[scores].sum(axis=1) / 3
+
+
+def scale_curve_scenarios(curve_base, adjustment_pcts):
+    """
+    Applique chaque ajustement à une courbe de base (broadcast NumPy)
+
+    Args:
+        curve_base: Courbe de base (array de taille g)
+        adjustment_pcts: Pourcentages d'ajustement (array de taille n)
+
+    Returns:
+        Matrice (n, g) : ligne i = curve_base * (1 + adjustment_pcts[i] / 100)
+    """
+    factors = 1 + np.asarray(adjustment_pcts, dtype=float) / 100
+    return factors[:, None] * np.asarray(curve_base, dtype=float)[None, :]
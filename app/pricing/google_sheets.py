@@ -3,22 +3,36 @@ Gestion de la connexion et chargement des données depuis Google Sheets
 Migré depuis l'application Streamlit
 """
 
+import numpy as np
 import pandas as pd
-import gspread
-from google.oauth2.service_account import Credentials
+from gspread.exceptions import APIError
+from gspread.utils import absolute_range_name, extract_id_from_url
 import os
 
+from app.google_client import google_clients
+from app.metrics import metrics
+from app.singleflight import SingleFlight
+from .mirror import ColumnarMirror
+
+
+# Chargements concurrents des onglets de marché regroupés en un seul appel
+_pricing_loads = SingleFlight('pricing_data_loads')
+
 
 class GoogleSheetsLoader:
     """Gestionnaire de connexion Google Sheets pour les données de pricing"""
 
-    def __init__(self, credentials_file=None, sheet_url=None):
+    def __init__(self, credentials_file=None, sheet_url=None, mirror_dir=None, offline=None, fast=None):
         """
         Initialise le loader Google Sheets
 
         Args:
             credentials_file: Chemin vers credentials.json (défaut: depuis config)
             sheet_url: URL du Google Sheet (défaut: depuis config ou .env)
+            mirror_dir: Répertoire du miroir local en colonnes (défaut: MARKET_DATA_MIRROR_DIR)
+            offline: Lire uniquement le miroir local, sans Google Sheets (défaut: MARKET_DATA_OFFLINE)
+            fast: Lire les deux onglets en un seul appel (valeurs brutes typées)
+                  plutôt qu'avec get_all_records (défaut: MARKET_DATA_FAST_LOAD, activé)
         """
         self.credentials_file = credentials_file or os.getenv('GOOGLE_CREDENTIALS_FILE', 'credentials.json')
         self.sheet_url = sheet_url or os.getenv(
@@ -27,30 +41,58 @@ class GoogleSheetsLoader:
         )
         self.gc = None
 
-    def connect(self):
-        """Établit la connexion avec Google Sheets"""
-        try:
-            # Définir les scopes nécessaires
-            scopes = [
-                'https://www.googleapis.com/auth/spreadsheets',
-                'https://www.googleapis.com/auth/drive'
-            ]
-
-            # Charger les credentials
-            creds = Credentials.from_service_account_file(
-                self.credentials_file,
-                scopes=scopes
-            )
+        mirror_dir = mirror_dir or os.getenv('MARKET_DATA_MIRROR_DIR')
+        self.mirror = ColumnarMirror(mirror_dir) if mirror_dir else None
+        if offline is None:
+            offline = os.getenv('MARKET_DATA_OFFLINE', '').lower() in ('1', 'true', 'yes')
+        self.offline = offline and self.mirror is not None
+        if fast is None:
+            fast = os.getenv('MARKET_DATA_FAST_LOAD', '1').lower() in ('1', 'true', 'yes')
+        self.fast = fast
 
-            # Autoriser gspread
-            self.gc = gspread.authorize(creds)
+    def connect(self):
+        """
+        Établit la connexion avec Google Sheets
 
+        Le client autorisé est partagé par tout le process (google_clients) :
+        credentials lus et jeton obtenu une seule fois, session HTTP réutilisée.
+        """
+        try:
+            self.gc = google_clients.client(self.credentials_file)
             return True
 
         except Exception as e:
             print(f"Erreur connexion Google Sheets: {e}")
             return False
 
+    def get_last_update_time(self):
+        """
+        Retourne la date de dernière modification du Google Sheet
+
+        Un seul appel à l'API Drive, sans télécharger les onglets : sert de
+        vérification de changement bon marché pour le cache de snapshot.
+
+        En mode hors-ligne, retourne l'identifiant de la version courante du miroir.
+
+        Returns:
+            String ISO 8601 ou None en cas d'erreur
+        """
+        if self.offline:
+            return self.mirror.current_name()
+
+        try:
+            if self.gc is None:
+                if not self.connect():
+                    return None
+
+            metadata = self.gc.get_file_drive_metadata(extract_id_from_url(self.sheet_url))
+            return metadata.get('modifiedTime')
+
+        except Exception as e:
+            print(f"Erreur lecture date de modification Google Sheets: {e}")
+            return None
+
+    @metrics.instrument('load_pricing_data')
     def load_pricing_data(self):
         """
         Charge les données de pricing depuis Google Sheets
@@ -60,97 +102,181 @@ class GoogleSheetsLoader:
             - df_all: DataFrame Data_All (tous les points de marché)
             - df_gr: DataFrame Data_GR (ratings des émetteurs)
             - df_merged: DataFrame fusionné (all + ratings)
+
+        Les appels concurrents pour la même source partagent un seul
+        chargement (single-flight) : les DataFrames retournés peuvent être
+        partagés et ne doivent pas être modifiés en place.
         """
+        return _pricing_loads.do(
+            (self.credentials_file, self.sheet_url, self.offline, self.fast,
+             self.mirror.root_dir if self.mirror is not None else None),
+            self._load_pricing_data
+        )
+
+    def _load_pricing_data(self):
+        """Chargement effectif (un seul à la fois par source, cf. load_pricing_data)"""
+        if self.offline:
+            df_all, df_gr, df_merged, _ = self.load_pricing_data_from_mirror()
+            return df_all, df_gr, df_merged
+
         try:
             if self.gc is None:
                 if not self.connect():
                     raise Exception("Impossible de se connecter à Google Sheets")
 
-            # Ouvrir le spreadsheet
-            sh = self.gc.open_by_url(self.sheet_url)
-
-            # Lire Data_All (premier onglet)
-            worksheet_all = sh.get_worksheet(0)
-            data_all_raw = worksheet_all.get_all_records()
-            df_all = pd.DataFrame(data_all_raw)
-
-            # Lire Data_GR (deuxième onglet)
-            worksheet_gr = sh.get_worksheet(1)
-            data_gr_raw = worksheet_gr.get_all_records()
-            df_gr = pd.DataFrame(data_gr_raw)
-
-            # Convertir les colonnes numériques pour df_all
-            numeric_cols_all = ['zspread', 'riskmid']
-            for col in numeric_cols_all:
-                if col in df_all.columns:
-                    df_all[col] = pd.to_numeric(df_all[col], errors='coerce')
-
-            # Convertir les colonnes numériques pour df_gr
-            if 'Note' in df_gr.columns:
-                df_gr['Note'] = pd.to_numeric(df_gr['Note'], errors='coerce')
-
-            if 'LinReg' in df_gr.columns:
-                df_gr['LinReg'] = pd.to_numeric(df_gr['LinReg'], errors='coerce')
+            if self.fast:
+                df_all, df_gr = self._fetch_tabs_fast()
+            else:
+                df_all, df_gr = self._fetch_tabs_records()
 
             # Nettoyer les données
-            df_all = df_all.dropna(subset=['zspread', 'riskmid', 'ticker_corp', 'payment_rank'])
-            df_all = df_all[(df_all['zspread'] > 0) & (df_all['riskmid'] > 0)]
+            df_all = self.clean_data_all(df_all)
 
-            # Joindre avec les ratings
-            df_merged = df_all.merge(
-                df_gr[['ticker_corp', 'Note', 'Rating']],
-                on='ticker_corp',
-                how='left'
-            )
-
-            return df_all, df_gr, df_merged
+            return df_all, df_gr, self.merge_ratings(df_all, df_gr)
 
         except Exception as e:
             print(f"Erreur chargement données Google Sheets: {e}")
             # Retourner des DataFrames vides en cas d'erreur
             return pd.DataFrame(), pd.DataFrame(), pd.DataFrame()
 
-    def get_available_issuers(self, df_all):
-        """Retourne la liste des émetteurs disponibles"""
-        return sorted(df_all['ticker_corp'].unique())
+    def _fetch_tabs_fast(self):
+        """
+        Lit Data_All et Data_GR en un seul appel API (values_batch_get)
 
-    def get_available_seniorities(self, df_all):
-        """Retourne la liste des séniorités disponibles"""
-        all_seniorities = ['SP', 'SLA', 'T2', 'AT1']
-        available_seniorities = sorted(df_all['payment_rank'].unique())
-        return [s for s in all_seniorities if s in available_seniorities]
+        Les grilles de valeurs brutes sont converties colonne par colonne :
+        colonnes numériques directement en tableaux float64, sans dict par
+        ligne ni DataFrame intermédiaire.
 
-    def get_issuer_data(self, df_all, issuer, seniority):
+        Returns:
+            Tuple (df_all, df_gr)
         """
-        Retourne les données pour un émetteur et une séniorité donnés
-
-        Args:
-            df_all: DataFrame avec toutes les données
-            issuer: Nom de l'émetteur
-            seniority: Séniorité (SP, SLA, T2, AT1)
+        sh = google_clients.open_by_url(self.credentials_file, self.sheet_url)
+
+        # Titres des onglets mis en cache ; relus une fois si l'appel échoue
+        for refresh in (False, True):
+            titles = google_clients.worksheet_titles(self.credentials_file, sh, refresh=refresh)[:2]
+            try:
+                response = sh.values_batch_get([absolute_range_name(title) for title in titles])
+                break
+            except APIError:
+                if refresh:
+                    raise
+
+        value_ranges = response.get('valueRanges', [])
+        grids = [value_range.get('values', []) for value_range in value_ranges] + [[], []]
+
+        df_all = frame_from_values(grids[0], numeric_columns=('zspread', 'riskmid'))
+        df_gr = frame_from_values(grids[1], numeric_columns=('Note', 'LinReg'))
+        return df_all, df_gr
+
+    def _fetch_tabs_records(self):
+        """
+        Lit Data_All et Data_GR onglet par onglet (get_all_records)
 
         Returns:
-            DataFrame filtré
+            Tuple (df_all, df_gr)
         """
-        return df_all[
-            (df_all['ticker_corp'] == issuer) &
-            (df_all['payment_rank'] == seniority)
-        ].copy()
+        # Ouvrir le spreadsheet (handle partagé)
+        sh = google_clients.open_by_url(self.credentials_file, self.sheet_url)
+
+        # Lire Data_All (premier onglet)
+        worksheet_all = sh.get_worksheet(0)
+        data_all_raw = worksheet_all.get_all_records()
+        df_all = pd.DataFrame(data_all_raw)
+
+        # Lire Data_GR (deuxième onglet)
+        worksheet_gr = sh.get_worksheet(1)
+        data_gr_raw = worksheet_gr.get_all_records()
+        df_gr = pd.DataFrame(data_gr_raw)
+
+        # Convertir les colonnes numériques pour df_all
+        numeric_cols_all = ['zspread', 'riskmid']
+        for col in numeric_cols_all:
+            if col in df_all.columns:
+                df_all[col] = pd.to_numeric(df_all[col], errors='coerce')
+
+        # Convertir les colonnes numériques pour df_gr
+        if 'Note' in df_gr.columns:
+            df_gr['Note'] = pd.to_numeric(df_gr['Note'], errors='coerce')
+
+        if 'LinReg' in df_gr.columns:
+            df_gr['LinReg'] = pd.to_numeric(df_gr['LinReg'], errors='coerce')
+
+        return df_all, df_gr
+
+    def clean_data_all(self, df_all):
+        """Retire les points incomplets ou à spread / risque non positif"""
+        df_all = df_all.dropna(subset=['zspread', 'riskmid', 'ticker_corp', 'payment_rank'])
+        return df_all[(df_all['zspread'] > 0) & (df_all['riskmid'] > 0)]
+
+    def merge_ratings(self, df_all, df_gr):
+        """Joint les points de marché avec les ratings des émetteurs"""
+        return df_all.merge(
+            df_gr[['ticker_corp', 'Note', 'Rating']],
+            on='ticker_corp',
+            how='left'
+        )
 
-    def get_seniority_data(self, df_merged, seniority):
+    def save_mirror(self, df_all, df_gr, version=None, source_modified=None, df_merged=None):
         """
-        Retourne toutes les données pour une séniorité donnée
+        Écrit les onglets nettoyés dans le miroir local (publication atomique)
 
         Args:
-            df_merged: DataFrame fusionné (avec ratings)
-            seniority: Séniorité (SP, SLA, T2, AT1)
+            df_all: DataFrame Data_All nettoyé
+            df_gr: DataFrame Data_GR
+            version: Empreinte du contenu
+            source_modified: Date de modification du Google Sheet
+
+        Returns:
+            True si le miroir a été écrit
+        """
+        if self.mirror is None or self.offline:
+            return False
+
+        try:
+            self.mirror.write(df_all, df_gr, version=version, source_modified=source_modified, df_merged=df_merged)
+            return True
+        except Exception as e:
+            print(f"Erreur écriture miroir local: {e}")
+            return False
+
+    def load_pricing_data_from_mirror(self):
+        """
+        Charge les données de pricing depuis le miroir local (mémoire mappée)
 
         Returns:
-            DataFrame filtré
+            Tuple (df_all, df_gr, df_merged, metadata)
+            DataFrames vides et metadata None si le miroir est absent ou illisible
         """
-        return df_merged[
-            df_merged['payment_rank'] == seniority
-        ].dropna(subset=['Note']).copy()
+        try:
+            result = self.mirror.read() if self.mirror is not None else None
+            if result is None:
+                return pd.DataFrame(), pd.DataFrame(), pd.DataFrame(), None
+
+            df_all, df_gr, manifest = result
+            df_merged = self.mirror.read_table(manifest, 'merged')
+            if df_merged is None:
+                df_merged = self.merge_ratings(df_all, df_gr)
+            metadata = {
+                'version': manifest.get('version'),
+                'source_modified': manifest['name'] if self.offline else manifest.get('source_modified'),
+                'written_at': manifest.get('written_at'),
+            }
+            return df_all, df_gr, df_merged, metadata
+
+        except Exception as e:
+            print(f"Erreur lecture miroir local: {e}")
+            return pd.DataFrame(), pd.DataFrame(), pd.DataFrame(), None
+
+    def get_available_issuers(self, df_all):
+        """Retourne la liste des émetteurs disponibles"""
+        return sorted(df_all['ticker_corp'].unique())
+
+    def get_available_seniorities(self, df_all):
+        """Retourne la liste des séniorités disponibles"""
+        all_seniorities = ['SP', 'SLA', 'T2', 'AT1']
+        available_seniorities = sorted(df_all['payment_rank'].unique())
+        return [s for s in all_seniorities if s in available_seniorities]
 
     def get_issuer_rating(self, df_gr, issuer):
         """
@@ -166,3 +292,40 @@ class GoogleSheetsLoader:
         if issuer in df_gr['ticker_corp'].values:
             return df_gr[df_gr['ticker_corp'] == issuer]['Note'].iloc[0]
         return None
+
+
+def frame_from_values(values, numeric_columns=()):
+    """
+    Construit un DataFrame à partir d'une grille de valeurs Google Sheets
+
+    La première ligne contient les en-têtes ; les lignes raccourcies par
+    l'API (cellules vides en fin de ligne) sont complétées par ''.
+
+    Args:
+        values: Liste de lignes (listes de valeurs)
+        numeric_columns: Colonnes converties en float64 (valeurs invalides -> NaN)
+
+    Returns:
+        DataFrame
+    """
+    if not values:
+        return pd.DataFrame()
+
+    header = [str(name) for name in values[0]]
+    width = len(header)
+    rows = values[1:]
+    if not rows:
+        return pd.DataFrame(columns=header)
+
+    grid = np.empty((len(rows), width), dtype=object)
+    grid[:] = ''
+    for i, row in enumerate(rows):
+        grid[i, :min(len(row), width)] = row[:width]
+
+    columns = {}
+    for j, name in enumerate(header):
+        if name in numeric_columns:
+            columns[name] = pd.to_numeric(grid[:, j], errors='coerce').astype(float)
+        else:
+            columns[name] = grid[:, j]
+    return pd.DataFrame(columns, columns=header)
@@ -0,0 +1,298 @@
+"""
+File de calculs asynchrones (courbes, univers)
+La requête HTTP soumet un job et rend la main ; le calcul tourne dans un pool borné
+Statuts et résultats sont enregistrés dans SQLite, lisibles par tous les workers gunicorn
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from .pipeline import json_default
+
+
+PENDING = 'pending'
+RUNNING = 'running'
+DONE = 'done'
+ERROR = 'error'
+
+COLUMNS = ['id', 'kind', 'owner', 'status', 'result', 'error', 'created_at', 'started_at', 'finished_at']
+
+
+class QueueFullError(Exception):
+    """Levée quand trop de jobs sont déjà en attente"""
+
+
+class Job:
+    """Un calcul soumis à la file (statut, résultat ou erreur)"""
+
+    def __init__(self, kind, owner=None, job_id=None):
+        self.id = job_id or uuid.uuid4().hex
+        self.kind = kind
+        self.owner = owner
+        self.status = PENDING
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+
+    @classmethod
+    def from_row(cls, row):
+        """Reconstruit un job depuis une ligne de la table jobs"""
+        job = cls(row['kind'], owner=row['owner'], job_id=row['id'])
+        job.status = row['status']
+        job.result = json.loads(row['result']) if row['result'] is not None else None
+        job.error = row['error']
+        job.created_at = row['created_at']
+        job.started_at = row['started_at']
+        job.finished_at = row['finished_at']
+        return job
+
+    @property
+    def finished(self):
+        return self.status in (DONE, ERROR)
+
+    def info(self, include_result=True):
+        """Statut du job (pour les endpoints de polling)"""
+        info = {
+            'job_id': self.id,
+            'kind': self.kind,
+            'status': self.status,
+            'created_at': datetime.fromtimestamp(self.created_at).isoformat(),
+            'started_at': datetime.fromtimestamp(self.started_at).isoformat() if self.started_at else None,
+            'finished_at': datetime.fromtimestamp(self.finished_at).isoformat() if self.finished_at else None,
+        }
+        if self.status == ERROR:
+            info['error'] = self.error
+        if self.status == DONE and include_result:
+            info['result'] = self.result
+        return info
+
+
+class JobQueue:
+    """
+    File de jobs servie par un pool de threads borné, état partagé dans SQLite
+
+    Le calcul (chargement Google Sheets, clustering, ajustements) sort du
+    thread de la requête : un worker gunicorn ne reste plus bloqué pendant un
+    calcul long. Le job s'exécute dans le worker qui l'a reçu ; son statut et
+    son résultat sont écrits dans la table jobs (JOB_DB_PATH), si bien que le
+    polling peut arriver sur n'importe quel worker de la machine.
+
+    Le nombre de jobs en attente est borné (QueueFullError, tous workers
+    confondus) et les jobs sont oubliés ttl secondes après leur fin. Un job
+    jamais terminé au bout de ttl secondes (worker arrêté pendant le calcul)
+    est oublié aussi.
+    """
+
+    def __init__(self, path='instance/jobs.db', max_workers=2, max_pending=100, ttl=3600, max_jobs=1000,
+                 poll_interval=0.2):
+        """
+        Args:
+            path: Fichier de la base SQLite des jobs
+            max_workers: Nombre de threads de calcul
+            max_pending: Nombre maximum de jobs en attente ou en cours
+            ttl: Durée de conservation d'un job terminé (secondes)
+            max_jobs: Nombre maximum de jobs conservés
+            poll_interval: Intervalle de relecture de la base pendant un long-poll (secondes)
+        """
+        self.path = path
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.ttl = ttl
+        self.max_jobs = max_jobs
+        self.poll_interval = poll_interval
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._executor = None
+        # Jobs lancés par ce process : fin signalée sans relire la base
+        self._events = {}
+        self.submitted = 0
+        self.rejected = 0
+
+    def init_app(self, app):
+        """Configure la file depuis la configuration Flask"""
+        self.path = app.config.get('JOB_DB_PATH', self.path)
+        self.max_workers = app.config.get('JOB_WORKERS', self.max_workers)
+        self.max_pending = app.config.get('JOB_MAX_PENDING', self.max_pending)
+        self.ttl = app.config.get('JOB_TTL', self.ttl)
+
+    def submit(self, kind, func, *args, owner=None, **kwargs):
+        """
+        Soumet un calcul
+
+        Args:
+            kind: Type de job (ex: 'curves', 'universe')
+            func: Fonction à exécuter ; son résultat doit être sérialisable en JSON
+            owner: Identifiant du propriétaire (seul autorisé à lire le job)
+
+        Returns:
+            Job
+
+        Raises:
+            QueueFullError: Trop de jobs en attente
+        """
+        job = Job(kind, owner=owner)
+
+        with self._connection() as conn:
+            # Transaction d'écriture : comptage et insertion atomiques entre workers
+            conn.execute("BEGIN IMMEDIATE")
+            self._purge(conn)
+
+            pending = conn.execute(
+                "SELECT COUNT(*) FROM jobs WHERE status IN (?, ?)", (PENDING, RUNNING)
+            ).fetchone()[0]
+            if pending >= self.max_pending:
+                self.rejected += 1
+                raise QueueFullError(f"{pending} jobs déjà en attente")
+
+            conn.execute(
+                f"INSERT INTO jobs ({', '.join(COLUMNS)}) VALUES ({', '.join('?' * len(COLUMNS))})",
+                (job.id, job.kind, _to_owner(owner), job.status, None, None, job.created_at, None, None)
+            )
+
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers,
+                    thread_name_prefix='pricing-job'
+                )
+            self._events[job.id] = threading.Event()
+            self.submitted += 1
+
+        self._executor.submit(self._run, job, func, args, kwargs)
+        return job
+
+    def get(self, job_id, owner=None):
+        """
+        Retourne un job (None s'il est inconnu, expiré ou appartient à un autre utilisateur)
+        """
+        row = self._connection().execute(
+            f"SELECT {', '.join(COLUMNS)} FROM jobs WHERE id = ?", (job_id,)
+        ).fetchone()
+        if row is None or (row['owner'] is not None and row['owner'] != _to_owner(owner)):
+            return None
+        return Job.from_row(row)
+
+    def wait(self, job_id, owner=None, timeout=None):
+        """
+        Attend la fin d'un job (long-poll)
+
+        Un job lancé par ce process est attendu sur son Event ; un job d'un
+        autre worker est relu dans la base toutes les poll_interval secondes.
+
+        Returns:
+            Job (terminé ou non à l'expiration du délai), ou None comme get()
+        """
+        job = self.get(job_id, owner=owner)
+        if job is None or job.finished or not timeout:
+            return job
+
+        event = self._events.get(job_id)
+        if event is not None:
+            event.wait(timeout)
+            return self.get(job_id, owner=owner)
+
+        deadline = time.monotonic() + timeout
+        while not job.finished:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            time.sleep(min(self.poll_interval, remaining))
+            job = self.get(job_id, owner=owner)
+            if job is None:
+                return None
+        return job
+
+    def stats(self):
+        """Compteurs de la file (statuts : tous workers confondus, sans créer la base si elle n'existe pas)"""
+        counts = {}
+        if getattr(self._local, 'conn', None) is not None or os.path.exists(self.path):
+            counts = dict(self._connection().execute(
+                "SELECT status, COUNT(*) FROM jobs GROUP BY status"
+            ).fetchall())
+        return {
+            'workers': self.max_workers,
+            'submitted': self.submitted,
+            'rejected': self.rejected,
+            'pending': counts.get(PENDING, 0),
+            'running': counts.get(RUNNING, 0),
+            'done': counts.get(DONE, 0),
+            'error': counts.get(ERROR, 0),
+        }
+
+    def _run(self, job, func, args, kwargs):
+        """Exécute un job dans un thread du pool"""
+        try:
+            self._update(job.id, status=RUNNING, started_at=time.time())
+            try:
+                result = json.dumps(func(*args, **kwargs), default=json_default)
+                self._update(job.id, status=DONE, result=result, finished_at=time.time())
+            except Exception as e:
+                print(f"Erreur job {job.kind} {job.id}: {e}")
+                self._update(job.id, status=ERROR, error=str(e), finished_at=time.time())
+        except Exception as e:
+            print(f"Erreur enregistrement job {job.kind} {job.id}: {e}")
+        finally:
+            with self._lock:
+                event = self._events.pop(job.id, None)
+            if event is not None:
+                event.set()
+
+    def _update(self, job_id, **values):
+        with self._connection() as conn:
+            conn.execute(
+                f"UPDATE jobs SET {', '.join(f'{c} = ?' for c in values)} WHERE id = ?",
+                list(values.values()) + [job_id]
+            )
+
+    def _purge(self, conn):
+        """Oublie les jobs expirés ou en excès (appelé dans la transaction de submit)"""
+        now = time.time()
+        conn.execute(
+            "DELETE FROM jobs WHERE (finished_at IS NOT NULL AND finished_at < ?) "
+            "OR (finished_at IS NULL AND created_at < ?)",
+            (now - self.ttl, now - self.ttl)
+        )
+        conn.execute(
+            "DELETE FROM jobs WHERE id IN ("
+            "SELECT id FROM jobs WHERE finished_at IS NOT NULL ORDER BY finished_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_jobs,)
+        )
+
+    def _connection(self):
+        """Connexion SQLite du thread courant (rouverte après un fork, schéma créé au premier accès)"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None and self._local.pid == os.getpid():
+            return conn
+
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs (id TEXT PRIMARY KEY, kind TEXT, owner TEXT, status TEXT, "
+            "result TEXT, error TEXT, created_at REAL, started_at REAL, finished_at REAL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_finished_at ON jobs (finished_at)")
+
+        self._local.conn = conn
+        self._local.pid = os.getpid()
+        return conn
+
+
+def _to_owner(owner):
+    """Propriétaire stocké en TEXT (les id utilisateurs sont comparés comme chaînes)"""
+    return None if owner is None else str(owner)
+
+
+# Instance globale
+job_queue = JobQueue()
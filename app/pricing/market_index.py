@@ -0,0 +1,176 @@
+"""
+Index de partition (séniorité, émetteur) sur les données de marché
+Construit une fois par snapshot : les recherches deviennent des tranches contiguës
+"""
+
+import numpy as np
+import pandas as pd
+
+
+# Colonnes de partition des deux dispositions
+ISSUER_KEYS = ['payment_rank', 'ticker_corp']
+SENIORITY_KEYS = ['payment_rank']
+
+
+class MarketIndex:
+    """
+    Index des données de marché par séniorité et par émetteur
+
+    Deux dispositions triées sont construites une seule fois :
+    - issuer_frame : Data_All trié par (payment_rank, ticker_corp, riskmid)
+    - seniority_frame : données fusionnées avec Note, triées par (payment_rank, riskmid)
+
+    Chaque recherche renvoie une tranche iloc[start:stop] (vue, sans copie)
+    déjà triée par riskmid. Les tranches sont partagées : ne pas les modifier
+    en place.
+
+    Des données déjà dans cette disposition (miroir écrit après
+    partition_frames) ne sont pas recopiées : seules les bornes des groupes
+    sont calculées, et les dispositions sont des vues sur les colonnes en
+    mémoire mappée, partagées par tous les workers.
+    """
+
+    def __init__(self, df_all, df_merged):
+        """
+        Args:
+            df_all: DataFrame Data_All nettoyé
+            df_merged: DataFrame fusionné (all + ratings)
+        """
+        self.issuer_frame, self._issuer_bounds = _partition(df_all, ISSUER_KEYS)
+        self.seniority_frame, self._seniority_bounds = _partition(_noted_rows(df_merged), SENIORITY_KEYS)
+
+    def issuer_data(self, issuer, seniority):
+        """
+        Retourne les points d'un émetteur pour une séniorité (triés par riskmid)
+
+        Args:
+            issuer: Nom de l'émetteur
+            seniority: Séniorité (SP, SLA, T2, AT1)
+
+        Returns:
+            DataFrame (vue, éventuellement vide)
+        """
+        start, stop = self._issuer_bounds.get((seniority, issuer), (0, 0))
+        return self.issuer_frame.iloc[start:stop]
+
+    def seniority_data(self, seniority):
+        """
+        Retourne tous les points notés d'une séniorité (triés par riskmid)
+
+        Args:
+            seniority: Séniorité (SP, SLA, T2, AT1)
+
+        Returns:
+            DataFrame (vue, éventuellement vide)
+        """
+        start, stop = self._seniority_bounds.get((seniority,), (0, 0))
+        return self.seniority_frame.iloc[start:stop]
+
+    def has_seniority(self, seniority):
+        """True si la séniorité a des points notés"""
+        return (seniority,) in self._seniority_bounds
+
+    def has_issuer(self, issuer, seniority):
+        """True si l'émetteur a des points dans cette séniorité"""
+        return (seniority, issuer) in self._issuer_bounds
+
+    def issuers(self, seniority=None):
+        """Liste des émetteurs (optionnellement pour une séniorité), triée"""
+        return sorted({
+            issuer for rank, issuer in self._issuer_bounds
+            if seniority is None or rank == seniority
+        })
+
+    def seniorities(self):
+        """Liste des séniorités présentes dans l'index"""
+        return sorted({rank for rank, _ in self._issuer_bounds})
+
+
+def partition_frames(df_all, df_merged=None):
+    """
+    Réordonne les données dans la disposition de MarketIndex (avant écriture du miroir)
+
+    Args:
+        df_all: DataFrame Data_All nettoyé
+        df_merged: DataFrame fusionné (optionnel) : lignes notées groupées
+                   par séniorité puis lignes sans Note
+
+    Returns:
+        Tuple (df_all, df_merged) réordonnés (df_merged None s'il n'est pas fourni)
+    """
+    if not df_all.empty:
+        df_all = df_all.iloc[_full_order(df_all, ISSUER_KEYS)].reset_index(drop=True)
+
+    if df_merged is not None and not df_merged.empty:
+        noted = df_merged['Note'].notna().to_numpy()
+        noted_positions = np.flatnonzero(noted)
+        noted_order = noted_positions[_full_order(df_merged.iloc[noted_positions], SENIORITY_KEYS)]
+        order = np.concatenate([noted_order, np.flatnonzero(~noted)])
+        df_merged = df_merged.iloc[order].reset_index(drop=True)
+
+    return df_all, df_merged
+
+
+def _full_order(df, keys):
+    """Ordre de _partition, suivi des lignes sans clé de partition (conservées à la fin)"""
+    if df.empty:
+        return np.arange(0)
+    order, _ = _partition_order(df, keys)
+    rest = np.setdiff1d(np.arange(len(df)), order, assume_unique=True)
+    return np.concatenate([order, rest])
+
+
+def _noted_rows(df_merged):
+    """Lignes avec Note : tranche de tête sans copie si elles précèdent les autres (cf. partition_frames)"""
+    if df_merged.empty:
+        return df_merged
+
+    noted = df_merged['Note'].notna().to_numpy()
+    count = int(noted.sum())
+    if noted[:count].all():
+        return df_merged.iloc[:count]
+    return df_merged[noted]
+
+
+def _partition(df, keys):
+    """
+    Réordonne un DataFrame en groupes contigus triés par riskmid
+
+    Un DataFrame déjà dans cet ordre (et indexé 0..n-1) est retourné tel
+    quel, sans copie (tranche de tête si des lignes sans clé le terminent).
+
+    Args:
+        df: DataFrame source
+        keys: Colonnes de partition
+
+    Returns:
+        Tuple (frame réordonné, dict clé -> (start, stop))
+    """
+    if df.empty:
+        return df.reset_index(drop=True), {}
+
+    order, bounds = _partition_order(df, keys)
+    if np.array_equal(order, np.arange(len(order))) and df.index.equals(pd.RangeIndex(len(df))):
+        return (df if len(order) == len(df) else df.iloc[:len(order)]), bounds
+
+    frame = df.iloc[order].reset_index(drop=True)
+    return frame, bounds
+
+
+def _partition_order(df, keys):
+    """Positions des lignes groupées par clé (groupes dans l'ordre d'apparition, triés par riskmid) et bornes"""
+    riskmid = df['riskmid'].to_numpy()
+    # observed=True : colonnes catégorielles (miroir) sans groupes vides
+    groups = df.groupby(keys, sort=False, observed=True).indices
+
+    positions = []
+    bounds = {}
+    start = 0
+    for key, pos in groups.items():
+        pos = pos[np.argsort(riskmid[pos], kind='stable')]
+        key = key if isinstance(key, tuple) else (key,)
+        bounds[key] = (start, start + len(pos))
+        positions.append(pos)
+        start += len(pos)
+
+    return np.concatenate(positions), bounds
@@ -0,0 +1,216 @@
+"""
+Miroir local en colonnes des onglets Data_All / Data_GR
+Un fichier .npy par colonne, relu en mémoire mappée (np.load mmap_mode='r')
+"""
+
+import json
+import os
+import shutil
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from .market_index import partition_frames
+
+
+MANIFEST_FILE = 'manifest.json'
+CURRENT_FILE = 'CURRENT'
+SNAPSHOT_PREFIX = 'snapshot-'
+
+
+class ColumnarMirror:
+    """
+    Miroir disque des données de marché nettoyées
+
+    Chaque écriture crée un nouveau répertoire complet puis bascule le
+    pointeur CURRENT par os.replace() (atomique) : un lecteur voit soit
+    l'ancienne version, soit la nouvelle, jamais un état intermédiaire.
+
+    Structure :
+        <root>/CURRENT                     -> nom du répertoire courant
+        <root>/snapshot-<ts>-<version>/
+            manifest.json                  -> colonnes, types, métadonnées
+            all_000.npy, gr_000.npy, ...   -> une colonne par fichier
+            merged_000.npy, ...            -> Data_All + ratings (optionnel)
+
+    Les lignes sont écrites dans la disposition de MarketIndex
+    (partition_frames) : les index des snapshots relus ne recopient pas les
+    données. Les colonnes texte sont relues en Categorical sur leurs codes
+    en mémoire mappée : les pages sont partagées par tous les process qui
+    lisent la même version.
+    """
+
+    def __init__(self, root_dir, keep=2):
+        """
+        Args:
+            root_dir: Répertoire racine du miroir
+            keep: Nombre de versions conservées sur disque
+        """
+        self.root_dir = root_dir
+        self.keep = keep
+
+    def current_name(self):
+        """Retourne le nom du répertoire courant (None si aucun miroir)"""
+        try:
+            with open(os.path.join(self.root_dir, CURRENT_FILE)) as f:
+                name = f.read().strip()
+            return name or None
+        except OSError:
+            return None
+
+    def current_path(self):
+        """Retourne le chemin du répertoire courant (None si aucun miroir)"""
+        name = self.current_name()
+        return os.path.join(self.root_dir, name) if name else None
+
+    def exists(self):
+        return self.current_name() is not None
+
+    def write(self, df_all, df_gr, version=None, source_modified=None, df_merged=None):
+        """
+        Écrit une nouvelle version du miroir puis la publie atomiquement
+
+        Args:
+            df_all: DataFrame Data_All nettoyé
+            df_gr: DataFrame Data_GR
+            version: Empreinte du contenu (voir compute_data_version)
+            source_modified: Date de modification du Google Sheet
+            df_merged: DataFrame fusionné (all + ratings), relu sans refaire le merge
+
+        Returns:
+            Chemin du répertoire publié
+        """
+        os.makedirs(self.root_dir, exist_ok=True)
+        df_all, df_merged = partition_frames(df_all, df_merged)
+        tmp_dir = tempfile.mkdtemp(prefix='.tmp-', dir=self.root_dir)
+
+        try:
+            manifest = {
+                'version': version,
+                'source_modified': source_modified,
+                'written_at': time.time(),
+                'tables': {
+                    'all': _write_table(df_all, tmp_dir, 'all'),
+                    'gr': _write_table(df_gr, tmp_dir, 'gr'),
+                },
+            }
+            if df_merged is not None:
+                manifest['tables']['merged'] = _write_table(df_merged, tmp_dir, 'merged')
+            with open(os.path.join(tmp_dir, MANIFEST_FILE), 'w') as f:
+                json.dump(manifest, f)
+
+            name = f"{SNAPSHOT_PREFIX}{time.time_ns()}-{version or 'na'}"
+            final_dir = os.path.join(self.root_dir, name)
+            os.rename(tmp_dir, final_dir)
+        except Exception:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            raise
+
+        # Basculer le pointeur (atomique)
+        fd, tmp_pointer = tempfile.mkstemp(prefix='.tmp-', dir=self.root_dir)
+        with os.fdopen(fd, 'w') as f:
+            f.write(name)
+        os.replace(tmp_pointer, os.path.join(self.root_dir, CURRENT_FILE))
+
+        self._cleanup(keep_name=name)
+        return final_dir
+
+    def read(self):
+        """
+        Relit la version courante du miroir
+
+        Les colonnes numériques restent mappées en mémoire (pas de copie) ;
+        les colonnes texte sont des Categorical sur les codes mappés.
+
+        Returns:
+            Tuple (df_all, df_gr, manifest) ou None si aucun miroir
+        """
+        path = self.current_path()
+        if path is None:
+            return None
+
+        with open(os.path.join(path, MANIFEST_FILE)) as f:
+            manifest = json.load(f)
+
+        df_all = _read_table(path, manifest['tables']['all'])
+        df_gr = _read_table(path, manifest['tables']['gr'])
+        manifest['name'] = os.path.basename(path)
+        manifest['path'] = path
+        return df_all, df_gr, manifest
+
+    def read_table(self, manifest, name):
+        """
+        Relit une table supplémentaire de la version décrite par manifest (cf. read)
+
+        Returns:
+            DataFrame, ou None si la table n'a pas été écrite
+        """
+        table = manifest['tables'].get(name)
+        if table is None:
+            return None
+        return _read_table(manifest['path'], table)
+
+    def _cleanup(self, keep_name):
+        """Supprime les anciennes versions (les lecteurs en cours gardent leurs mmap)"""
+        names = sorted(
+            n for n in os.listdir(self.root_dir)
+            if n.startswith(SNAPSHOT_PREFIX) and n != keep_name
+        )
+        for name in names[:max(0, len(names) - (self.keep - 1))]:
+            shutil.rmtree(os.path.join(self.root_dir, name), ignore_errors=True)
+
+
+def _write_table(df, directory, prefix):
+    """Écrit chaque colonne d'un DataFrame dans un fichier .npy"""
+    columns = []
+    for i, col in enumerate(df.columns):
+        filename = f"{prefix}_{i:03d}.npy"
+        series = df[col]
+
+        if pd.api.types.is_numeric_dtype(series.dtype) and not pd.api.types.is_bool_dtype(series.dtype):
+            np.save(os.path.join(directory, filename), series.to_numpy())
+            columns.append({'name': col, 'kind': 'numeric', 'file': filename})
+        else:
+            # Encodage dictionnaire : codes + valeurs distinctes en JSON
+            codes, uniques = pd.factorize(series, use_na_sentinel=True)
+            np.save(os.path.join(directory, filename), codes.astype(_codes_dtype(len(uniques))))
+            columns.append({
+                'name': col,
+                'kind': 'dictionary',
+                'file': filename,
+                'values': [_to_json_value(v) for v in uniques],
+            })
+
+    return {'rows': len(df), 'columns': columns}
+
+
+def _read_table(directory, table):
+    """Reconstruit un DataFrame depuis ses fichiers .npy"""
+    data = {}
+    for col in table['columns']:
+        array = np.load(os.path.join(directory, col['file']), mmap_mode='r')
+        if col['kind'] == 'numeric':
+            data[col['name']] = array
+        else:
+            # Codes mappés (code -1 -> valeur manquante) ; recopiés seulement
+            # si leur type n'est pas celui de _codes_dtype (miroir plus ancien)
+            data[col['name']] = pd.Categorical.from_codes(array, categories=col['values'])
+
+    return pd.DataFrame(data, index=pd.RangeIndex(table['rows']), copy=False)
+
+
+def _codes_dtype(n_values):
+    """Type des codes d'un Categorical de n_values catégories (celui retenu par pandas, sans conversion)"""
+    for dtype in (np.int8, np.int16, np.int32):
+        if n_values < np.iinfo(dtype).max:
+            return dtype
+    return np.int64
+
+
+def _to_json_value(value):
+    """Convertit un scalaire numpy en type JSON natif"""
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
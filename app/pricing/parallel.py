@@ -0,0 +1,242 @@
+"""
+Exécution parallèle du calcul des courbes sur plusieurs process
+Les workers relisent le snapshot depuis un miroir en colonnes (pas de DataFrames picklés)
+"""
+
+import atexit
+import multiprocessing
+import os
+import shutil
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from .google_sheets import GoogleSheetsLoader
+from .mirror import ColumnarMirror
+from .pipeline import calculate_universe
+from .snapshot import MarketSnapshot
+
+
+# Snapshot chargé une fois par process worker (cf. _init_worker)
+_worker_snapshot = None
+
+
+class ParallelCurveExecutor:
+    """
+    Répartit les couples (émetteur, séniorité) sur un ProcessPoolExecutor
+
+    Le snapshot est écrit une fois par version dans un miroir privé
+    (ColumnarMirror) ; chaque worker le relit en mémoire mappée dans son
+    initializer. Les tâches ne transportent que des noms d'émetteurs et les
+    paramètres, et les résultats reviennent sans les points de marché (rattachés
+    depuis le snapshot du process parent).
+
+    Les jobs sont regroupés par séniorité en lots de chunk_size émetteurs :
+    chaque lot passe par calculate_universe (ajustements Nelson-Siegel vectorisés
+    et clusters partagés au sein du lot). Les résultats sont rendus dans l'ordre
+    des jobs.
+
+    Les workers sont lancés en mode 'spawn' (pas de fork d'un process serveur
+    qui détient des verrous et des threads).
+    """
+
+    def __init__(self, max_workers=None, chunk_size=16):
+        """
+        Args:
+            max_workers: Nombre de process (défaut: nombre de CPU ; 1 = calcul sans pool)
+            chunk_size: Nombre maximum d'émetteurs par tâche
+        """
+        self.max_workers = max_workers
+        self.chunk_size = chunk_size
+        self._pool = None
+        self._atexit_registered = False
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        """Configure l'exécuteur depuis la configuration Flask"""
+        self.max_workers = app.config.get('PRICING_WORKERS') or self.max_workers
+
+    @property
+    def workers(self):
+        """Nombre effectif de process"""
+        return max(1, self.max_workers or os.cpu_count() or 1)
+
+    def map_curves(self, snapshot, jobs, n_clusters_rating, n_clusters_spread,
+                   score_liquidite, score_equity, score_solidite):
+        """
+        Calcule les courbes d'une liste de couples (émetteur, séniorité)
+
+        Args:
+            snapshot: MarketSnapshot
+            jobs: Liste de tuples (émetteur, séniorité)
+            n_clusters_rating, n_clusters_spread: Paramètres de clustering
+            score_liquidite, score_equity, score_solidite: Scores d'ajustement
+
+        Returns:
+            Liste des courbes (dict de calculate_curves ou None), dans l'ordre des jobs
+        """
+        params = (n_clusters_rating, n_clusters_spread, score_liquidite, score_equity, score_solidite)
+        shards = self._shards(jobs)
+
+        if self.workers == 1 or len(shards) <= 1:
+            shard_results = [_compute_shard(snapshot, seniority, issuers, params) for seniority, issuers, _ in shards]
+        else:
+            pool = self._acquire_pool(snapshot)
+            try:
+                futures = [
+                    pool.executor.submit(_worker_compute_shard, snapshot.version, seniority, issuers, params)
+                    for seniority, issuers, _ in shards
+                ]
+                shard_results = [future.result() for future in futures]
+            finally:
+                self._release_pool(pool)
+
+        results = [None] * len(jobs)
+        for (seniority, issuers, positions), shard_result in zip(shards, shard_results):
+            for position, issuer, (_, _, curves_data) in zip(positions, issuers, shard_result):
+                if curves_data is not None and curves_data.get('issuer_points') is None:
+                    curves_data['issuer_points'] = snapshot.issuer_data(issuer, seniority)
+                results[position] = curves_data
+
+        return results
+
+    def calculate_universe(self, snapshot, n_clusters_rating, n_clusters_spread,
+                           score_liquidite, score_equity, score_solidite,
+                           seniorities=None):
+        """
+        Équivalent parallèle de pipeline.calculate_universe (même format de sortie)
+        """
+        jobs = [
+            (issuer, seniority)
+            for seniority in seniorities or snapshot.index.seniorities()
+            for issuer in snapshot.index.issuers(seniority)
+        ]
+        results = self.map_curves(
+            snapshot, jobs,
+            n_clusters_rating, n_clusters_spread,
+            score_liquidite, score_equity, score_solidite
+        )
+        return [(issuer, seniority, curves_data) for (issuer, seniority), curves_data in zip(jobs, results)]
+
+    def shutdown(self):
+        """Arrête le pool et supprime le miroir privé"""
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.close(cancel_futures=True)
+
+    def _shards(self, jobs):
+        """Regroupe les jobs par séniorité en lots (séniorité, émetteurs, positions)"""
+        by_seniority = {}
+        for position, (issuer, seniority) in enumerate(jobs):
+            issuers, positions = by_seniority.setdefault(seniority, ([], []))
+            issuers.append(issuer)
+            positions.append(position)
+
+        # Lots assez petits pour occuper tous les workers
+        n_jobs = len(jobs)
+        size = max(1, min(self.chunk_size, -(-n_jobs // self.workers)))
+
+        shards = []
+        for seniority, (issuers, positions) in by_seniority.items():
+            for start in range(0, len(issuers), size):
+                shards.append((seniority, issuers[start:start + size], positions[start:start + size]))
+        return shards
+
+    def _acquire_pool(self, snapshot):
+        """
+        Retourne un pool dont les workers ont chargé cette version du snapshot
+
+        Le pool est réservé jusqu'à _release_pool : un changement de version
+        pendant un map_curves en cours remplace le pool courant, et l'ancien
+        n'est arrêté qu'à la fin de son dernier map_curves.
+        """
+        with self._lock:
+            current = self._pool
+            if current is not None and current.version == snapshot.version:
+                current.users += 1
+                return current
+
+            pool = _WorkerPool(snapshot, self.workers)
+            pool.users = 1
+            self._pool = pool
+
+            retired = None
+            if current is not None:
+                current.retired = True
+                if current.users == 0:
+                    retired = current
+
+            if not self._atexit_registered:
+                atexit.register(self.shutdown)
+                self._atexit_registered = True
+
+        if retired is not None:
+            retired.close()
+        return pool
+
+    def _release_pool(self, pool):
+        """Libère un pool réservé par _acquire_pool (arrêté s'il a été remplacé)"""
+        with self._lock:
+            pool.users -= 1
+            close = pool.retired and pool.users == 0
+        if close:
+            pool.close()
+
+
+class _WorkerPool:
+    """ProcessPoolExecutor d'une version du snapshot et son miroir privé"""
+
+    def __init__(self, snapshot, workers):
+        # Miroir privé : ne disparaît pas si le miroir principal tourne
+        self.spill_dir = tempfile.mkdtemp(prefix='pricing-workers-')
+        ColumnarMirror(self.spill_dir, keep=1).write(
+            snapshot.df_all, snapshot.df_gr, version=snapshot.version, df_merged=snapshot.df_merged
+        )
+
+        self.executor = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=_init_worker,
+            initargs=(self.spill_dir,)
+        )
+        self.version = snapshot.version
+        # map_curves en cours sur ce pool / remplacé par une version plus récente
+        self.users = 0
+        self.retired = False
+
+    def close(self, cancel_futures=False):
+        """Arrête les workers puis supprime le miroir privé"""
+        self.executor.shutdown(wait=True, cancel_futures=cancel_futures)
+        shutil.rmtree(self.spill_dir, ignore_errors=True)
+
+
+def _init_worker(mirror_dir):
+    """Initializer des workers : charge le snapshot depuis le miroir (mémoire mappée)"""
+    global _worker_snapshot
+    loader = GoogleSheetsLoader(mirror_dir=mirror_dir, offline=True)
+    df_all, df_gr, df_merged, metadata = loader.load_pricing_data_from_mirror()
+    _worker_snapshot = MarketSnapshot(df_all, df_gr, df_merged, version=metadata['version'])
+
+
+def _worker_compute_shard(version, seniority, issuers, params):
+    """Tâche exécutée dans un worker"""
+    if _worker_snapshot is None or _worker_snapshot.version != version:
+        raise RuntimeError(f"Snapshot du worker différent de la version {version}")
+
+    results = _compute_shard(_worker_snapshot, seniority, issuers, params)
+
+    # Les points de marché sont rattachés par le process parent
+    for _, _, curves_data in results:
+        if curves_data is not None:
+            curves_data['issuer_points'] = None
+    return results
+
+
+def _compute_shard(snapshot, seniority, issuers, params):
+    """Calcule un lot d'émetteurs d'une séniorité"""
+    return calculate_universe(snapshot, *params, seniorities=[seniority], issuers=issuers)
+
+
+# Instance globale
+curve_executor = ParallelCurveExecutor()
@@ -0,0 +1,454 @@
+"""
+Pipeline de calcul des courbes de pricing
+Un émetteur (calculate_curves) ou tout l'univers émetteurs x séniorités en une passe
+"""
+
+import itertools
+import json
+import os
+import tempfile
+import time
+from datetime import datetime
+
+import numpy as np
+
+from app.metrics import metrics
+from .clustering import (
+    create_yellow_curve_rating_clustering,
+    create_green_curve_tranche_clustering,
+    collect_green_tranche_points,
+    combine_green_tranche_curves,
+    create_blue_curve_fusion
+)
+from .curves import (
+    fit_nelson_siegel_groups,
+    adjust_curve_to_market_points,
+    calculate_adjustment_score,
+    calculate_adjustment_scores,
+    scale_curve_scenarios
+)
+from .precompute import get_rating_clusters, get_spread_clusters
+
+
+def common_risk_grid():
+    """Grille de risque commune à toutes les courbes (0 à 15, pas de 0.1)"""
+    return np.arange(0, 15.1, 0.1)
+
+
+def all_score_scenarios():
+    """Les 125 combinaisons (liquidité, equity, solidité) de scores 1 à 5"""
+    return np.array(list(itertools.product(range(1, 6), repeat=3)))
+
+
+@metrics.instrument('calculate_curves')
+def calculate_curves(snapshot, selected_issuer, selected_seniority,
+                    n_clusters_rating, n_clusters_spread,
+                    score_liquidite, score_equity, score_solidite):
+    """
+    Calcule toutes les courbes pour un émetteur donné
+
+    Args:
+        snapshot: MarketSnapshot (données de marché + index par séniorité/émetteur)
+
+    Returns:
+        Dict avec toutes les courbes et infos
+    """
+    try:
+        # Grille commune
+        risk_grid = common_risk_grid()
+
+        # Calculer l'ajustement total
+        adjustment_pct = calculate_adjustment_score(score_liquidite, score_equity, score_solidite)
+
+        # Données de l'émetteur (vue triée par riskmid)
+        issuer_data = snapshot.issuer_data(selected_issuer, selected_seniority)
+
+        # Données de tous les émetteurs pour cette séniorité (vue triée par riskmid)
+        all_seniority_data = snapshot.seniority_data(selected_seniority)
+
+        if len(all_seniority_data) < 10:
+            return None
+
+        # Courbe JAUNE (clustering rating précalculé pour le snapshot)
+        yellow_curve, yellow_info = create_yellow_curve_rating_clustering(
+            all_seniority_data,
+            selected_issuer,
+            n_clusters_rating,
+            risk_grid,
+            rating_clusters=get_rating_clusters(snapshot, selected_seniority, n_clusters_rating)
+        )
+
+        # Courbe VERTE (clustering tranches)
+        green_curve, green_info, tranches_info = create_green_curve_tranche_clustering(
+            all_seniority_data,
+            issuer_data,
+            selected_issuer,
+            n_clusters_spread,
+            risk_grid,
+            spread_clusters=lambda tranche: get_spread_clusters(
+                snapshot, selected_seniority, tranche, selected_issuer, n_clusters_spread
+            )
+        )
+
+        return _assemble_curves(
+            risk_grid, issuer_data, adjustment_pct,
+            yellow_curve, yellow_info,
+            green_curve, green_info, tranches_info
+        )
+
+    except Exception as e:
+        print(f"Erreur calcul courbes: {e}")
+        return None
+
+
+@metrics.instrument('calculate_scenarios')
+def calculate_scenarios(snapshot, selected_issuer, selected_seniority,
+                        n_clusters_rating, n_clusters_spread, scenarios=None):
+    """
+    Calcule les courbes bleues d'un émetteur pour une grille de scores
+
+    Les scores n'interviennent qu'au dernier étage (courbe bleue = base x
+    (1 + ajustement/100)) : les courbes jaune, verte et la base bleue sont
+    calculées une seule fois, puis tous les scénarios sont produits en une
+    seule multiplication matricielle.
+
+    La courbe rouge est ajustée aux points de marché à partir de la base
+    bleue (non ajustée), comme dans calculate_curves : elle est identique
+    pour tous les scénarios et n'est renvoyée qu'une fois.
+
+    Args:
+        snapshot: MarketSnapshot
+        selected_issuer, selected_seniority: Émetteur et séniorité
+        n_clusters_rating, n_clusters_spread: Paramètres de clustering
+        scenarios: Array (n, 3) de scores (liquidité, equity, solidité)
+                   (défaut: les 125 combinaisons)
+
+    Returns:
+        Dict (courbes de calculate_curves + 'scenarios', 'adjustment_pct' et
+        'blue_curves' de forme (n, taille de la grille)), ou None
+
+    Raises:
+        ValueError: Score hors de 1-5
+    """
+    scenarios = all_score_scenarios() if scenarios is None else np.asarray(scenarios, dtype=int).reshape(-1, 3)
+    adjustment_pcts = calculate_adjustment_scores(scenarios)
+
+    # Scores neutres (ajustement nul) : la courbe bleue est la base
+    curves_data = calculate_curves(
+        snapshot, selected_issuer, selected_seniority,
+        n_clusters_rating, n_clusters_spread,
+        3, 3, 3
+    )
+    if curves_data is None:
+        return None
+
+    blue_curve_base = curves_data['blue_curve']
+    curves_data['blue_curve_base'] = blue_curve_base
+    curves_data['scenarios'] = scenarios
+    curves_data['adjustment_pct'] = adjustment_pcts
+    curves_data['blue_curves'] = (
+        scale_curve_scenarios(blue_curve_base, adjustment_pcts) if blue_curve_base is not None else None
+    )
+    del curves_data['blue_curve']
+    return curves_data
+
+
+def calculate_universe(snapshot, n_clusters_rating, n_clusters_spread,
+                       score_liquidite, score_equity, score_solidite,
+                       seniorities=None, issuers=None, batch_fit=False):
+    """
+    Calcule les courbes de tous les émetteurs de toutes les séniorités en une passe
+
+    Mêmes résultats que calculate_curves pour chaque couple, mais le travail
+    commun est partagé : clusters de rating et de spread mémorisés dans le
+    snapshot. Avec batch_fit, les tranches de tous les émetteurs d'une
+    séniorité (courbes vertes) sont ajustées en un seul lot vectorisé.
+
+    Args:
+        snapshot: MarketSnapshot
+        n_clusters_rating: Nombre de clusters de rating
+        n_clusters_spread: Nombre de clusters de spread
+        score_liquidite, score_equity, score_solidite: Scores d'ajustement
+        seniorities: Liste des séniorités (défaut: toutes celles du snapshot)
+        issuers: Liste des émetteurs (défaut: tous ceux de chaque séniorité)
+        batch_fit: Ajustement vectorisé fit_nelson_siegel_batch (défaut: L-BFGS-B par tranche,
+                   comme calculate_curves ; cf. fit_nelson_siegel_groups)
+
+    Returns:
+        Liste de tuples (émetteur, séniorité, courbes) dans l'ordre des
+        séniorités puis des émetteurs ; courbes vaut None si le calcul échoue
+    """
+    risk_grid = common_risk_grid()
+    adjustment_pct = calculate_adjustment_score(score_liquidite, score_equity, score_solidite)
+
+    results = []
+    for seniority in seniorities or snapshot.index.seniorities():
+        seniority_issuers = issuers if issuers is not None else snapshot.index.issuers(seniority)
+        all_seniority_data = snapshot.seniority_data(seniority)
+
+        if len(all_seniority_data) < 10:
+            results.extend((issuer, seniority, None) for issuer in seniority_issuers)
+            continue
+
+        rating_clusters = get_rating_clusters(snapshot, seniority, n_clusters_rating)
+
+        # 1) Courbes jaunes + points des tranches vertes de chaque émetteur
+        pending = []
+        groups = []
+        for issuer in seniority_issuers:
+            issuer_data = snapshot.issuer_data(issuer, seniority)
+
+            yellow_curve, yellow_info = create_yellow_curve_rating_clustering(
+                all_seniority_data,
+                issuer,
+                n_clusters_rating,
+                risk_grid,
+                rating_clusters=rating_clusters
+            )
+
+            try:
+                points_par_tranche, poids_par_tranche, tranches_info = collect_green_tranche_points(
+                    all_seniority_data,
+                    issuer_data,
+                    issuer,
+                    n_clusters_spread,
+                    spread_clusters=lambda tranche, issuer=issuer: get_spread_clusters(
+                        snapshot, seniority, tranche, issuer, n_clusters_spread
+                    )
+                )
+                green_error = None
+            except Exception as e:
+                points_par_tranche, poids_par_tranche, tranches_info = [], [], []
+                green_error = f"Erreur: {str(e)}"
+
+            pending.append((
+                issuer, issuer_data, yellow_curve, yellow_info,
+                points_par_tranche, poids_par_tranche, tranches_info, green_error
+            ))
+            groups.extend(points_par_tranche)
+
+        # 2) Ajustement Nelson-Siegel des tranches de tous les émetteurs de la séniorité
+        params = fit_nelson_siegel_groups(groups, batch=batch_fit)
+
+        # 3) Courbes vertes, bleues et rouges
+        offset = 0
+        for (issuer, issuer_data, yellow_curve, yellow_info,
+             points_par_tranche, poids_par_tranche, tranches_info, green_error) in pending:
+            issuer_params = params[offset:offset + len(points_par_tranche)]
+            offset += len(points_par_tranche)
+
+            try:
+                if green_error is None:
+                    green_curve, green_info = combine_green_tranche_curves(
+                        points_par_tranche, poids_par_tranche, issuer_params, risk_grid
+                    )
+                else:
+                    green_curve, green_info = None, green_error
+
+                curves_data = _assemble_curves(
+                    risk_grid, issuer_data, adjustment_pct,
+                    yellow_curve, yellow_info,
+                    green_curve, green_info, tranches_info
+                )
+            except Exception as e:
+                print(f"Erreur calcul courbes {issuer} {seniority}: {e}")
+                curves_data = None
+
+            results.append((issuer, seniority, curves_data))
+
+    return results
+
+
+def _assemble_curves(risk_grid, issuer_data, adjustment_pct,
+                     yellow_curve, yellow_info,
+                     green_curve, green_info, tranches_info):
+    """Courbes bleue et rouge à partir des courbes jaune et verte"""
+    # Courbe BLEUE (fusion + ajustements)
+    blue_curve, blue_curve_base, blue_info = create_blue_curve_fusion(
+        yellow_curve,
+        green_curve,
+        adjustment_pct
+    )
+
+    # Courbe ROUGE (marché ajustée)
+    red_curve = None
+    red_info = "Aucun point marché disponible"
+
+    if len(issuer_data) > 0 and blue_curve_base is not None:
+        red_curve = adjust_curve_to_market_points(
+            blue_curve_base,
+            risk_grid,
+            issuer_data['riskmid'].values,
+            issuer_data['zspread'].values
+        )
+        red_info = f"Forme bleue ajustée à {len(issuer_data)} points marché"
+
+    return {
+        'risk_grid': risk_grid,
+        'yellow_curve': yellow_curve,
+        'green_curve': green_curve,
+        'blue_curve': blue_curve,
+        'red_curve': red_curve,
+        'issuer_points': issuer_data,
+        'adjustment_pct': adjustment_pct,
+        'info': {
+            'yellow': yellow_info,
+            'green': green_info,
+            'blue': blue_info,
+            'red': red_info,
+            'tranches': tranches_info
+        }
+    }
+
+
+def serialize_curve(curve):
+    """Convertit un numpy array en liste pour JSON (valeurs non finies -> None)"""
+    if curve is None:
+        return None
+    return [float(v) if np.isfinite(v) else None for v in np.asarray(curve, dtype=float)]
+
+
+def serialize_curves(curves_data, include_points=True):
+    """
+    Convertit le résultat de calculate_curves en dict sérialisable en JSON
+
+    Args:
+        curves_data: Dict retourné par calculate_curves
+        include_points: Inclure les points de marché de l'émetteur
+
+    Returns:
+        Dict
+    """
+    response = {
+        'risk_grid': serialize_curve(curves_data['risk_grid']),
+        'yellow_curve': serialize_curve(curves_data.get('yellow_curve')),
+        'green_curve': serialize_curve(curves_data.get('green_curve')),
+        'blue_curve': serialize_curve(curves_data.get('blue_curve')),
+        'red_curve': serialize_curve(curves_data.get('red_curve')),
+        'adjustment_pct': curves_data['adjustment_pct'],
+        'info': curves_data['info']
+    }
+    if include_points:
+        issuer_points = curves_data['issuer_points']
+        response['issuer_points'] = issuer_points.to_dict('records') if issuer_points is not None else []
+    return response
+
+
+def serialize_scenarios(scenarios_data, include_points=True):
+    """
+    Convertit le résultat de calculate_scenarios en dict sérialisable en JSON
+
+    Returns:
+        Dict (une liste de scores, un ajustement et une courbe bleue par scénario)
+    """
+    blue_curves = scenarios_data['blue_curves']
+    response = {
+        'risk_grid': serialize_curve(scenarios_data['risk_grid']),
+        'yellow_curve': serialize_curve(scenarios_data.get('yellow_curve')),
+        'green_curve': serialize_curve(scenarios_data.get('green_curve')),
+        'blue_curve_base': serialize_curve(scenarios_data.get('blue_curve_base')),
+        'red_curve': serialize_curve(scenarios_data.get('red_curve')),
+        'scenarios': scenarios_data['scenarios'].tolist(),
+        'adjustment_pct': scenarios_data['adjustment_pct'].tolist(),
+        'blue_curves': [serialize_curve(row) for row in blue_curves] if blue_curves is not None else None,
+        'info': scenarios_data['info']
+    }
+    if include_points:
+        issuer_points = scenarios_data['issuer_points']
+        response['issuer_points'] = issuer_points.to_dict('records') if issuer_points is not None else []
+    return response
+
+
+def write_universe(results, output_path, snapshot, params, duration=None):
+    """
+    Écrit les résultats de calculate_universe dans un fichier JSON unique
+
+    Le fichier est écrit à côté puis renommé (os.replace) : un lecteur ne
+    voit jamais de fichier partiel.
+
+    Args:
+        results: Liste retournée par calculate_universe
+        output_path: Chemin du fichier de sortie
+        snapshot: MarketSnapshot utilisé pour le calcul
+        params: Dict des paramètres du calcul
+        duration: Durée du calcul en secondes (optionnel)
+
+    Returns:
+        Dict résumé (chemin, nombre de courbes, erreurs)
+    """
+    risk_grid = serialize_curve(common_risk_grid())
+    curves = []
+    errors = 0
+    for issuer, seniority, curves_data in results:
+        entry = {'issuer': issuer, 'seniority': seniority}
+        if curves_data is None:
+            entry['error'] = 'Impossible de calculer les courbes'
+            errors += 1
+        else:
+            entry.update(serialize_curves(curves_data, include_points=False))
+            del entry['risk_grid']
+        curves.append(entry)
+
+    summary = {
+        'path': output_path,
+        'snapshot': snapshot.info(),
+        'params': params,
+        'generated_at': datetime.now().isoformat(),
+        'duration': duration,
+        'count': len(curves),
+        'errors': errors,
+    }
+
+    directory = os.path.dirname(os.path.abspath(output_path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(prefix='.tmp-', suffix='.json', dir=directory)
+    try:
+        with os.fdopen(fd, 'w') as f:
+            json.dump(dict(summary, risk_grid=risk_grid, curves=curves), f, default=json_default)
+        os.replace(tmp_path, output_path)
+    except Exception:
+        os.unlink(tmp_path)
+        raise
+
+    return summary
+
+
+def run_universe(snapshot, output_path, n_clusters_rating, n_clusters_spread,
+                 score_liquidite, score_equity, score_solidite, seniorities=None,
+                 executor=None):
+    """
+    Calcule l'univers complet et écrit le fichier de sortie
+
+    Args:
+        executor: ParallelCurveExecutor pour répartir le calcul sur plusieurs
+                  process (défaut: calcul dans le process courant)
+
+    Returns:
+        Dict résumé (cf. write_universe)
+    """
+    params = {
+        'n_clusters_rating': n_clusters_rating,
+        'n_clusters_spread': n_clusters_spread,
+        'score_liquidite': score_liquidite,
+        'score_equity': score_equity,
+        'score_solidite': score_solidite,
+        'seniorities': seniorities,
+    }
+
+    start = time.perf_counter()
+    results = (executor.calculate_universe if executor is not None else calculate_universe)(
+        snapshot,
+        n_clusters_rating, n_clusters_spread,
+        score_liquidite, score_equity, score_solidite,
+        seniorities=seniorities
+    )
+    duration = time.perf_counter() - start
+
+    return write_universe(results, output_path, snapshot, params, duration=duration)
+
+
+def json_default(value):
+    """Convertit les scalaires numpy pour json.dump"""
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"Type non sérialisable: {type(value).__name__}")
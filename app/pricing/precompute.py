@@ -0,0 +1,141 @@
+"""
+Précalculs par snapshot (clusters de rating par séniorité, clusters de spread par tranche)
+Les résultats indépendants de l'émetteur sélectionné sont mémorisés dans le snapshot
+
+Les paramètres viennent des requêtes : seuls les séniorités et émetteurs
+présents dans le snapshot et les nombres de clusters dans
+[MIN_N_CLUSTERS, MAX_N_CLUSTERS] sont mémorisés, le reste est calculé sans
+cache (la mémoire d'un snapshot reste bornée).
+"""
+
+from .clustering import Ward1D, compute_rating_clusters, compute_spread_clusters
+
+
+# Paramètres par défaut des pages de pricing
+DEFAULT_N_CLUSTERS_RATING = 5
+DEFAULT_N_CLUSTERS_SPREAD = 3
+
+# Nombres de clusters acceptés depuis les requêtes (formulaires : 2 à 15)
+MIN_N_CLUSTERS = 1
+MAX_N_CLUSTERS = 15
+
+
+def clamp_n_clusters(value):
+    """Nombre de clusters d'une requête ramené dans [MIN_N_CLUSTERS, MAX_N_CLUSTERS]"""
+    return min(max(int(value), MIN_N_CLUSTERS), MAX_N_CLUSTERS)
+
+
+def get_rating_data(snapshot, seniority):
+    """
+    Points notés d'une séniorité, ou de toutes les séniorités si seniority est None
+    """
+    if seniority is None:
+        return snapshot.index.seniority_frame
+    return snapshot.seniority_data(seniority)
+
+
+def get_rating_tree(snapshot, seniority):
+    """
+    Hiérarchie Ward sur la Note d'une séniorité (construite une fois par snapshot)
+
+    Args:
+        snapshot: MarketSnapshot
+        seniority: Séniorité (SP, SLA, T2, AT1), ou None pour toutes
+
+    Returns:
+        Ward1D
+    """
+    return _memoize(
+        snapshot, _known_seniority(snapshot, seniority, allow_all=True),
+        ('rating_tree', seniority),
+        lambda: Ward1D(get_rating_data(snapshot, seniority)['Note'].to_numpy())
+    )
+
+
+def get_rating_clusters(snapshot, seniority, n_clusters_rating):
+    """
+    Clusters de rating d'une séniorité (calculés une fois par snapshot)
+
+    Args:
+        snapshot: MarketSnapshot
+        seniority: Séniorité (SP, SLA, T2, AT1), ou None pour toutes
+        n_clusters_rating: Nombre de clusters de rating
+
+    Returns:
+        RatingClusters, ou None s'il n'y a pas assez de points notés
+    """
+    return _memoize(
+        snapshot,
+        _known_seniority(snapshot, seniority, allow_all=True) and _known_n_clusters(n_clusters_rating),
+        ('rating_clusters', seniority, n_clusters_rating),
+        lambda: compute_rating_clusters(
+            get_rating_data(snapshot, seniority),
+            n_clusters_rating,
+            ward_tree=get_rating_tree(snapshot, seniority)
+        )
+    )
+
+
+def get_spread_clusters(snapshot, seniority, tranche, excluded_issuer, n_clusters_spread):
+    """
+    Clusters de Z-spread d'une tranche de Risk Mid (calculés une fois par snapshot)
+
+    Args:
+        snapshot: MarketSnapshot
+        seniority: Séniorité (SP, SLA, T2, AT1)
+        tranche: Tuple (tranche_min, tranche_max)
+        excluded_issuer: Émetteur retiré avant le clustering (None pour aucun)
+        n_clusters_spread: Nombre de clusters de spread
+
+    Returns:
+        KMeans1D, ou None s'il y a moins de points que de clusters
+    """
+    cacheable = (
+        _known_seniority(snapshot, seniority)
+        and (excluded_issuer is None or snapshot.index.has_issuer(excluded_issuer, seniority))
+        and _known_n_clusters(n_clusters_spread)
+    )
+    return _memoize(
+        snapshot, cacheable,
+        ('spread_clusters', seniority, tuple(tranche), excluded_issuer, n_clusters_spread),
+        lambda: compute_spread_clusters(
+            snapshot.seniority_data(seniority),
+            tranche,
+            excluded_issuer,
+            n_clusters_spread
+        )
+    )
+
+
+def _memoize(snapshot, cacheable, key, factory):
+    """snapshot.memoize si les paramètres de la clé sont valides, sinon calcul sans cache"""
+    if cacheable:
+        return snapshot.memoize(key, factory)
+    return factory()
+
+
+def _known_seniority(snapshot, seniority, allow_all=False):
+    """Séniorité présente dans le snapshot (None = toutes, si allow_all)"""
+    if seniority is None:
+        return allow_all
+    return snapshot.index is not None and snapshot.index.has_seniority(seniority)
+
+
+def _known_n_clusters(n_clusters):
+    return isinstance(n_clusters, int) and MIN_N_CLUSTERS <= n_clusters <= MAX_N_CLUSTERS
+
+
+def precompute_snapshot(snapshot, n_clusters_rating_values=(DEFAULT_N_CLUSTERS_RATING,)):
+    """
+    Étape de précalcul exécutée à la publication d'un nouveau snapshot
+
+    Args:
+        snapshot: MarketSnapshot
+        n_clusters_rating_values: Nombres de clusters de rating à précalculer
+    """
+    if snapshot.is_empty:
+        return
+
+    for seniority in snapshot.index.seniorities():
+        for n_clusters_rating in n_clusters_rating_values:
+            get_rating_clusters(snapshot, seniority, n_clusters_rating)
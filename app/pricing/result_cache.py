@@ -0,0 +1,109 @@
+"""
+Cache LRU des résultats de calcul de courbes (réponses JSON déjà sérialisées)
+Clé : version du snapshot + paramètres normalisés ; l'ETag en dérive directement
+"""
+
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+
+
+class ResultCache:
+    """
+    Cache LRU borné des réponses de /pricing/api/calculate-curves
+
+    Une entrée est le corps JSON déjà sérialisé : une vue répétée coûte une
+    recherche dans un dict, sans recalcul ni re-sérialisation. Comme la clé
+    contient la version du contenu du snapshot, un nouveau contenu de marché
+    ne touche jamais les anciennes entrées (elles sortent par LRU).
+    """
+
+    def __init__(self, max_entries=256):
+        """
+        Args:
+            max_entries: Nombre maximum de réponses conservées
+        """
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def init_app(self, app):
+        """Configure le cache depuis la configuration Flask"""
+        self.max_entries = app.config.get('RESULT_CACHE_SIZE', self.max_entries)
+
+    def get(self, key):
+        """
+        Retourne le corps JSON en cache (None si absent)
+
+        Args:
+            key: Clé retournée par make_key
+        """
+        with self._lock:
+            body = self._entries.get(key)
+            if body is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return body
+
+    def put(self, key, body):
+        """Ajoute un corps JSON (bytes) et évince les entrées les moins récentes"""
+        with self._lock:
+            self._entries[key] = body
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        """Vide le cache"""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """Compteurs du cache"""
+        return {
+            'entries': len(self._entries),
+            'max_entries': self.max_entries,
+            'hits': self.hits,
+            'misses': self.misses,
+        }
+
+
+def make_key(version, params, fmt='json'):
+    """
+    Clé de cache : version du snapshot + format de réponse + paramètres normalisés
+
+    Args:
+        version: Version du snapshot (empreinte du contenu)
+        params: Dict des paramètres de calculate_curves
+        fmt: Format de la réponse ('json' ou 'compact')
+
+    Returns:
+        Tuple hashable
+    """
+    return (version, fmt) + tuple(sorted(normalize_params(params).items()))
+
+
+def make_etag(key):
+    """ETag d'une clé (identique entre process pour les mêmes données et paramètres)"""
+    return hashlib.sha1(json.dumps(key, default=str).encode()).hexdigest()[:20]
+
+
+def normalize_params(params):
+    """Normalise les paramètres (espaces, casse de la séniorité)"""
+    normalized = {}
+    for name, value in params.items():
+        if isinstance(value, str):
+            value = value.strip()
+            if name == 'selected_seniority':
+                value = value.upper()
+        normalized[name] = value
+    return normalized
+
+
+# Instance globale
+result_cache = ResultCache()
@@ -0,0 +1,152 @@
+"""
+Coordination entre process du snapshot de marché (workers gunicorn)
+Un seul process recharge Google Sheets et publie le miroir ; les autres suivent un compteur de génération
+"""
+
+import mmap
+import os
+import struct
+import time
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows : pas de flock, mode partagé indisponible
+    fcntl = None
+
+
+GENERATION_FILE = 'GENERATION'
+LOCK_FILE = 'refresh.lock'
+CURVE_STORE_LOCK_FILE = 'curves.lock'
+
+# Génération (int64) puis date de la dernière vérification du Google Sheet (float64, epoch)
+HEADER = struct.Struct('<qd')
+
+
+class SharedGeneration:
+    """
+    Compteur de génération partagé par les process d'une même machine
+
+    Le fichier GENERATION (16 octets, mappé en mémoire) contient le numéro
+    de la version publiée dans le miroir et la date de la dernière
+    vérification du Google Sheet : chaque requête compare la génération
+    sans appel système. Le verrou refresh.lock (flock) désigne le seul
+    process qui interroge Google Sheets et republie le miroir ; le verrou
+    curves.lock, celui qui construit le store de courbes d'une version.
+
+    Les descripteurs sont rouverts après un fork : un flock est attaché au
+    fichier ouvert, un descripteur hérité serait partagé avec le parent.
+    """
+
+    def __init__(self, root_dir):
+        """
+        Args:
+            root_dir: Répertoire du miroir (ColumnarMirror) partagé par les process
+        """
+        self.root_dir = root_dir
+        self._pid = None
+        self._map = None
+        self._lock_fds = {}
+
+    @staticmethod
+    def available():
+        """True si la plateforme permet le mode partagé (flock)"""
+        return fcntl is not None
+
+    def read(self):
+        """
+        Returns:
+            Tuple (génération, date de dernière vérification)
+        """
+        return HEADER.unpack_from(self._mapping(), 0)
+
+    @property
+    def generation(self):
+        return self.read()[0]
+
+    def publish(self):
+        """
+        Annonce une nouvelle version du miroir (à appeler avec le verrou, après l'écriture)
+
+        Returns:
+            Nouvelle génération
+        """
+        generation = self.generation + 1
+        HEADER.pack_into(self._mapping(), 0, generation, time.time())
+        return generation
+
+    def mark_checked(self, checked_at=None):
+        """Enregistre une vérification du Google Sheet sans nouvelle version"""
+        HEADER.pack_into(self._mapping(), 0, self.generation, checked_at or time.time())
+
+    def refresh_lock(self, blocking=False):
+        """
+        Verrou du rafraîchissement (un seul process à la fois)
+
+        Args:
+            blocking: Attendre le verrou plutôt que d'y renoncer
+
+        Yields:
+            True si le verrou est obtenu
+        """
+        return self._file_lock(LOCK_FILE, blocking)
+
+    def curve_store_lock(self, blocking=False):
+        """Verrou de construction du store de courbes (cf. refresh_lock)"""
+        return self._file_lock(CURVE_STORE_LOCK_FILE, blocking)
+
+    @contextmanager
+    def _file_lock(self, name, blocking):
+        self._ensure_open()
+        fd = self._lock_fds[name]
+        flags = fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB
+        try:
+            fcntl.flock(fd, flags)
+        except BlockingIOError:
+            yield False
+            return
+
+        try:
+            yield True
+        finally:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+
+    def info(self):
+        """État partagé (pour les endpoints de statut)"""
+        generation, checked_at = self.read()
+        return {
+            'root': self.root_dir,
+            'generation': generation,
+            'checked_at': checked_at or None,
+        }
+
+    def _mapping(self):
+        self._ensure_open()
+        return self._map
+
+    def _ensure_open(self):
+        """Ouvre (ou rouvre après un fork) le fichier de génération et le verrou"""
+        if self._pid == os.getpid():
+            return
+
+        if self._map is not None:
+            # Copies héritées du parent (fermer la copie ne libère pas son verrou)
+            for fd in self._lock_fds.values():
+                os.close(fd)
+            self._map.close()
+
+        os.makedirs(self.root_dir, exist_ok=True)
+        path = os.path.join(self.root_dir, GENERATION_FILE)
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            if os.fstat(fd).st_size < HEADER.size:
+                os.ftruncate(fd, HEADER.size)
+            self._map = mmap.mmap(fd, HEADER.size)
+        finally:
+            os.close(fd)
+
+        self._lock_fds = {
+            name: os.open(os.path.join(self.root_dir, name), os.O_RDWR | os.O_CREAT, 0o644)
+            for name in (LOCK_FILE, CURVE_STORE_LOCK_FILE)
+        }
+        self._pid = os.getpid()
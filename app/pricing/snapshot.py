@@ -0,0 +1,571 @@
+"""
+Cache process-wide des données de marché (snapshot versionné)
+Évite de recharger Google Sheets et de refaire le merge à chaque requête
+"""
+
+import hashlib
+import itertools
+import threading
+import time
+from datetime import datetime
+
+import pandas as pd
+
+from .google_sheets import GoogleSheetsLoader
+from .market_index import MarketIndex
+from .shared_snapshot import SharedGeneration
+
+
+class MarketSnapshot:
+    """
+    Instantané immuable des données de marché
+
+    Les DataFrames exposés sont partagés entre toutes les requêtes du process :
+    ils ne doivent jamais être modifiés en place (faire un .copy() avant).
+    L'index (séniorité, émetteur) est construit à la création du snapshot.
+    """
+
+    def __init__(self, df_all, df_gr, df_merged, version, generation=0, source_modified=None):
+        self._df_all = df_all
+        self._df_gr = df_gr
+        self._df_merged = df_merged
+        self._version = version
+        self._generation = generation
+        self._source_modified = source_modified
+        self._loaded_at = datetime.now().isoformat()
+        self._index = MarketIndex(df_all, df_merged) if not df_all.empty else None
+        self._derived = {}
+        self._derived_lock = threading.RLock()
+
+    @property
+    def df_all(self):
+        return self._df_all
+
+    @property
+    def df_gr(self):
+        return self._df_gr
+
+    @property
+    def df_merged(self):
+        return self._df_merged
+
+    @property
+    def version(self):
+        """Empreinte du contenu (identique entre process pour les mêmes données)"""
+        return self._version
+
+    @property
+    def generation(self):
+        """Compteur incrémenté à chaque nouveau contenu chargé (partagé entre process en mode partagé)"""
+        return self._generation
+
+    @property
+    def source_modified(self):
+        """Date de dernière modification du Google Sheet au moment du chargement"""
+        return self._source_modified
+
+    @property
+    def loaded_at(self):
+        return self._loaded_at
+
+    @property
+    def is_empty(self):
+        return self._df_all.empty
+
+    @property
+    def index(self):
+        return self._index
+
+    def issuer_data(self, issuer, seniority):
+        """Points de marché d'un émetteur pour une séniorité (vue triée par riskmid)"""
+        return self._index.issuer_data(issuer, seniority)
+
+    def seniority_data(self, seniority):
+        """Points notés de tous les émetteurs d'une séniorité (vue triée par riskmid)"""
+        return self._index.seniority_data(seniority)
+
+    def memoize(self, key, factory):
+        """
+        Retourne un résultat dérivé du snapshot, calculé une seule fois
+
+        Les résultats (clusters, tranches, ...) vivent aussi longtemps que le
+        snapshot : un nouveau contenu de marché repart d'un cache vide.
+
+        Args:
+            key: Clé hashable identifiant le calcul
+            factory: Fonction sans argument produisant le résultat
+        """
+        try:
+            return self._derived[key]
+        except KeyError:
+            pass
+
+        with self._derived_lock:
+            if key not in self._derived:
+                self._derived[key] = factory()
+            return self._derived[key]
+
+    def as_tuple(self):
+        """Retourne (df_all, df_gr, df_merged) comme load_pricing_data()"""
+        return self._df_all, self._df_gr, self._df_merged
+
+    def info(self):
+        """Métadonnées du snapshot (pour les endpoints de statut)"""
+        return {
+            'version': self._version,
+            'generation': self._generation,
+            'source_modified': self._source_modified,
+            'loaded_at': self._loaded_at,
+            'rows_all': len(self._df_all),
+            'rows_gr': len(self._df_gr),
+        }
+
+
+def compute_data_version(df_all, df_gr):
+    """
+    Calcule une empreinte du contenu des données de marché
+
+    Args:
+        df_all: DataFrame Data_All nettoyé
+        df_gr: DataFrame Data_GR
+
+    Returns:
+        String hexadécimal (16 caractères)
+    """
+    digest = hashlib.sha1()
+    for df in (df_all, df_gr):
+        digest.update(','.join(map(str, df.columns)).encode())
+        if not df.empty:
+            digest.update(pd.util.hash_pandas_object(df, index=False).values.tobytes())
+    return digest.hexdigest()[:16]
+
+
+class MarketDataCache:
+    """
+    Cache du snapshot de marché avec TTL et vérification de changement
+
+    À l'expiration du TTL, on interroge d'abord la date de modification du
+    Google Sheet (un seul appel Drive) : si elle n'a pas bougé, le snapshot
+    courant est prolongé sans retélécharger les onglets.
+
+    En mode partagé (MARKET_DATA_SHARED), les workers d'une machine lisent
+    le même miroir en mémoire mappée : un seul process (verrou fichier)
+    interroge Google Sheets et republie le miroir, les autres rechargent
+    la nouvelle version quand le compteur de génération change.
+
+    Un snapshot expiré reste servi pendant sa revalidation
+    (stale-while-revalidate) : un seul thread d'arrière-plan vérifie la
+    source et recharge, les requêtes n'attendent jamais l'appel réseau.
+    Seuls le premier chargement et force_refresh sont synchrones. Le
+    nouveau snapshot est installé avant d'être annoncé aux listeners
+    (précalculs, store de courbes), appelés hors du verrou du cache.
+    """
+
+    def __init__(self, ttl=300, loader_factory=GoogleSheetsLoader):
+        self.ttl = ttl
+        self.loader_factory = loader_factory
+        self._snapshot = None
+        self._expires_at = 0.0
+        # _lock : chargements (un seul à la fois) ; _state_lock : thread de
+        # revalidation et annonce en attente (jamais tenu pendant un appel réseau)
+        self._lock = threading.Lock()
+        self._state_lock = threading.Lock()
+        self._notify_lock = threading.Lock()
+        self._generations = itertools.count(1)
+        self._listeners = []
+        self._revalidation = None
+        self._revalidating = False
+        self._announced = None
+        self._notifying = None
+        self.shared = None
+        self.hits = 0
+        self.stale = 0
+        self.misses = 0
+        self.reloads = 0
+
+    def add_listener(self, callback):
+        """
+        Enregistre une fonction appelée à chaque publication d'un nouveau snapshot
+
+        Args:
+            callback: Fonction recevant le MarketSnapshot
+        """
+        if callback not in self._listeners:
+            self._listeners.append(callback)
+
+    def init_app(self, app):
+        """Configure le cache depuis la configuration Flask"""
+        self.ttl = app.config.get('MARKET_DATA_TTL', self.ttl)
+
+        if app.config.get('MARKET_DATA_SHARED'):
+            mirror = self.loader_factory().mirror
+            if mirror is None:
+                print("Mode partagé des données de marché ignoré: MARKET_DATA_MIRROR_DIR non défini")
+            elif not SharedGeneration.available():
+                print("Mode partagé des données de marché indisponible sur cette plateforme")
+            else:
+                self.shared = SharedGeneration(mirror.root_dir)
+
+    def get_snapshot(self, force_refresh=False):
+        """
+        Retourne le snapshot courant, rechargé si nécessaire
+
+        Args:
+            force_refresh: Forcer le rechargement depuis Google Sheets
+
+        Returns:
+            MarketSnapshot (éventuellement vide si aucun chargement n'a réussi)
+        """
+        snapshot = self._snapshot
+        if snapshot is not None and not force_refresh:
+            if self._is_fresh(snapshot):
+                self.hits += 1
+                return snapshot
+            if not snapshot.is_empty:
+                # Expiré mais utilisable : servi pendant la revalidation
+                self.stale += 1
+                self._start_revalidation()
+                return snapshot
+
+        with self._lock:
+            # Un autre thread a pu charger pendant l'attente du verrou
+            snapshot = self._snapshot
+            if snapshot is not None and not snapshot.is_empty and not force_refresh:
+                self.hits += 1
+            else:
+                self.misses += 1
+                snapshot = self._load(force_refresh)
+
+        self._notify()
+        return snapshot
+
+    def refresh(self):
+        """Force le rechargement et retourne le nouveau snapshot"""
+        return self.get_snapshot(force_refresh=True)
+
+    def has_changed(self):
+        """
+        Vérifie à moindre coût si le Google Sheet a changé depuis le chargement
+
+        Returns:
+            True/False, ou None si la date de modification est indisponible
+        """
+        snapshot = self._snapshot
+        if snapshot is None:
+            return True
+        modified = self.loader_factory().get_last_update_time()
+        if modified is None or snapshot.source_modified is None:
+            return None
+        return modified != snapshot.source_modified
+
+    def wait_revalidation(self, timeout=None):
+        """
+        Attend la fin de la revalidation d'arrière-plan en cours (démarrage depuis le miroir ou TTL expiré)
+
+        Returns:
+            True si aucune revalidation n'est en cours à la sortie
+        """
+        thread = self._revalidation
+        if thread is None:
+            return True
+        thread.join(timeout)
+        return not thread.is_alive()
+
+    def reset_after_fork(self):
+        """
+        Dans un process forké : recrée les verrous et relance la revalidation interrompue
+
+        Le fork ne copie que le thread appelant : un verrou tenu par le
+        thread de revalidation du parent resterait acquis pour toujours. Une
+        annonce aux listeners en attente ou en cours est refaite.
+        """
+        revalidating = self._revalidating
+        pending = self._announced or self._notifying
+        self._lock = threading.Lock()
+        self._state_lock = threading.Lock()
+        self._notify_lock = threading.Lock()
+        self._revalidation = None
+        self._revalidating = False
+        self._announced = pending
+        self._notifying = None
+        if revalidating or pending is not None:
+            # Le thread annonce le snapshot en attente en fin de revalidation
+            self._start_revalidation(check=revalidating)
+
+    def invalidate(self):
+        """Marque le snapshot comme expiré (rechargé à la prochaine lecture)"""
+        self._expires_at = 0.0
+
+    def stats(self):
+        """Compteurs du cache"""
+        snapshot = self._snapshot
+        return {
+            'hits': self.hits,
+            'stale': self.stale,
+            'misses': self.misses,
+            'reloads': self.reloads,
+            'ttl': self.ttl,
+            'revalidating': self._revalidating,
+            'snapshot': snapshot.info() if snapshot is not None else None,
+            'shared': self.shared.info() if self.shared is not None else None,
+        }
+
+    def _load(self, force_refresh=False):
+        """Charge ou vérifie le snapshot (appelé sous verrou)"""
+        loader = self.loader_factory()
+        snapshot = self._snapshot
+
+        if self.shared is not None:
+            return self._get_shared(loader, force_refresh)
+
+        if (snapshot is None or snapshot.is_empty) and not force_refresh:
+            # Démarrage à froid : servir tout de suite depuis le miroir local
+            snapshot = self._load_from_mirror(loader)
+            if snapshot is not None:
+                return snapshot
+
+        if snapshot is not None and not snapshot.is_empty and not force_refresh:
+            modified = loader.get_last_update_time()
+            if modified is not None and modified == snapshot.source_modified:
+                self._expires_at = time.monotonic() + self.ttl
+                return snapshot
+            return self._reload(loader, modified)
+
+        return self._reload(loader)
+
+    def _start_revalidation(self, check=False):
+        """
+        Lance la revalidation d'arrière-plan si aucune n'est en cours
+
+        Args:
+            check: Vérifier la source même si le snapshot n'a pas expiré (démarrage depuis le miroir)
+        """
+        with self._state_lock:
+            if self._revalidating:
+                return
+            self._revalidating = True
+            self._revalidation = threading.Thread(
+                target=self._revalidate, args=(check,), daemon=True, name='market-data-revalidation'
+            )
+            self._revalidation.start()
+
+    def _is_fresh(self, snapshot):
+        """Snapshot utilisable sans vérification (TTL local, et même génération en mode partagé)"""
+        if time.monotonic() >= self._expires_at:
+            return False
+        return self.shared is None or snapshot.generation == self.shared.generation
+
+    def _get_shared(self, loader, force_refresh):
+        """
+        Mode partagé : vérifie la source si le TTL partagé a expiré, puis suit le miroir (appelé sous verrou)
+
+        Le process qui obtient le verrou fichier interroge Google Sheets ; les
+        autres servent leur snapshot courant sans attendre, sauf s'ils n'en
+        ont pas encore (ils attendent alors la publication en cours).
+        """
+        _, checked_at = self.shared.read()
+        if force_refresh or time.time() - checked_at >= self.ttl:
+            current = self._snapshot
+            blocking = force_refresh or current is None or current.is_empty
+            with self.shared.refresh_lock(blocking=blocking) as acquired:
+                if acquired:
+                    # Un autre process a pu vérifier pendant l'attente du verrou
+                    _, checked_at = self.shared.read()
+                    if force_refresh or time.time() - checked_at >= self.ttl:
+                        self._refresh_shared(loader, force_refresh)
+
+        snapshot = self._attach(loader)
+        _, checked_at = self.shared.read()
+        remaining = self.ttl - (time.time() - checked_at)
+        self._expires_at = time.monotonic() + min(self.ttl, max(1.0, remaining))
+        if snapshot.is_empty:
+            self._expires_at = 0.0
+        return snapshot
+
+    def _refresh_shared(self, loader, force_refresh=False):
+        """Recharge Google Sheets et republie le miroir si le contenu a changé (verrou fichier tenu)"""
+        if loader.offline:
+            # Hors-ligne : le miroir est la source, rien à vérifier
+            self.shared.mark_checked()
+            return
+
+        current = self._attach(loader)
+        modified = loader.get_last_update_time()
+        if (not force_refresh and not current.is_empty
+                and modified is not None and modified == current.source_modified):
+            self.shared.mark_checked()
+            return
+
+        df_all, df_gr, df_merged = loader.load_pricing_data()
+        self.reloads += 1
+
+        if df_all.empty:
+            if not current.is_empty:
+                # Échec de chargement : nouvel essai dans 30 secondes au plus
+                self.shared.mark_checked(time.time() - self.ttl + min(self.ttl, 30))
+            return
+
+        version = compute_data_version(df_all, df_gr)
+        if not current.is_empty and current.version == version:
+            # Contenu identique : conserver le snapshot (et les caches qui en dépendent)
+            current._source_modified = modified
+            self.shared.mark_checked()
+            return
+
+        if loader.save_mirror(df_all, df_gr, version=version, source_modified=modified, df_merged=df_merged):
+            self.shared.publish()
+        else:
+            # Miroir non écrit : ce process sert au moins les nouvelles données
+            self._publish(MarketSnapshot(
+                df_all, df_gr, df_merged,
+                version=version,
+                generation=self.shared.generation,
+                source_modified=modified
+            ))
+
+    def _attach(self, loader):
+        """Snapshot de la génération publiée, relu depuis le miroir s'il a changé (appelé sous verrou)"""
+        generation = self.shared.generation
+        snapshot = self._snapshot
+        if snapshot is not None and not snapshot.is_empty and snapshot.generation == generation:
+            return snapshot
+
+        df_all, df_gr, df_merged, metadata = loader.load_pricing_data_from_mirror()
+        if df_all.empty:
+            if snapshot is None:
+                snapshot = MarketSnapshot(df_all, df_gr, df_merged, version=None)
+                self._snapshot = snapshot
+            return snapshot
+
+        version = metadata.get('version') or compute_data_version(df_all, df_gr)
+        if snapshot is not None and snapshot.version == version:
+            # Même contenu (publication croisée avec la lecture) : garder les précalculs
+            snapshot._generation = generation
+            return snapshot
+
+        self._publish(MarketSnapshot(
+            df_all, df_gr, df_merged,
+            version=version,
+            generation=generation,
+            source_modified=metadata.get('source_modified')
+        ))
+        return self._snapshot
+
+    def _load_from_mirror(self, loader):
+        """
+        Charge le snapshot depuis le miroir local (appelé sous verrou)
+
+        Hors mode hors-ligne, une revalidation auprès de Google Sheets est
+        lancée en arrière-plan : les requêtes sont servies sans attendre.
+        """
+        if loader.mirror is None:
+            return None
+
+        df_all, df_gr, df_merged, metadata = loader.load_pricing_data_from_mirror()
+        if df_all.empty:
+            return None
+
+        self._publish(MarketSnapshot(
+            df_all, df_gr, df_merged,
+            version=metadata.get('version') or compute_data_version(df_all, df_gr),
+            generation=next(self._generations),
+            source_modified=metadata.get('source_modified')
+        ))
+
+        if not loader.offline:
+            self._start_revalidation(check=True)
+
+        return self._snapshot
+
+    def _revalidate(self, check=False):
+        """Vérifie la source et recharge si nécessaire (thread d'arrière-plan, cf. _start_revalidation)"""
+        try:
+            with self._lock:
+                snapshot = self._snapshot
+                if check and snapshot is not None and not snapshot.is_empty and self.shared is None:
+                    # Snapshot du miroir : comparer à la date de modification du Google Sheet
+                    loader = self.loader_factory()
+                    modified = loader.get_last_update_time()
+                    if modified is None or modified != snapshot.source_modified:
+                        self._reload(loader, modified)
+                elif snapshot is None or not self._is_fresh(snapshot):
+                    self._load()
+        except Exception as e:
+            print(f"Erreur revalidation des données de marché: {e}")
+            # Nouvel essai dans 30 secondes au plus (le snapshot courant reste servi)
+            self._expires_at = time.monotonic() + min(self.ttl, 30)
+        finally:
+            with self._state_lock:
+                self._revalidating = False
+            self._notify()
+
+    def _reload(self, loader, modified=None):
+        """Recharge les données (appelé sous verrou)"""
+        if modified is None:
+            modified = loader.get_last_update_time()
+        df_all, df_gr, df_merged = loader.load_pricing_data()
+        self.reloads += 1
+
+        if df_all.empty:
+            # Échec de chargement : conserver l'ancien snapshot s'il existe
+            if self._snapshot is not None and not self._snapshot.is_empty:
+                self._expires_at = time.monotonic() + min(self.ttl, 30)
+                return self._snapshot
+            self._snapshot = MarketSnapshot(df_all, df_gr, df_merged, version=None)
+            self._expires_at = 0.0
+            return self._snapshot
+
+        version = compute_data_version(df_all, df_gr)
+        previous = self._snapshot
+        if previous is not None and previous.version == version:
+            # Contenu identique : conserver le snapshot (et les caches qui en dépendent)
+            previous._source_modified = modified
+            snapshot = previous
+        else:
+            snapshot = MarketSnapshot(
+                df_all, df_gr, df_merged,
+                version=version,
+                generation=next(self._generations),
+                source_modified=modified
+            )
+            # Publier la nouvelle version dans le miroir local
+            loader.save_mirror(df_all, df_gr, version=version, source_modified=modified, df_merged=df_merged)
+            self._publish(snapshot)
+
+        self._snapshot = snapshot
+        self._expires_at = time.monotonic() + self.ttl
+        return snapshot
+
+    def _publish(self, snapshot):
+        """Installe un nouveau snapshot (appelé sous verrou) ; les listeners sont prévenus par _notify"""
+        self._snapshot = snapshot
+        self._expires_at = time.monotonic() + self.ttl
+        with self._state_lock:
+            self._announced = snapshot
+
+    def _notify(self):
+        """
+        Prévient les listeners du dernier snapshot installé (hors du verrou du cache)
+
+        Les annonces sont faites une à la fois, dans l'ordre : un snapshot
+        remplacé avant d'être annoncé ne l'est jamais.
+        """
+        with self._notify_lock:
+            with self._state_lock:
+                snapshot, self._announced = self._announced, None
+                self._notifying = snapshot
+            if snapshot is None:
+                return
+
+            try:
+                for callback in self._listeners:
+                    try:
+                        callback(snapshot)
+                    except Exception as e:
+                        print(f"Erreur précalcul snapshot: {e}")
+            finally:
+                self._notifying = None
+
+
+# Instance globale
+market_data_cache = MarketDataCache()
@@ -0,0 +1,23 @@
+import hmac
+
+from flask import Blueprint, abort, current_app, request
+
+from app.metrics import metrics
+
+bp = Blueprint('metrics', __name__)
+
+@bp.route('/metrics')
+def export():
+    """
+    Métriques au format Prometheus (jeton Bearer METRICS_TOKEN exigé)
+
+    Sans METRICS_TOKEN, l'export n'existe pas (404) : l'application est
+    servie sur une URL publique.
+    """
+    if not metrics.enabled or not metrics.token:
+        abort(404)
+
+    if not hmac.compare_digest(request.headers.get('Authorization', ''), f"Bearer {metrics.token}"):
+        abort(401)
+
+    return current_app.response_class(metrics.render(), mimetype='text/plain; version=0.0.4')
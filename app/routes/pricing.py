@@ -3,36 +3,43 @@ Routes pour l'application de pricing
 Migré depuis Streamlit vers Flask
 """
 
-from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify
+from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify, current_app, send_file
 from flask_login import login_required, current_user
 import numpy as np
 import json
-
-from app.pricing import (
-    GoogleSheetsLoader,
-    create_yellow_curve_rating_clustering,
-    create_green_curve_tranche_clustering,
-    create_blue_curve_fusion,
-    adjust_curve_to_market_points,
-    calculate_adjustment_score
+import os
+
+from app.metrics import metrics
+from app.pricing import GoogleSheetsLoader, market_data_cache
+from app.singleflight import single_flight_stats
+from app.pricing.clustering import RISK_TRANCHES, tranche_rows
+from app.pricing.jobs import job_queue, QueueFullError
+from app.pricing.parallel import curve_executor
+from app.pricing.pipeline import (
+    calculate_curves, calculate_scenarios, serialize_curves, serialize_scenarios, run_universe, json_default
 )
+from app.pricing.serialization import serialize_curves_compact, serialize_scenarios_compact, COMPACT_MIMETYPE
+from app.pricing.result_cache import result_cache, make_key, make_etag, normalize_params
+from app.pricing.precompute import clamp_n_clusters, get_rating_clusters, get_spread_clusters
+from app.pricing.curve_store import curve_store
 
 bp = Blueprint('pricing', __name__, url_prefix='/pricing')
 
+# Nombre maximum de scénarios fournis à /api/calculate-scenarios
+MAX_SCENARIOS = 1000
+
 
 # === HELPER FUNCTIONS ===
 
 def get_sheets_loader():
-    """Initialise et retourne le loader Google Sheets"""
+    """Initialise et retourne le loader Google Sheets (client partagé, sans authentification par requête)"""
     loader = GoogleSheetsLoader()
     return loader
 
 
-def serialize_curve(curve):
-    """Convertit un numpy array en liste pour JSON"""
-    if curve is None:
-        return None
-    return curve.tolist() if hasattr(curve, 'tolist') else list(curve)
+def get_market_snapshot():
+    """Retourne le snapshot des données de marché (cache process-wide)"""
+    return market_data_cache.get_snapshot()
 
 
 # === ROUTES PRINCIPALES ===
@@ -52,7 +59,8 @@ def construction():
     Équivalent de la page "Construction des courbes" de Streamlit
     """
     loader = get_sheets_loader()
-    df_all, df_gr, df_merged = loader.load_pricing_data()
+    snapshot = get_market_snapshot()
+    df_all, df_gr, df_merged = snapshot.as_tuple()
 
     if df_all.empty:
         flash("Impossible de charger les données depuis Google Sheets", "danger")
@@ -69,8 +77,8 @@ def construction():
     score_solidite = int(request.args.get('score_solidite', 3))
 
     # Paramètres de clustering
-    n_clusters_rating = int(request.args.get('n_clusters_rating', 5))
-    n_clusters_spread = int(request.args.get('n_clusters_spread', 3))
+    n_clusters_rating = clamp_n_clusters(request.args.get('n_clusters_rating', 5))
+    n_clusters_spread = clamp_n_clusters(request.args.get('n_clusters_spread', 3))
 
     # Options d'affichage
     show_individual_curves = request.args.get('show_individual_curves') == 'true'
@@ -86,8 +94,8 @@ def construction():
     # Calculer les courbes si un émetteur est sélectionné
     curves_data = None
     if selected_issuer and selected_seniority:
-        curves_data = calculate_curves(
-            df_all, df_gr, df_merged,
+        curves_data = get_curves(
+            snapshot,
             selected_issuer, selected_seniority,
             n_clusters_rating, n_clusters_spread,
             score_liquidite, score_equity, score_solidite
@@ -115,7 +123,7 @@ def analyse():
     Équivalent de la page "Analyse" de Streamlit
     """
     loader = get_sheets_loader()
-    df_all, df_gr, df_merged = loader.load_pricing_data()
+    df_all, df_gr, df_merged = get_market_snapshot().as_tuple()
 
     if df_all.empty:
         flash("Impossible de charger les données depuis Google Sheets", "danger")
@@ -138,7 +146,8 @@ def clusters_rating():
     Équivalent de la page "Clusters Rating" de Streamlit
     """
     loader = get_sheets_loader()
-    df_all, df_gr, df_merged = loader.load_pricing_data()
+    snapshot = get_market_snapshot()
+    df_all, df_gr, df_merged = snapshot.as_tuple()
 
     if df_all.empty or df_gr.empty:
         flash("Impossible de charger les données depuis Google Sheets", "danger")
@@ -146,15 +155,25 @@ def clusters_rating():
                              error="Impossible de charger les données")
 
     # Paramètres
-    n_clusters = int(request.args.get('n_clusters', 10))
+    n_clusters = clamp_n_clusters(request.args.get('n_clusters', 10))
     selected_seniority = request.args.get('seniority', 'Tous')
 
     available_seniorities = ['Tous'] + loader.get_available_seniorities(df_all)
 
+    # Coupe de la hiérarchie Ward (construite une fois par snapshot et séniorité)
+    rating_clusters = get_rating_clusters(
+        snapshot,
+        None if selected_seniority == 'Tous' else selected_seniority,
+        n_clusters
+    )
+    clusters_summary, clusters_issuers = build_rating_clusters_view(rating_clusters, df_gr)
+
     return render_template('pricing/clusters_rating.html',
                          n_clusters=n_clusters,
                          selected_seniority=selected_seniority,
-                         available_seniorities=available_seniorities)
+                         available_seniorities=available_seniorities,
+                         clusters_summary=clusters_summary,
+                         clusters_issuers=clusters_issuers)
 
 
 @bp.route('/clusters-tranches', methods=['GET'])
@@ -165,7 +184,8 @@ def clusters_tranches():
     Équivalent de la page "Clusters Tranches" de Streamlit
     """
     loader = get_sheets_loader()
-    df_all, df_gr, df_merged = loader.load_pricing_data()
+    snapshot = get_market_snapshot()
+    df_all, df_gr, df_merged = snapshot.as_tuple()
 
     if df_all.empty:
         flash("Impossible de charger les données depuis Google Sheets", "danger")
@@ -173,154 +193,456 @@ def clusters_tranches():
                              error="Impossible de charger les données")
 
     # Paramètres
-    n_clusters_spread = int(request.args.get('n_clusters_spread', 3))
+    n_clusters_spread = clamp_n_clusters(request.args.get('n_clusters_spread', 3))
     selected_seniority = request.args.get('seniority', 'SP')
 
     available_seniorities = loader.get_available_seniorities(df_all)
 
+    # Clusters de spread par tranche (K-means 1D, calculés une fois par snapshot)
+    tranches_summary, tranches_points = build_tranche_clusters_view(
+        snapshot, selected_seniority, n_clusters_spread
+    )
+
     return render_template('pricing/clusters_tranches.html',
                          n_clusters_spread=n_clusters_spread,
                          selected_seniority=selected_seniority,
-                         available_seniorities=available_seniorities)
+                         available_seniorities=available_seniorities,
+                         tranches_summary=tranches_summary,
+                         tranches_points=tranches_points)
 
 
 # === API ENDPOINTS POUR AJAX ===
 
-@bp.route('/api/calculate-curves', methods=['POST'])
+@bp.route('/api/calculate-curves', methods=['GET', 'POST'])
 @login_required
 def api_calculate_curves():
-    """API endpoint pour calculer les courbes (appelé via AJAX)"""
+    """
+    API endpoint pour calculer les courbes (appelé via AJAX)
+
+    Paramètres en JSON (POST) ou en query string (GET). La réponse porte un
+    ETag dérivé de la version du snapshot et des paramètres : un client qui
+    renvoie If-None-Match reçoit un 304 sans recalcul.
+
+    Format compact (float32 base64, points en colonnes) avec
+    Accept: application/vnd.paradigm.curves+json ou ?format=compact.
+    """
     try:
-        data = request.get_json()
+        data = request.get_json() if request.method == 'POST' else request.args
+        params = normalize_params(parse_curve_params(data))
+        fmt = response_format()
 
-        loader = get_sheets_loader()
-        df_all, df_gr, df_merged = loader.load_pricing_data()
+        snapshot = get_market_snapshot()
 
-        if df_all.empty:
+        if snapshot.is_empty:
             return jsonify({'error': 'Données non disponibles'}), 400
 
-        selected_issuer = data.get('issuer')
-        selected_seniority = data.get('seniority')
-        n_clusters_rating = int(data.get('n_clusters_rating', 5))
-        n_clusters_spread = int(data.get('n_clusters_spread', 3))
-        score_liquidite = int(data.get('score_liquidite', 3))
-        score_equity = int(data.get('score_equity', 3))
-        score_solidite = int(data.get('score_solidite', 3))
+        key = make_key(snapshot.version, params, fmt)
+        etag = make_etag(key)
 
-        curves_data = calculate_curves(
-            df_all, df_gr, df_merged,
-            selected_issuer, selected_seniority,
-            n_clusters_rating, n_clusters_spread,
-            score_liquidite, score_equity, score_solidite
-        )
+        if etag in request.if_none_match:
+            response = current_app.response_class(status=304)
+        else:
+            body = get_curves_body(snapshot, key, params, fmt)
 
-        if curves_data is None:
-            return jsonify({'error': 'Impossible de calculer les courbes'}), 400
+            if body is None:
+                return jsonify({'error': 'Impossible de calculer les courbes'}), 400
 
-        # Sérialiser les courbes pour JSON
-        response = {
-            'risk_grid': serialize_curve(curves_data['risk_grid']),
-            'yellow_curve': serialize_curve(curves_data.get('yellow_curve')),
-            'green_curve': serialize_curve(curves_data.get('green_curve')),
-            'blue_curve': serialize_curve(curves_data.get('blue_curve')),
-            'red_curve': serialize_curve(curves_data.get('red_curve')),
-            'issuer_points': curves_data['issuer_points'].to_dict('records') if curves_data['issuer_points'] is not None else [],
-            'adjustment_pct': curves_data['adjustment_pct'],
-            'info': curves_data['info']
-        }
+            mimetype = COMPACT_MIMETYPE if fmt == 'compact' else 'application/json'
+            response = current_app.response_class(body, mimetype=mimetype)
 
-        return jsonify(response)
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = 'private, no-cache'
+        response.vary.add('Accept')
+        return response
 
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 
-# === HELPER FUNCTIONS POUR LES CALCULS ===
+@bp.route('/api/calculate-scenarios', methods=['GET', 'POST'])
+@login_required
+def api_calculate_scenarios():
+    """
+    API endpoint : courbes bleues d'un émetteur pour une grille de scores
 
-def calculate_curves(df_all, df_gr, df_merged, selected_issuer, selected_seniority,
-                    n_clusters_rating, n_clusters_spread,
-                    score_liquidite, score_equity, score_solidite):
+    Par défaut les 125 combinaisons de scores ; 'scenarios' (liste de
+    [liquidité, equity, solidité]) permet de fournir sa propre liste.
+    Même négociation de format que /api/calculate-curves.
     """
-    Calcule toutes les courbes pour un émetteur donné
+    try:
+        data = request.get_json() if request.method == 'POST' else request.args
+        params = normalize_params(parse_scenario_params(data))
+        fmt = response_format()
 
-    Returns:
-        Dict avec toutes les courbes et infos
+        snapshot = get_market_snapshot()
+
+        if snapshot.is_empty:
+            return jsonify({'error': 'Données non disponibles'}), 400
+
+        scenarios_data = calculate_scenarios(snapshot, **params)
+
+        if scenarios_data is None:
+            return jsonify({'error': 'Impossible de calculer les courbes'}), 400
+
+        serialize = serialize_scenarios_compact if fmt == 'compact' else serialize_scenarios
+        with metrics.timed('serialize'):
+            body = json.dumps(serialize(scenarios_data), default=json_default)
+        mimetype = COMPACT_MIMETYPE if fmt == 'compact' else 'application/json'
+        response = current_app.response_class(body, mimetype=mimetype)
+        response.vary.add('Accept')
+        return response
+
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@bp.route('/api/universe', methods=['POST'])
+@login_required
+def api_universe():
+    """
+    Calcule les courbes de tous les émetteurs x séniorités en une passe
+
+    Le résultat est écrit dans un fichier JSON unique (UNIVERSE_OUTPUT_FILE),
+    téléchargeable ensuite via GET /pricing/api/universe.
     """
     try:
-        # Grille commune
-        common_risk_grid = np.arange(0, 15.1, 0.1)
-
-        # Calculer l'ajustement total
-        adjustment_pct = calculate_adjustment_score(score_liquidite, score_equity, score_solidite)
-
-        # Données de l'émetteur
-        issuer_data = df_all[
-            (df_all['ticker_corp'] == selected_issuer) &
-            (df_all['payment_rank'] == selected_seniority)
-        ].copy()
-
-        # Données de tous les émetteurs pour cette séniorité
-        all_seniority_data = df_merged[
-            df_merged['payment_rank'] == selected_seniority
-        ].dropna(subset=['Note']).copy()
-
-        if len(all_seniority_data) < 10:
-            return None
-
-        # Courbe JAUNE (clustering rating)
-        yellow_curve, yellow_info = create_yellow_curve_rating_clustering(
-            all_seniority_data,
-            selected_issuer,
-            n_clusters_rating,
-            common_risk_grid
-        )
+        data = request.get_json(silent=True) or {}
 
-        # Courbe VERTE (clustering tranches)
-        green_curve, green_info, tranches_info = create_green_curve_tranche_clustering(
-            all_seniority_data,
-            issuer_data,
-            selected_issuer,
-            n_clusters_spread,
-            common_risk_grid
-        )
+        snapshot = get_market_snapshot()
+
+        if snapshot.is_empty:
+            return jsonify({'error': 'Données non disponibles'}), 400
 
-        # Courbe BLEUE (fusion + ajustements)
-        blue_curve, blue_curve_base, blue_info = create_blue_curve_fusion(
-            yellow_curve,
-            green_curve,
-            adjustment_pct
+        summary = run_universe(
+            snapshot,
+            current_app.config['UNIVERSE_OUTPUT_FILE'],
+            **parse_universe_params(data),
+            executor=curve_executor
         )
 
-        # Courbe ROUGE (marché ajustée)
-        red_curve = None
-        red_info = "Aucun point marché disponible"
-
-        if len(issuer_data) > 0 and blue_curve_base is not None:
-            red_curve = adjust_curve_to_market_points(
-                blue_curve_base,
-                common_risk_grid,
-                issuer_data['riskmid'].values,
-                issuer_data['zspread'].values
-            )
-            red_info = f"Forme bleue ajustée à {len(issuer_data)} points marché"
-
-        return {
-            'risk_grid': common_risk_grid,
-            'yellow_curve': yellow_curve,
-            'green_curve': green_curve,
-            'blue_curve': blue_curve,
-            'red_curve': red_curve,
-            'issuer_points': issuer_data,
-            'adjustment_pct': adjustment_pct,
-            'info': {
-                'yellow': yellow_info,
-                'green': green_info,
-                'blue': blue_info,
-                'red': red_info,
-                'tranches': tranches_info
-            }
-        }
+        return jsonify(summary)
 
     except Exception as e:
-        print(f"Erreur calcul courbes: {e}")
+        return jsonify({'error': str(e)}), 500
+
+
+@bp.route('/api/universe', methods=['GET'])
+@login_required
+def api_universe_download():
+    """Télécharge le dernier fichier de courbes de l'univers"""
+    output_file = os.path.abspath(current_app.config['UNIVERSE_OUTPUT_FILE'])
+
+    if not os.path.exists(output_file):
+        return jsonify({'error': 'Aucun calcul univers disponible'}), 404
+
+    return send_file(output_file, mimetype='application/json')
+
+
+# === JOBS ASYNCHRONES ===
+
+@bp.route('/api/jobs/curves', methods=['POST'])
+@login_required
+def api_submit_curves_job():
+    """Soumet un calcul de courbes (mêmes paramètres que /api/calculate-curves)"""
+    try:
+        params = parse_curve_params(request.get_json())
+    except (TypeError, ValueError, AttributeError) as e:
+        return jsonify({'error': f"Paramètres invalides: {e}"}), 400
+
+    return submit_job('curves', run_curves_job, params)
+
+
+@bp.route('/api/jobs/universe', methods=['POST'])
+@login_required
+def api_submit_universe_job():
+    """Soumet un calcul univers (mêmes paramètres que POST /api/universe)"""
+    try:
+        params = parse_universe_params(request.get_json(silent=True) or {})
+    except (TypeError, ValueError) as e:
+        return jsonify({'error': f"Paramètres invalides: {e}"}), 400
+
+    return submit_job('universe', run_universe_job, current_app.config['UNIVERSE_OUTPUT_FILE'], params)
+
+
+@bp.route('/api/jobs/<job_id>', methods=['GET'])
+@login_required
+def api_job_status(job_id):
+    """
+    Statut d'un job, avec le résultat une fois terminé
+
+    ?wait=N : attend jusqu'à N secondes la fin du job (long-poll, borné par JOB_MAX_WAIT)
+    """
+    try:
+        wait = float(request.args.get('wait', 0))
+    except ValueError:
+        wait = 0
+    wait = min(max(wait, 0), current_app.config['JOB_MAX_WAIT'])
+
+    job = job_queue.wait(job_id, owner=current_user.id, timeout=wait)
+
+    if job is None:
+        return jsonify({'error': 'Job introuvable'}), 404
+
+    return jsonify(job.info())
+
+
+@bp.route('/api/jobs', methods=['GET'])
+@login_required
+def api_jobs_stats():
+    """Compteurs de la file de jobs"""
+    return jsonify(job_queue.stats())
+
+
+@bp.route('/api/market-data/status', methods=['GET'])
+@login_required
+def api_market_data_status():
+    """Statut du cache des données de marché (?check=1 pour vérifier le Google Sheet)"""
+    status = market_data_cache.stats()
+    status['result_cache'] = result_cache.stats()
+    status['curve_store'] = curve_store.stats()
+    status['single_flight'] = single_flight_stats()
+    if request.args.get('check') == '1':
+        status['changed'] = market_data_cache.has_changed()
+    return jsonify(status)
+
+
+@bp.route('/api/market-data/refresh', methods=['POST'])
+@login_required
+def api_market_data_refresh():
+    """Force le rechargement des données de marché depuis Google Sheets"""
+    snapshot = market_data_cache.refresh()
+
+    if snapshot.is_empty:
+        return jsonify({'error': 'Données non disponibles'}), 503
+
+    return jsonify(snapshot.info())
+
+
+# === HELPER FUNCTIONS POUR LES CALCULS ===
+
+def parse_curve_params(data):
+    """Paramètres de calculate_curves depuis un body JSON ou une query string"""
+    return {
+        'selected_issuer': data.get('issuer'),
+        'selected_seniority': data.get('seniority'),
+        'n_clusters_rating': clamp_n_clusters(data.get('n_clusters_rating', 5)),
+        'n_clusters_spread': clamp_n_clusters(data.get('n_clusters_spread', 3)),
+        'score_liquidite': int(data.get('score_liquidite', 3)),
+        'score_equity': int(data.get('score_equity', 3)),
+        'score_solidite': int(data.get('score_solidite', 3)),
+    }
+
+
+def parse_scenario_params(data):
+    """
+    Paramètres de calculate_scenarios depuis un body JSON ou une query string
+
+    Raises:
+        ValueError: Liste de scénarios invalide ou trop longue
+    """
+    scenarios = data.get('scenarios')
+    if isinstance(scenarios, str):
+        # Query string : "1,3,5;2,2,2"
+        scenarios = [item.split(',') for item in scenarios.split(';') if item]
+    if scenarios is not None:
+        scenarios = [[int(score) for score in scenario] for scenario in scenarios]
+        if any(len(scenario) != 3 for scenario in scenarios):
+            raise ValueError("Chaque scénario doit contenir 3 scores (liquidité, equity, solidité)")
+        if not 0 < len(scenarios) <= MAX_SCENARIOS:
+            raise ValueError(f"Entre 1 et {MAX_SCENARIOS} scénarios")
+
+    return {
+        'selected_issuer': data.get('issuer'),
+        'selected_seniority': data.get('seniority'),
+        'n_clusters_rating': clamp_n_clusters(data.get('n_clusters_rating', 5)),
+        'n_clusters_spread': clamp_n_clusters(data.get('n_clusters_spread', 3)),
+        'scenarios': scenarios,
+    }
+
+
+def parse_universe_params(data):
+    """Paramètres de run_universe depuis un body JSON"""
+    return {
+        'n_clusters_rating': clamp_n_clusters(data.get('n_clusters_rating', 5)),
+        'n_clusters_spread': clamp_n_clusters(data.get('n_clusters_spread', 3)),
+        'score_liquidite': int(data.get('score_liquidite', 3)),
+        'score_equity': int(data.get('score_equity', 3)),
+        'score_solidite': int(data.get('score_solidite', 3)),
+        'seniorities': data.get('seniorities'),
+    }
+
+
+def response_format():
+    """Format de réponse demandé : 'compact' (?format=compact ou Accept) ou 'json'"""
+    fmt = request.args.get('format')
+    if fmt in ('json', 'compact'):
+        return fmt
+    best = request.accept_mimetypes.best_match(['application/json', COMPACT_MIMETYPE])
+    return 'compact' if best == COMPACT_MIMETYPE else 'json'
+
+
+def get_curves(snapshot, selected_issuer, selected_seniority,
+               n_clusters_rating, n_clusters_spread,
+               score_liquidite, score_equity, score_solidite):
+    """Courbes d'un émetteur : store matérialisé (paramètres par défaut), sinon calcul direct"""
+    args = (
+        snapshot, selected_issuer, selected_seniority,
+        n_clusters_rating, n_clusters_spread,
+        score_liquidite, score_equity, score_solidite
+    )
+    curves_data = curve_store.get(*args)
+    if curves_data is None:
+        curves_data = calculate_curves(*args)
+    return curves_data
+
+
+def get_curves_body(snapshot, key, params, fmt='json'):
+    """
+    Corps JSON des courbes, depuis le cache LRU ou calculé puis mis en cache
+
+    Returns:
+        Bytes, ou None si les courbes ne peuvent pas être calculées
+    """
+    body = result_cache.get(key)
+    if body is not None:
+        return body
+
+    curves_data = get_curves(snapshot, **params)
+
+    if curves_data is None:
         return None
+
+    # Sérialiser les courbes pour JSON
+    serialize = serialize_curves_compact if fmt == 'compact' else serialize_curves
+    with metrics.timed('serialize'):
+        body = json.dumps(serialize(curves_data), default=json_default).encode()
+    result_cache.put(key, body)
+    return body
+
+
+def submit_job(kind, func, *args):
+    """Soumet un job pour l'utilisateur courant et retourne la réponse 202"""
+    try:
+        job = job_queue.submit(kind, func, *args, owner=current_user.id)
+    except QueueFullError as e:
+        return jsonify({'error': f"File de calcul pleine: {e}"}), 503
+
+    response = jsonify(job.info())
+    response.status_code = 202
+    response.headers['Location'] = url_for('pricing.api_job_status', job_id=job.id)
+    return response
+
+
+def run_curves_job(params):
+    """Job de calcul des courbes (exécuté hors du thread de la requête)"""
+    snapshot = get_market_snapshot()
+
+    if snapshot.is_empty:
+        raise RuntimeError('Données non disponibles')
+
+    params = normalize_params(params)
+    body = get_curves_body(snapshot, make_key(snapshot.version, params), params)
+
+    if body is None:
+        raise RuntimeError('Impossible de calculer les courbes')
+
+    return json.loads(body)
+
+
+def run_universe_job(output_file, params):
+    """Job de calcul univers (exécuté hors du thread de la requête)"""
+    snapshot = get_market_snapshot()
+
+    if snapshot.is_empty:
+        raise RuntimeError('Données non disponibles')
+
+    return run_universe(snapshot, output_file, **params, executor=curve_executor)
+
+
+def build_rating_clusters_view(rating_clusters, df_gr):
+    """
+    Prépare les données de la page clusters rating
+
+    Args:
+        rating_clusters: RatingClusters (ou None)
+        df_gr: DataFrame des ratings (Note, LinReg)
+
+    Returns:
+        Tuple (résumé par cluster, liste des émetteurs avec leur cluster)
+    """
+    if rating_clusters is None:
+        return [], []
+
+    ratings = df_gr.drop_duplicates('ticker_corp').set_index('ticker_corp')
+
+    issuers = []
+    for ticker, cluster in sorted(rating_clusters.issuer_clusters.items(), key=lambda item: (item[1], item[0])):
+        note = ratings['Note'].get(ticker) if 'Note' in ratings else None
+        linreg = ratings['LinReg'].get(ticker) if 'LinReg' in ratings else None
+        issuers.append({
+            'ticker_corp': ticker,
+            'cluster': int(cluster),
+            'note': None if note is None or np.isnan(note) else float(note),
+            'linreg': None if linreg is None or np.isnan(linreg) else float(linreg),
+        })
+
+    summary = []
+    for cluster, stats in sorted(rating_clusters.cluster_stats.items()):
+        linregs = [i['linreg'] for i in issuers if i['cluster'] == cluster and i['linreg'] is not None]
+        summary.append(dict(
+            stats,
+            cluster=int(cluster),
+            linreg_mean=float(np.mean(linregs)) if linregs else None
+        ))
+
+    return summary, issuers
+
+
+def build_tranche_clusters_view(snapshot, seniority, n_clusters_spread):
+    """
+    Prépare les données de la page clusters tranches (tous les émetteurs)
+
+    Args:
+        snapshot: MarketSnapshot
+        seniority: Séniorité (SP, SLA, T2, AT1)
+        n_clusters_spread: Nombre de clusters de spread par tranche
+
+    Returns:
+        Tuple (résumé par tranche, liste des points avec tranche et cluster)
+    """
+    seniority_data = snapshot.seniority_data(seniority)
+
+    summary = []
+    points = []
+    for tranche_min, tranche_max in RISK_TRANCHES:
+        name = f"[{tranche_min}+)" if tranche_max == 15 else f"[{tranche_min}-{tranche_max})"
+        tranche_data = tranche_rows(seniority_data, (tranche_min, tranche_max))
+        spreads = tranche_data['zspread'].to_numpy()
+        clusters = get_spread_clusters(snapshot, seniority, (tranche_min, tranche_max), None, n_clusters_spread)
+
+        labels = clusters.labels(spreads) if clusters is not None else np.zeros(len(spreads), dtype=int)
+        summary.append({
+            'name': name,
+            'points': len(spreads),
+            'zspread_min': float(spreads.min()) if len(spreads) else None,
+            'zspread_max': float(spreads.max()) if len(spreads) else None,
+            'clusters': [
+                {'cluster': c, 'points': int(np.sum(labels == c)), 'center': float(center)}
+                for c, center in enumerate(clusters.centers)
+            ] if clusters is not None else [],
+        })
+
+        for ticker, riskmid, zspread, label in zip(
+            tranche_data['ticker_corp'], tranche_data['riskmid'].to_numpy(), spreads, labels
+        ):
+            points.append({
+                'ticker_corp': ticker,
+                'riskmid': float(riskmid),
+                'zspread': float(zspread),
+                'tranche': name,
+                'cluster': int(label),
+            })
+
+    return summary, points
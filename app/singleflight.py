@@ -0,0 +1,106 @@
+"""
+Regroupement des appels concurrents identiques (single-flight)
+Plusieurs threads qui demandent la même lecture Google Sheets attendent un seul appel en cours
+"""
+
+import threading
+
+
+# Instances nommées (pour les endpoints de statut et les métriques)
+_registry = {}
+
+
+class _Call:
+    """Appel en cours : les autres threads attendent son résultat"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Exécute une seule fois les appels concurrents de même clé
+
+    Le premier thread exécute la fonction ; ceux qui arrivent pendant
+    l'appel attendent et reçoivent le même résultat (ou la même exception).
+    Rien n'est mis en cache : un appel qui commence après la fin du
+    précédent relance la fonction. Le résultat est partagé entre les
+    threads et ne doit pas être modifié en place.
+    """
+
+    def __init__(self, name):
+        """
+        Args:
+            name: Nom de l'instance (clé de single_flight_stats)
+        """
+        self.name = name
+        self._calls = {}
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.executions = 0
+        self.coalesced = 0
+        self.errors = 0
+        _registry[name] = self
+
+    def do(self, key, func, *args, **kwargs):
+        """
+        Exécute func(*args, **kwargs), ou attend l'appel en cours de même clé
+
+        Args:
+            key: Clé hashable identifiant l'appel
+            func: Fonction à exécuter
+
+        Returns:
+            Résultat de func
+        """
+        with self._lock:
+            self.calls += 1
+            call = self._calls.get(key)
+            if call is not None:
+                call.waiters += 1
+                self.coalesced += 1
+                leader = False
+            else:
+                call = _Call()
+                self._calls[key] = call
+                self.executions += 1
+                leader = True
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = func(*args, **kwargs)
+            return call.result
+        except Exception as e:
+            call.error = e
+            with self._lock:
+                self.errors += 1
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def stats(self):
+        """Compteurs de l'instance"""
+        with self._lock:
+            in_flight = len(self._calls)
+        return {
+            'calls': self.calls,
+            'executions': self.executions,
+            'coalesced': self.coalesced,
+            'errors': self.errors,
+            'in_flight': in_flight,
+        }
+
+
+def single_flight_stats():
+    """Compteurs de toutes les instances, par nom"""
+    return {name: flight.stats() for name, flight in _registry.items()}
@@ -15,3 +15,49 @@ document.addEventListener('DOMContentLoaded', function() {
 function confirmDelete(message) {
     return confirm(message || 'Êtes-vous sûr de vouloir supprimer cet élément ?');
 }
+
+// Décodage du format compact de /pricing/api/calculate-curves
+// (Accept: application/vnd.paradigm.curves+json ou ?format=compact)
+const COMPACT_ARRAY_TYPES = {float32: Float32Array, float64: Float64Array, int32: Int32Array};
+
+function decodeArray(encoded, dtype) {
+    if (encoded === null || encoded === undefined) {
+        return null;
+    }
+    const binary = atob(encoded);
+    const bytes = new Uint8Array(binary.length);
+    for (let i = 0; i < binary.length; i++) {
+        bytes[i] = binary.charCodeAt(i);
+    }
+    const ArrayType = COMPACT_ARRAY_TYPES[dtype || 'float32'];
+    return Array.from(new ArrayType(bytes.buffer), v => (Number.isFinite(v) ? v : null));
+}
+
+function decodeFloat32(encoded) {
+    return decodeArray(encoded, 'float32');
+}
+
+function decodeCompactCurves(payload) {
+    const curves = Object.assign({}, payload);
+    ['risk_grid', 'yellow_curve', 'green_curve', 'blue_curve', 'red_curve'].forEach(function(name) {
+        curves[name] = decodeFloat32(payload[name]);
+    });
+
+    // Points de marché : colonnes -> une ligne par point
+    const points = payload.issuer_points || {count: 0, columns: {}, encoded: [], dtypes: {}};
+    const columns = {};
+    Object.keys(points.columns).forEach(function(name) {
+        columns[name] = points.encoded.includes(name)
+            ? decodeArray(points.columns[name], (points.dtypes || {})[name])
+            : points.columns[name];
+    });
+    curves.issuer_points = [];
+    for (let i = 0; i < points.count; i++) {
+        const row = {};
+        Object.keys(columns).forEach(function(name) {
+            row[name] = columns[name][i];
+        });
+        curves.issuer_points.push(row);
+    }
+    return curves;
+}
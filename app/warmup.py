@@ -0,0 +1,93 @@
+"""
+Préchauffage d'un process avant de servir du trafic (imports lourds, snapshot de marché, premier calcul)
+Appelé par gunicorn.conf.py : dans le master avant le fork (preload) ou dans chaque worker
+"""
+
+import json
+import time
+
+
+def warm_up(app, revalidation_timeout=60, curve_store_timeout=120):
+    """
+    Charge ce que la première requête paierait sinon
+
+    Importe les modules chargés à la demande (scipy.optimize), charge le
+    snapshot de marché (miroir local ou Google Sheets, précalculs et store
+    de courbes compris) et calcule puis sérialise les courbes d'un émetteur.
+
+    Args:
+        app: Application Flask
+        revalidation_timeout: Attente max (secondes) de la revalidation Google
+                              Sheets lancée après un démarrage depuis le miroir ;
+                              au-delà, les workers la relancent (cf. reset_after_fork)
+        curve_store_timeout: Attente max (secondes) de la construction du store
+                             de courbes ; au-delà, les workers démarrent et
+                             reprennent la construction (cf. reset_after_fork)
+
+    Returns:
+        Dict des durées (secondes) par étape
+    """
+    from app.pricing.curve_store import curve_store
+    from app.pricing.pipeline import calculate_curves, serialize_curves, json_default
+    from app.pricing.precompute import DEFAULT_N_CLUSTERS_RATING, DEFAULT_N_CLUSTERS_SPREAD
+    from app.pricing.snapshot import market_data_cache
+
+    timings = {}
+    with app.app_context():
+        start = time.perf_counter()
+        import scipy.optimize  # noqa: F401
+        timings['imports'] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        market_data_cache.get_snapshot()
+        # Revalidation terminée avant le fork si possible (sinon son verrou,
+        # hérité acquis, est recréé dans chaque worker par reset_after_fork)
+        if not market_data_cache.wait_revalidation(revalidation_timeout):
+            print(f"Préchauffage: revalidation Google Sheets toujours en cours après {revalidation_timeout}s")
+        snapshot = market_data_cache.get_snapshot()
+        timings['snapshot'] = time.perf_counter() - start
+
+        if snapshot.is_empty:
+            print("Préchauffage: données de marché non disponibles")
+            return timings
+
+        # Store de courbes construit avant le fork (hérité par les workers,
+        # aucun thread de construction en cours au moment du fork)
+        start = time.perf_counter()
+        if not curve_store.wait(curve_store_timeout):
+            print(f"Préchauffage: store de courbes toujours en construction après {curve_store_timeout}s")
+        timings['curve_store'] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        seniority = snapshot.index.seniorities()[0]
+        issuer = snapshot.index.issuers(seniority)[0]
+        curves_data = calculate_curves(
+            snapshot, issuer, seniority,
+            DEFAULT_N_CLUSTERS_RATING, DEFAULT_N_CLUSTERS_SPREAD, 3, 3, 3
+        )
+        if curves_data is not None:
+            json.dumps(serialize_curves(curves_data), default=json_default)
+        timings['curves'] = time.perf_counter() - start
+
+    print("Préchauffage terminé: " + ", ".join(f"{name} {duration:.2f}s" for name, duration in timings.items()))
+    return timings
+
+
+def reset_after_fork():
+    """
+    Remet à zéro l'état propre à un process dans un worker tout juste forké
+
+    Les mesures du préchauffage (faites dans le master) ne sont pas
+    attribuées à chaque worker ; le client Google se réinitialise seul
+    (changement de pid). Une revalidation des données de marché ou une
+    construction du store de courbes interrompue par le fork (délais du
+    préchauffage dépassés) est relancée dans le worker, avec des verrous
+    neufs : ceux du master peuvent avoir été hérités acquis.
+    """
+    from app.metrics import metrics
+    from app.pricing.curve_store import curve_store
+    from app.pricing.snapshot import market_data_cache
+    metrics.reset()
+    # Store d'abord : la revalidation relancée peut lui annoncer un snapshot
+    curve_store.reset_after_fork()
+    market_data_cache.reset_after_fork()
@@ -0,0 +1,4 @@
+"""
+Benchmarks du pipeline de pricing sur des données de marché synthétiques
+Lancement : python -m benchmarks run (cf. __main__.py)
+"""
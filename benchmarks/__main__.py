@@ -0,0 +1,69 @@
+"""
+Point d'entrée : python -m benchmarks run | compare
+
+    python -m benchmarks run --sizes small medium --output bench.json
+    python -m benchmarks run --baseline bench.json --threshold 0.2
+    python -m benchmarks compare bench.json new.json
+"""
+
+import argparse
+import json
+import sys
+import warnings
+
+from .suite import SIZES, compare, run_suite
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks', description="Benchmarks du pipeline de courbes")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run = commands.add_parser('run', help="Mesure le pipeline et écrit un fichier JSON")
+    run.add_argument('--sizes', nargs='+', default=['small', 'medium'], choices=sorted(SIZES))
+    run.add_argument('--repeat', type=int, default=5, help="Mesures par étape (médiane)")
+    run.add_argument('--sample', type=int, default=10, help="Émetteurs mesurés par étape")
+    run.add_argument('--seed', type=int, default=0)
+    run.add_argument('--output', '-o', default='benchmark-results.json')
+    run.add_argument('--baseline', help="Fichier de référence à comparer après la mesure")
+    run.add_argument('--threshold', type=float, default=0.2, help="Ralentissement toléré (0.2 = +20%%)")
+
+    cmp = commands.add_parser('compare', help="Compare deux fichiers de résultats")
+    cmp.add_argument('baseline')
+    cmp.add_argument('current')
+    cmp.add_argument('--threshold', type=float, default=0.2, help="Ralentissement toléré (0.2 = +20%%)")
+
+    args = parser.parse_args(argv)
+
+    # Ajustements NS divergents sur certains groupes synthétiques : sans effet sur les mesures
+    warnings.simplefilter('ignore', RuntimeWarning)
+
+    if args.command == 'run':
+        current = run_suite(sizes=args.sizes, repeat=args.repeat, sample=args.sample, seed=args.seed)
+        with open(args.output, 'w') as f:
+            json.dump(current, f, indent=2)
+        print(f"Résultats -> {args.output}")
+        if not args.baseline:
+            return 0
+        baseline_path = args.baseline
+    else:
+        with open(args.current) as f:
+            current = json.load(f)
+        baseline_path = args.baseline
+
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+
+    rows, regressed = compare(baseline, current, threshold=args.threshold)
+    print(f"{'taille':<8} {'étape':<24} {'référence':>12} {'courant':>12} {'ratio':>7}")
+    for size, stage, before, after, ratio, regression in rows:
+        flag = '  REGRESSION' if regression else ''
+        print(f"{size:<8} {stage:<24} {before * 1000:10.2f}ms {after * 1000:10.2f}ms {ratio:7.2f}{flag}")
+
+    if regressed:
+        print(f"Régression au-delà de +{args.threshold:.0%}")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,232 @@
+"""
+Mesures du pipeline de courbes, étape par étape, sur des univers synthétiques
+"""
+
+import json
+import platform
+import statistics
+import sys
+import time
+from datetime import datetime
+
+import numpy as np
+
+from app.pricing.clustering import (
+    compute_rating_clusters,
+    create_yellow_curve_rating_clustering,
+    create_green_curve_tranche_clustering,
+    collect_green_tranche_points,
+    create_blue_curve_fusion
+)
+from app.pricing.curves import fit_nelson_siegel, fit_nelson_siegel_batch, adjust_curve_to_market_points
+from app.pricing.google_sheets import GoogleSheetsLoader, frame_from_values
+from app.pricing.pipeline import calculate_curves, common_risk_grid, serialize_curves, json_default
+from app.pricing.precompute import precompute_snapshot
+from app.pricing.serialization import serialize_curves_compact
+from app.pricing.snapshot import MarketSnapshot
+
+from .synthetic import generate_market_data, to_sheet_values
+
+
+# Tailles d'univers mesurées (paramètres de generate_market_data)
+SIZES = {
+    'small': {'n_issuers': 50, 'points_per_issuer': 8},
+    'medium': {'n_issuers': 200, 'points_per_issuer': 12},
+    'large': {'n_issuers': 800, 'points_per_issuer': 15},
+}
+
+# Paramètres de calcul (valeurs par défaut des pages de pricing)
+N_CLUSTERS_RATING = 5
+N_CLUSTERS_SPREAD = 3
+SENIORITY = 'SP'
+
+
+def run_suite(sizes=('small', 'medium'), repeat=5, sample=10, seed=0):
+    """
+    Exécute toutes les étapes pour chaque taille
+
+    Args:
+        sizes: Noms de tailles (cf. SIZES)
+        repeat: Nombre de mesures par étape (la médiane est retenue)
+        sample: Nombre d'émetteurs mesurés par étape
+        seed: Graine du générateur
+
+    Returns:
+        Dict {'meta': ..., 'results': {taille: {étape: mesure}}}
+    """
+    results = {}
+    for size in sizes:
+        print(f"[{size}] génération ({SIZES[size]})", file=sys.stderr)
+        results[size] = run_size(SIZES[size], repeat=repeat, sample=sample, seed=seed)
+
+    return {
+        'meta': {
+            'generated_at': datetime.now().isoformat(),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'platform': platform.platform(),
+            'repeat': repeat,
+            'sample': sample,
+            'seed': seed,
+            'sizes': {size: SIZES[size] for size in sizes},
+        },
+        'results': results,
+    }
+
+
+def run_size(params, repeat=5, sample=10, seed=0):
+    """Mesure chaque étape du pipeline sur un univers"""
+    df_all, df_gr = generate_market_data(seed=seed, **params)
+    grids = (to_sheet_values(df_all), to_sheet_values(df_gr))
+    loader = GoogleSheetsLoader(mirror_dir=None, offline=False)
+    risk_grid = common_risk_grid()
+
+    def parse():
+        parsed_all = loader.clean_data_all(frame_from_values(grids[0], numeric_columns=('zspread', 'riskmid')))
+        parsed_gr = frame_from_values(grids[1], numeric_columns=('Note', 'LinReg'))
+        return parsed_all, parsed_gr, loader.merge_ratings(parsed_all, parsed_gr)
+
+    df_all, df_gr, df_merged = parse()
+    snapshot = MarketSnapshot(df_all, df_gr, df_merged, version='bench')
+    all_seniority_data = snapshot.seniority_data(SENIORITY)
+    issuers = snapshot.index.issuers(SENIORITY)[:sample]
+    issuer_frames = [(issuer, snapshot.issuer_data(issuer, SENIORITY)) for issuer in issuers]
+    rating_clusters = compute_rating_clusters(all_seniority_data, N_CLUSTERS_RATING)
+
+    # Entrées des étapes suivantes (calculées une fois, hors mesure)
+    yellow = [
+        create_yellow_curve_rating_clustering(
+            all_seniority_data, issuer, N_CLUSTERS_RATING, risk_grid, rating_clusters=rating_clusters
+        )[0]
+        for issuer, _ in issuer_frames
+    ]
+    green = [
+        create_green_curve_tranche_clustering(
+            all_seniority_data, issuer_data, issuer, N_CLUSTERS_SPREAD, risk_grid
+        )[0]
+        for issuer, issuer_data in issuer_frames
+    ]
+    groups = [
+        group
+        for issuer, issuer_data in issuer_frames
+        for group in collect_green_tranche_points(all_seniority_data, issuer_data, issuer, N_CLUSTERS_SPREAD)[0]
+    ]
+
+    warm = MarketSnapshot(df_all, df_gr, df_merged, version='bench-warm')
+    precompute_snapshot(warm)
+    curves = [
+        calculate_curves(warm, issuer, SENIORITY, N_CLUSTERS_RATING, N_CLUSTERS_SPREAD, 3, 3, 3)
+        for issuer in issuers
+    ]
+    curves = [curves_data for curves_data in curves if curves_data is not None]
+
+    def blue_red():
+        for (_, issuer_data), yellow_curve, green_curve in zip(issuer_frames, yellow, green):
+            _, blue_base, _ = create_blue_curve_fusion(yellow_curve, green_curve, 0.0)
+            if blue_base is not None and len(issuer_data) > 0:
+                adjust_curve_to_market_points(
+                    blue_base, risk_grid, issuer_data['riskmid'].values, issuer_data['zspread'].values
+                )
+
+    stages = {
+        'parse': (parse, 1),
+        'snapshot_index': (lambda: MarketSnapshot(df_all, df_gr, df_merged, version='bench'), 1),
+        'rating_clusters': (lambda: compute_rating_clusters(all_seniority_data, N_CLUSTERS_RATING), 1),
+        'yellow_curve': (lambda: [
+            create_yellow_curve_rating_clustering(
+                all_seniority_data, issuer, N_CLUSTERS_RATING, risk_grid, rating_clusters=rating_clusters
+            )
+            for issuer, _ in issuer_frames
+        ], len(issuer_frames)),
+        'green_curve': (lambda: [
+            create_green_curve_tranche_clustering(
+                all_seniority_data, issuer_data, issuer, N_CLUSTERS_SPREAD, risk_grid
+            )
+            for issuer, issuer_data in issuer_frames
+        ], len(issuer_frames)),
+        'ns_fit': (lambda: [fit_nelson_siegel(maturities, spreads) for maturities, spreads in groups], len(groups)),
+        'ns_fit_batch': (lambda: fit_nelson_siegel_batch(groups), len(groups)),
+        'blue_red': (blue_red, len(issuer_frames)),
+        'serialize_json': (lambda: [
+            json.dumps(serialize_curves(curves_data), default=json_default) for curves_data in curves
+        ], len(curves)),
+        'serialize_compact': (lambda: [
+            json.dumps(serialize_curves_compact(curves_data), default=json_default) for curves_data in curves
+        ], len(curves)),
+        'calculate_curves_cold': (lambda: calculate_curves_cold(df_all, df_gr, df_merged, issuers), len(issuers)),
+        'calculate_curves_warm': (lambda: [
+            calculate_curves(warm, issuer, SENIORITY, N_CLUSTERS_RATING, N_CLUSTERS_SPREAD, 3, 3, 3)
+            for issuer in issuers
+        ], len(issuers)),
+    }
+
+    measures = {
+        'rows_all': len(df_all),
+        'rows_seniority': len(all_seniority_data),
+        'stages': {},
+    }
+    for name, (func, calls) in stages.items():
+        measures['stages'][name] = measure(func, repeat=repeat, calls=calls)
+        print(f"  {name:<24} {measures['stages'][name]['median'] * 1000:10.2f} ms", file=sys.stderr)
+    return measures
+
+
+def calculate_curves_cold(df_all, df_gr, df_merged, issuers):
+    """calculate_curves sur un snapshot neuf (clusters calculés à la première demande)"""
+    snapshot = MarketSnapshot(df_all, df_gr, df_merged, version='bench-cold')
+    return [
+        calculate_curves(snapshot, issuer, SENIORITY, N_CLUSTERS_RATING, N_CLUSTERS_SPREAD, 3, 3, 3)
+        for issuer in issuers
+    ]
+
+
+def measure(func, repeat=5, calls=1):
+    """
+    Chronomètre func repeat fois
+
+    Returns:
+        Dict (médiane, min, max en secondes ; durée médiane par appel)
+    """
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+
+    median = statistics.median(timings)
+    return {
+        'median': median,
+        'min': min(timings),
+        'max': max(timings),
+        'repeat': repeat,
+        'calls': calls,
+        'per_call': median / calls if calls else None,
+    }
+
+
+def compare(baseline, current, threshold=0.2):
+    """
+    Compare deux fichiers de résultats étape par étape
+
+    Args:
+        baseline: Résultats de référence (dict de run_suite)
+        current: Nouveaux résultats
+        threshold: Ralentissement toléré (0.2 = +20% sur la médiane)
+
+    Returns:
+        Tuple (lignes [(taille, étape, référence, courant, ratio, régression)], régression détectée)
+    """
+    rows = []
+    regressed = False
+    for size, measures in current['results'].items():
+        base_stages = baseline['results'].get(size, {}).get('stages', {})
+        for stage, result in measures['stages'].items():
+            if stage not in base_stages:
+                continue
+            before = base_stages[stage]['median']
+            after = result['median']
+            ratio = after / before if before > 0 else float('inf')
+            regression = ratio > 1 + threshold
+            regressed = regressed or regression
+            rows.append((size, stage, before, after, ratio, regression))
+    return rows, regressed
@@ -0,0 +1,92 @@
+"""
+Générateur de données de marché synthétiques (formes Data_All / Data_GR)
+Reproductible (graine) pour comparer les mesures d'une version à l'autre
+"""
+
+import numpy as np
+import pandas as pd
+
+
+SENIORITIES = ['SP', 'SLA', 'T2', 'AT1']
+
+# Prime de séniorité (bp) ajoutée au spread de base
+SENIORITY_PREMIUM = {'SP': 0, 'SLA': 30, 'T2': 80, 'AT1': 200}
+
+
+def generate_market_data(n_issuers=100, seniorities=None, points_per_issuer=10,
+                         rating_spread=20, coverage=0.7, unrated_share=0.05,
+                         outlier_share=0.02, seed=0):
+    """
+    Génère des onglets Data_All et Data_GR synthétiques
+
+    Chaque émetteur a une note (1 à rating_spread) qui fixe son niveau de
+    spread ; ses obligations suivent une courbe de forme Nelson-Siegel par
+    séniorité, avec du bruit et quelques points aberrants.
+
+    Args:
+        n_issuers: Nombre d'émetteurs
+        seniorities: Séniorités générées (défaut: SP, SLA, T2, AT1)
+        points_per_issuer: Nombre moyen de points par émetteur et séniorité
+        rating_spread: Nombre de crans de notation utilisés (1 à 20)
+        coverage: Probabilité qu'un émetteur ait des titres d'une séniorité
+                  autre que la première
+        unrated_share: Part des émetteurs absents de Data_GR
+        outlier_share: Part des points avec un spread aberrant
+        seed: Graine du générateur
+
+    Returns:
+        Tuple (df_all, df_gr) avec les colonnes des onglets Google Sheets
+    """
+    rng = np.random.default_rng(seed)
+    seniorities = seniorities or SENIORITIES
+
+    tickers = np.array([f"ISS{i:04d}" for i in range(n_issuers)])
+    notes = rng.integers(1, max(1, min(rating_spread, 20)) + 1, size=n_issuers).astype(float)
+
+    frames = []
+    for rank, seniority in enumerate(seniorities):
+        has_seniority = np.ones(n_issuers, dtype=bool) if rank == 0 else rng.random(n_issuers) < coverage
+        issuers = np.flatnonzero(has_seniority)
+        counts = np.maximum(1, rng.poisson(points_per_issuer, size=len(issuers)))
+
+        issuer_idx = np.repeat(issuers, counts)
+        n = len(issuer_idx)
+        riskmid = rng.uniform(0.1, 14.5, size=n)
+
+        base = 40 + 12 * notes[issuer_idx] + SENIORITY_PREMIUM.get(seniority, 0)
+        shape = 1 + 0.6 * (1 - np.exp(-riskmid / 3)) - 0.2 * np.exp(-riskmid / 3)
+        zspread = base * shape * rng.lognormal(0, 0.08, size=n)
+
+        outliers = rng.random(n) < outlier_share
+        zspread[outliers] *= rng.choice([0.3, 3.0], size=outliers.sum())
+
+        frames.append(pd.DataFrame({
+            'ticker_corp': tickers[issuer_idx],
+            'payment_rank': seniority,
+            'zspread': np.round(zspread, 2),
+            'riskmid': np.round(riskmid, 3),
+            'isin': [f"XS{seed:02d}{rank}{i:08d}" for i in range(n)],
+        }))
+
+    df_all = pd.concat(frames, ignore_index=True)
+
+    rated = rng.random(n_issuers) >= unrated_share
+    df_gr = pd.DataFrame({
+        'ticker_corp': tickers[rated],
+        'Note': notes[rated],
+        'Rating': [f"R{int(note)}" for note in notes[rated]],
+        'LinReg': np.round(rng.normal(0, 1, size=rated.sum()), 4),
+    })
+
+    return df_all, df_gr
+
+
+def to_sheet_values(df):
+    """
+    Grille de valeurs telle que renvoyée par l'API Google Sheets
+
+    En-têtes puis une ligne de chaînes par enregistrement (valeurs
+    formatées), pour mesurer le parsing de load_pricing_data.
+    """
+    columns = [df[name].astype(str).tolist() for name in df.columns]
+    return [list(map(str, df.columns))] + [list(row) for row in zip(*columns)]
@@ -13,6 +13,53 @@ class Config:
     # Configuration Google Sheets
     GOOGLE_CREDENTIALS_FILE = os.environ.get('GOOGLE_CREDENTIALS_FILE') or 'credentials.json'
     GOOGLE_SHEET_NAME = os.environ.get('GOOGLE_SHEET_NAME') or 'pricing-investment-fund'
+    # Connexions HTTP conservées par le client Google partagé (une par thread gunicorn)
+    GOOGLE_HTTP_POOL_SIZE = int(os.environ.get('GOOGLE_HTTP_POOL_SIZE') or 10)
+
+    # Durée de validité de l'index des utilisateurs en mémoire (secondes)
+    USER_CACHE_TTL = int(os.environ.get('USER_CACHE_TTL') or 60)
+
+    # Stockage users / pricing_data : 'sheets' (Google Sheets) ou 'sqlite' (base locale indexée)
+    STORAGE_BACKEND = os.environ.get('STORAGE_BACKEND') or 'sheets'
+    STORAGE_SQLITE_PATH = os.environ.get('STORAGE_SQLITE_PATH') or 'instance/storage.db'
+    # Synchronisation SQLite -> Google Sheets en arrière-plan (secondes, 0 = désactivée)
+    STORAGE_SYNC_INTERVAL = int(os.environ.get('STORAGE_SYNC_INTERVAL') or 0)
+
+    # Index id -> ligne des feuilles users / pricing_data (secondes avant relecture)
+    SHEETS_ROW_INDEX_TTL = int(os.environ.get('SHEETS_ROW_INDEX_TTL') or 300)
+
+    # Écriture différée des sauvegardes pricing_data (secondes de regroupement, 0 = immédiate)
+    SHEETS_WRITE_BEHIND = float(os.environ.get('SHEETS_WRITE_BEHIND') or 0)
+
+    # Cache des données de marché (secondes avant vérification du Google Sheet)
+    MARKET_DATA_TTL = int(os.environ.get('MARKET_DATA_TTL') or 300)
+    # Snapshot partagé par les workers d'une machine via le miroir local (un seul rechargement Google Sheets)
+    MARKET_DATA_SHARED = (os.environ.get('MARKET_DATA_SHARED') or '0') == '1'
+
+    # Fichier de sortie du calcul univers (tous émetteurs x séniorités)
+    UNIVERSE_OUTPUT_FILE = os.environ.get('UNIVERSE_OUTPUT_FILE') or 'instance/universe.json'
+
+    # Nombre de process pour les calculs en lot (0 = nombre de CPU, 1 = sans pool)
+    PRICING_WORKERS = int(os.environ.get('PRICING_WORKERS') or 0)
+
+    # Store des courbes de tous les émetteurs aux paramètres par défaut (reconstruit à chaque nouveau snapshot)
+    CURVE_STORE_ENABLED = (os.environ.get('CURVE_STORE_ENABLED') or '1') == '1'
+
+    # Cache LRU des réponses de /pricing/api/calculate-curves (nombre d'entrées)
+    RESULT_CACHE_SIZE = int(os.environ.get('RESULT_CACHE_SIZE') or 256)
+
+    # File de jobs asynchrones (threads de calcul, jobs en attente, conservation, long-poll max)
+    # Statuts et résultats dans une base SQLite partagée par les workers gunicorn
+    JOB_DB_PATH = os.environ.get('JOB_DB_PATH') or 'instance/jobs.db'
+    JOB_WORKERS = int(os.environ.get('JOB_WORKERS') or 2)
+    JOB_MAX_PENDING = int(os.environ.get('JOB_MAX_PENDING') or 100)
+    JOB_TTL = int(os.environ.get('JOB_TTL') or 3600)
+    JOB_MAX_WAIT = int(os.environ.get('JOB_MAX_WAIT') or 30)
+
+    # Mesures par étape (en-tête Server-Timing, /metrics au format Prometheus)
+    METRICS_ENABLED = (os.environ.get('METRICS_ENABLED') or '1') == '1'
+    # Jeton Bearer exigé par /metrics (vide = /metrics désactivé)
+    METRICS_TOKEN = os.environ.get('METRICS_TOKEN') or ''
 
     # Configuration Flask
     DEBUG = os.environ.get('FLASK_ENV') == 'development'
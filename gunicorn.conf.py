@@ -0,0 +1,49 @@
+"""
+Configuration gunicorn (chargée automatiquement : gunicorn run:app)
+
+Avec GUNICORN_PRELOAD=1 (défaut), l'application est importée et préchauffée
+dans le master (imports lourds, snapshot de marché, un calcul de courbes)
+avant le fork : les workers démarrent chauds et partagent ces pages
+mémoire en copy-on-write. Avec GUNICORN_PRELOAD=0, chaque worker importe
+l'application et se préchauffe avant d'accepter des connexions.
+"""
+
+import gc
+import os
+
+
+bind = f"0.0.0.0:{os.environ.get('PORT') or 5000}"
+workers = int(os.environ.get('WEB_CONCURRENCY') or 1)
+threads = int(os.environ.get('GUNICORN_THREADS') or 4)
+timeout = int(os.environ.get('GUNICORN_TIMEOUT') or 120)
+
+preload_app = (os.environ.get('GUNICORN_PRELOAD') or '1') == '1'
+warmup = (os.environ.get('GUNICORN_WARMUP') or '1') == '1'
+
+
+def when_ready(server):
+    """Master prêt, workers pas encore lancés : préchauffage partagé (preload)"""
+    if not preload_app:
+        return
+
+    if warmup:
+        from app.warmup import warm_up
+        warm_up(server.app.wsgi())
+
+    # Objets du master exclus du ramasse-miettes : ses passages dans les
+    # workers ne réécrivent pas les pages partagées (copy-on-write)
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    """Worker forké : état propre au process remis à zéro"""
+    if preload_app:
+        from app.warmup import reset_after_fork
+        reset_after_fork()
+
+
+def post_worker_init(worker):
+    """Application chargée dans le worker, avant la première connexion"""
+    if warmup and not preload_app:
+        from app.warmup import warm_up
+        warm_up(worker.wsgi)